@@ -2,52 +2,31 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from dash import Dash, html, dcc
-import plotly.express as px
-import plotly.graph_objects as go
-from etl.transform import (
-    get_total_revenue, get_profit_metrics, get_cac,
-    get_customer_status, get_revenue_by_product,
-    get_revenue_by_region, get_top_salespeople,
-    get_monthly_revenue
-)
+import json
+from dash import Dash, html, dcc, Input, Output, State, ctx, no_update
+from flask import request, abort
+from etl.settings import get_setting
+from dashboard.charts import zoom_range
+from dashboard.data_service import SnapshotService
+from dashboard.figures import DASH_FIGURES, monthly_figure
+from dashboard.figure_cache import figure_dict, figure_json
 
 app = Dash(__name__)
 
-# ── Load Data ───────────────────────────────────────────────
-total_revenue  = get_total_revenue()
-profit         = get_profit_metrics()
-cac            = get_cac()
-status         = get_customer_status()
-df_product     = get_revenue_by_product()
-df_region      = get_revenue_by_region()
-df_sales       = get_top_salespeople()
-df_monthly     = get_monthly_revenue()
-
-# ── Charts ──────────────────────────────────────────────────
-fig_monthly = px.line(
-    df_monthly, x="month", y="revenue",
-    title="📅 Monthly Revenue Trend",
-    markers=True, color_discrete_sequence=["#00b4d8"]
-)
-
-fig_product = px.bar(
-    df_product, x="product", y="revenue",
-    title="📦 Revenue by Product",
-    color="product", color_discrete_sequence=px.colors.qualitative.Set2
-)
-
-fig_region = px.pie(
-    df_region, names="region", values="revenue",
-    title="🌍 Revenue by Region",
-    color_discrete_sequence=px.colors.qualitative.Pastel
-)
-
-fig_sales = px.bar(
-    df_sales, x="salesperson", y="revenue",
-    title="🏆 Top Salespeople",
-    color="salesperson", color_discrete_sequence=px.colors.qualitative.Bold
-)
+# ── Data ────────────────────────────────────────────────────
+# Nothing is queried at import: the layout below renders straight
+# away and the callbacks fill it from the shared data service, which
+# every browser tab reuses between refreshes.
+REFRESH_SECONDS = get_setting("dashboard", "refresh_seconds", 300)
+service         = SnapshotService(REFRESH_SECONDS)
+
+# ── Figures ─────────────────────────────────────────────────
+# Built by dashboard/figures.py and served from the figure cache
+# (dashboard/figure_cache.py), keyed on the snapshot version: every
+# worker process (dashboard/wsgi.py) and every viewer reuses the same
+# JSON, prebuilt after each ETL load by dashboard/warm.py.
+def figure(name, snapshot, version):
+    return figure_dict(name, lambda: DASH_FIGURES[name](snapshot), version=version)
 
 # ── KPI Card Helper ─────────────────────────────────────────
 def kpi_card(title, value, color):
@@ -61,10 +40,14 @@ def kpi_card(title, value, color):
         "minWidth": "180px", "textAlign": "center"
     })
 
-active     = int(status["active_customers"][0])
-churned    = int(status["churned_customers"][0])
-total_cust = active + churned
-retention  = round((active / total_cust) * 100, 1)
+def kpi_cards(snapshot):
+    return [
+        kpi_card("💰 Total Revenue",   f"${snapshot.total_revenue:,.0f}",  "#00b4d8"),
+        kpi_card("📈 Total Profit",    f"${snapshot.total_profit:,.0f}",   "#06d6a0"),
+        kpi_card("📉 Profit Margin",   f"{snapshot.profit_margin_pct}%",   "#f77f00"),
+        kpi_card("🧲 CAC",             f"${snapshot.cac:,.2f}",             "#e63946"),
+        kpi_card("✅ Retention Rate",  f"{snapshot.retention_pct}%",        "#7209b7"),
+    ]
 
 # ── Layout ──────────────────────────────────────────────────
 app.layout = html.Div([
@@ -75,29 +58,94 @@ app.layout = html.Div([
     html.P("Sales & Revenue Overview — 2003 to 2005",
            style={"textAlign": "center", "color": "#ccc", "marginBottom": "30px"}),
 
+    # Refresh tick, and the snapshot version this page last rendered
+    dcc.Interval(id="refresh", interval=REFRESH_SECONDS * 1000),
+    dcc.Store(id="data-version"),
+
     # KPI Cards Row
-    html.Div([
-        kpi_card("💰 Total Revenue",   f"${total_revenue:,.0f}",           "#00b4d8"),
-        kpi_card("📈 Total Profit",    f"${profit['total_profit']:,.0f}",   "#06d6a0"),
-        kpi_card("📉 Profit Margin",   f"{profit['profit_margin_pct']}%",   "#f77f00"),
-        kpi_card("🧲 CAC",             f"${cac:,.2f}",                      "#e63946"),
-        kpi_card("✅ Retention Rate",  f"{retention}%",                     "#7209b7"),
-    ], style={"display": "flex", "gap": "16px", "flexWrap": "wrap",
-              "padding": "0 40px 30px"}),
+    dcc.Loading(html.Div(id="kpi-cards", style={"display": "flex", "gap": "16px", "flexWrap": "wrap",
+                                                "padding": "0 40px 30px"}), type="dot"),
 
     # Charts Row 1
     html.Div([
-        dcc.Graph(figure=fig_monthly, style={"flex": "2"}),
-        dcc.Graph(figure=fig_region,  style={"flex": "1"}),
+        dcc.Graph(id="monthly-chart", style={"flex": "2"}),
+        dcc.Graph(id="region-chart",  style={"flex": "1"}),
     ], style={"display": "flex", "gap": "16px", "padding": "0 40px 20px"}),
 
     # Charts Row 2
     html.Div([
-        dcc.Graph(figure=fig_product, style={"flex": "1"}),
-        dcc.Graph(figure=fig_sales,   style={"flex": "1"}),
+        dcc.Graph(id="product-chart", style={"flex": "1"}),
+        dcc.Graph(id="sales-chart",   style={"flex": "1"}),
     ], style={"display": "flex", "gap": "16px", "padding": "0 40px 40px"}),
 
 ], style={"background": "#1a1a2e", "minHeight": "100vh", "fontFamily": "Segoe UI, sans-serif"})
 
+# ── Callbacks ───────────────────────────────────────────────
+# On page load and every tick: pass on a new version only when the
+# snapshot changed, so unchanged data re-renders nothing.
+@app.callback(Output("data-version", "data"),
+              Input("refresh", "n_intervals"),
+              State("data-version", "data"))
+def check_version(_, rendered):
+    _, version = service.get()
+    return no_update if version == rendered else version
+
+@app.callback(Output("kpi-cards", "children"),
+              Output("region-chart", "figure"),
+              Output("product-chart", "figure"),
+              Output("sales-chart", "figure"),
+              Input("data-version", "data"),
+              prevent_initial_call=True)
+def render(_):
+    snapshot, version = service.get()
+    return (kpi_cards(snapshot), figure("region", snapshot, version),
+            figure("product", snapshot, version), figure("sales", snapshot, version))
+
+# New data keeps the current zoom; a zoom re-fetches just that range
+@app.callback(Output("monthly-chart", "figure"),
+              Input("data-version", "data"),
+              Input("monthly-chart", "relayoutData"),
+              prevent_initial_call=True)
+def render_monthly(_, relayout):
+    zoom = zoom_range(relayout)
+    if ctx.triggered_id == "monthly-chart" and zoom is None:
+        return no_update
+    snapshot, version = service.get()
+    if zoom is None or zoom == (None, None):
+        return figure("monthly", snapshot, version)
+    return monthly_figure(snapshot.monthly_revenue, *zoom)
+
+# ── JSON endpoints with ETag / 304 ──────────────────────────
+# GET /api/kpis and /api/figures/<name> for embeds and pollers. The
+# ETag is the snapshot version, so a client revalidating unchanged
+# data gets an empty 304 without the figure being touched.
+def _conditional(tag, body):
+    if request.if_none_match.contains(tag):
+        response = app.server.response_class(status=304)
+    else:
+        response = app.server.response_class(body(), mimetype="application/json")
+    response.set_etag(tag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@app.server.route("/api/kpis")
+def kpis_endpoint():
+    snapshot, version = service.get()
+    return _conditional(f"{version}-kpis", lambda: json.dumps({
+        "total_revenue":     snapshot.total_revenue,
+        "total_profit":      snapshot.total_profit,
+        "profit_margin_pct": snapshot.profit_margin_pct,
+        "cac":               snapshot.cac,
+        "retention_pct":     snapshot.retention_pct,
+    }, default=float))
+
+@app.server.route("/api/figures/<name>")
+def figure_endpoint(name):
+    if name not in DASH_FIGURES:
+        abort(404)
+    snapshot, version = service.get()
+    return _conditional(f"{version}-{name}", lambda: figure_json(
+        name, lambda: DASH_FIGURES[name](snapshot), version=version))
+
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from etl.settings import get_setting
+
+# ── Chart data layer for time series ────────────────────────
+# A series longer than the point budget is downsampled before it
+# reaches the browser and drawn with WebGL (Scattergl) instead of SVG,
+# so payload size and render time stay bounded however much history
+# is plotted. Series within the budget pass through untouched.
+#
+#   lttb    Largest-Triangle-Three-Buckets: keeps the visual shape of
+#           a line with one point per bucket
+#   minmax  keeps each bucket's lowest and highest point, so no spike
+#           is lost; better for noisy daily / per-order series
+POINT_BUDGET = get_setting("charts", "point_budget", 2000)
+METHOD       = get_setting("charts", "downsample", "lttb")
+
+# x as numbers for triangle areas: datetimes as ns, text as positions
+def _positions(x):
+    x = pd.Series(x)
+    if pd.api.types.is_datetime64_any_dtype(x):
+        return x.astype("int64").to_numpy(dtype=float)
+    if pd.api.types.is_numeric_dtype(x):
+        return x.to_numpy(dtype=float)
+    return np.arange(len(x), dtype=float)
+
+def lttb(x, y, n):
+    size = len(y)
+    if n >= size or n < 3:
+        return np.arange(size)
+    x     = _positions(x)
+    y     = np.asarray(y, dtype=float)
+    edges = np.linspace(1, size - 1, n - 1).astype(int)   # n-2 buckets between first and last
+    keep  = np.empty(n, dtype=int)
+    keep[0], keep[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi   = edges[i], edges[i + 1]
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else size
+        avg_x    = x[nlo:nhi].mean()
+        avg_y    = y[nlo:nhi].mean()
+        area     = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a        = lo + int(np.nanargmax(area)) if np.isfinite(area).any() else lo
+        keep[i + 1] = a
+    return keep
+
+def minmax(x, y, n):
+    size = len(y)
+    if n >= size or n < 4:
+        return np.arange(size)
+    y     = np.asarray(y, dtype=float)
+    edges = np.linspace(0, size, (n - 2) // 2 + 1).astype(int)   # 2 points per bucket + first/last
+    keep  = [0, size - 1]
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi > lo and np.isfinite(y[lo:hi]).any():
+            keep += [lo + int(np.nanargmin(y[lo:hi])), lo + int(np.nanargmax(y[lo:hi]))]
+    return np.unique(keep)
+
+DOWNSAMPLERS = {"lttb": lttb, "minmax": minmax}
+
+def downsample(x, y, budget=None, method=None):
+    budget = budget or POINT_BUDGET
+    method = method or METHOD
+    if method not in DOWNSAMPLERS:
+        raise ValueError(f"Unknown downsample method '{method}'. Choose from: {', '.join(DOWNSAMPLERS)}")
+    return DOWNSAMPLERS[method](x, y, budget)
+
+# ── Traces and frames ───────────────────────────────────────
+# Drop-in for go.Scatter(x=..., y=..., **kwargs)
+def line_trace(x, y, budget=None, method=None, **kwargs):
+    if len(y) <= (budget or POINT_BUDGET):
+        return go.Scatter(x=x, y=y, **kwargs)
+    keep = downsample(x, y, budget, method)
+    return go.Scattergl(x=np.asarray(x)[keep], y=np.asarray(y)[keep], **kwargs)
+
+# For plotly express: downsample each `by` series of a long frame,
+# keeping row order; frames within the budget come back as they are.
+def downsample_frame(frame, x, y, by=None, budget=None, method=None):
+    budget = budget or POINT_BUDGET
+    if _longest(frame, by) <= budget:
+        return frame
+    groups = ([np.arange(len(frame))] if by is None
+              else list(frame.groupby(by, observed=True, sort=False).indices.values()))
+    keep   = np.concatenate([rows[downsample(frame[x].iloc[rows], frame[y].iloc[rows], budget, method)]
+                             for rows in groups])
+    return frame.iloc[np.sort(keep)]
+
+# px render_mode: WebGL once any one series is over the budget
+def render_mode(frame, by=None, budget=None):
+    return "webgl" if _longest(frame, by) > (budget or POINT_BUDGET) else "svg"
+
+def _longest(frame, by=None):
+    if by is None or frame.empty:
+        return len(frame)
+    return int(frame.groupby(by, observed=True).size().max())
+
+# ── Zoom re-fetch ───────────────────────────────────────────
+# A zoomed chart asks for just the visible range, which is then
+# downsampled to the full budget again, so detail appears as the user
+# zooms in. zoom_range reads a Plotly relayout event: (x0, x1) for a
+# zoom, (None, None) for a reset, None when the x range did not change.
+def zoom_range(relayout):
+    relayout = relayout or {}
+    if relayout.get("xaxis.autorange"):
+        return None, None
+    if "xaxis.range[0]" in relayout:
+        return relayout["xaxis.range[0]"], relayout.get("xaxis.range[1]")
+    if "xaxis.range" in relayout:
+        return tuple(relayout["xaxis.range"])
+    return None
+
+# Rows of `frame` whose x falls in [x0, x1], plus one neighbour on each
+# side so lines run to the edges of the plot. Plotly reports text x
+# values such as "2003-01" as dates, so those are compared as dates.
+def window(frame, x, x0=None, x1=None):
+    if x0 is None or x1 is None or frame.empty:
+        return frame
+    values = frame[x]
+    if not pd.api.types.is_numeric_dtype(values):
+        values = pd.to_datetime(values, errors="coerce")
+        x0, x1 = pd.Timestamp(x0), pd.Timestamp(x1)
+    inside = np.flatnonzero(((values >= x0) & (values <= x1)).to_numpy())
+    if len(inside) == 0:
+        return frame.iloc[0:0]
+    return frame.iloc[max(inside[0] - 1, 0):inside[-1] + 2]
@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from etl.sketches import APPROXIMATE, ThetaSketch, hash_values, hll_registers, hll_estimate
+
+# ── Sales cube for the Streamlit dashboard ──────────────────
+# Built once per data version from the raw rows. Every chart is then
+# a roll-up of cube cells, so a filter change costs O(cells), not
+# O(rows). Sums and counts are additive. Distinct customers and
+# orders are kept as the sorted, de-duplicated (cell, id) pairs seen
+# in the rows, so a roll-up maps cells to groups, de-duplicates again
+# and counts per group, and the result is exact. Memory is one int64
+# per distinct pair, at most one per row.
+#
+# With sketches.mode: approx each cell keeps HyperLogLog registers
+# instead (etl/sketches.py): a fixed 2^p bytes per cell, merged by max,
+# counts within the documented error; retention then comes from one
+# theta sketch of customers per year.
+CUBE_DIMENSIONS     = ["YEAR_ID", "MONTH_ID", "PRODUCTLINE", "DEALSIZE", "COUNTRY", "TERRITORY", "STATUS"]
+CUSTOMER_DIMENSIONS = ["YEAR_ID", "PRODUCTLINE", "DEALSIZE", "CUSTOMERNAME"]
+
+MEASURES = {
+    "sales":   ("SALES", "sum"),
+    "profit":  ("PROFIT", "sum"),
+    "lines":   ("SALES", "size"),
+    "orders":  ("ORDERNUMBER", "count"),
+    "sales_n": ("SALES", "count"),
+}
+
+# ── Distinct sets per cell ──────────────────────────────────
+# Both kinds share one interface: take(mask) keeps some cells,
+# regroup(codes, n) merges cell i into group codes[i] (codes < 0 are
+# dropped), counts() is the distinct count per cell and total() over
+# all of them.
+class PairSets:
+    def __init__(self, keys, n_cells, n_ids):
+        self.keys    = keys  # sorted unique cell * n_ids + id
+        self.n_cells = n_cells
+        self.n_ids   = n_ids
+
+    @classmethod
+    def from_pairs(cls, cells, ids, n_cells, n_ids):
+        n_ids = max(n_ids, 1)
+        return cls(np.unique(cells.astype(np.int64) * n_ids + ids), n_cells, n_ids)
+
+    @classmethod
+    def build(cls, cell_ids, codes, n_cells, n_ids):
+        valid = codes >= 0
+        return cls.from_pairs(cell_ids[valid], codes[valid], n_cells, n_ids)
+
+    @property
+    def cells(self):
+        return self.keys // self.n_ids
+
+    @property
+    def ids(self):
+        return self.keys % self.n_ids
+
+    def __len__(self):
+        return self.n_cells
+
+    # Renumbering keeps the cell order, so the keys stay sorted and unique
+    def take(self, mask):
+        cells    = self.cells
+        keep     = mask[cells]
+        renumber = np.cumsum(mask) - 1
+        return PairSets(renumber[cells[keep]] * self.n_ids + self.ids[keep], int(mask.sum()), self.n_ids)
+
+    def regroup(self, codes, n_groups):
+        groups = codes[self.cells]
+        keep   = groups >= 0
+        return PairSets.from_pairs(groups[keep], self.ids[keep], n_groups, self.n_ids)
+
+    def counts(self):
+        return np.bincount(self.cells, minlength=self.n_cells)
+
+    def members(self):
+        return np.unique(self.ids)
+
+    def total(self):
+        return len(self.members())
+
+class HllSets:
+    def __init__(self, registers):
+        self.registers = registers
+
+    @classmethod
+    def build(cls, cell_ids, codes, ids, n_cells):
+        valid = codes >= 0
+        return cls(hll_registers(hash_values(ids)[codes[valid]], cell_ids[valid], n_cells))
+
+    def __len__(self):
+        return len(self.registers)
+
+    def take(self, mask):
+        return HllSets(self.registers[mask])
+
+    def regroup(self, codes, n_groups):
+        valid     = codes >= 0
+        registers = np.zeros((n_groups, self.registers.shape[1]), dtype=np.uint8)
+        np.maximum.at(registers, codes[valid], self.registers[valid])
+        return HllSets(registers)
+
+    def counts(self):
+        return hll_estimate(self.registers)
+
+    def total(self):
+        return int(hll_estimate(self.registers.max(axis=0))) if len(self) else 0
+
+@dataclass(frozen=True)
+class SalesCube:
+    cells:          pd.DataFrame
+    customer_sets:  object
+    order_sets:     object
+    customer_cells: pd.DataFrame
+    customer_years: dict = None
+
+    # ── Filters → boolean mask over cells ───────────────────
+    @staticmethod
+    def _mask(frame, years=None, products=None, deals=None):
+        mask = np.ones(len(frame), dtype=bool)
+        for column, values in (("YEAR_ID", years), ("PRODUCTLINE", products), ("DEALSIZE", deals)):
+            if values:
+                mask &= frame[column].isin(values).to_numpy()
+        return mask
+
+    def select(self, years=None, products=None, deals=None):
+        return self._mask(self.cells, years, products, deals)
+
+    # ── Roll-ups ────────────────────────────────────────────
+    # Same shape as df.groupby(dims, observed=True).agg(...).reset_index()
+    # over the raw rows: keys sorted, NaN keys dropped.
+    def rollup(self, dims, mask=None, distinct_customers=False):
+        cells   = self.cells if mask is None else self.cells[mask]
+        grouped = cells.groupby(dims, observed=True, sort=True)
+        out     = grouped[list(MEASURES)].sum().reset_index()
+        if distinct_customers:
+            sets = self.customer_sets if mask is None else self.customer_sets.take(mask)
+            out["customers"] = sets.regroup(grouped.ngroup().to_numpy(), len(out)).counts().astype(int)
+        return out
+
+    def totals(self, mask=None):
+        cells = self.cells if mask is None else self.cells[mask]
+        out   = {name: cells[name].sum() for name in MEASURES}
+        out["customers"]       = self.distinct(self.customer_sets, mask)
+        out["orders_distinct"] = self.distinct(self.order_sets, mask)
+        return out
+
+    def distinct(self, sets, mask=None):
+        return (sets if mask is None else sets.take(mask)).total()
+
+    # Customer ids seen in `year` (exact mode)
+    def customers_in_year(self, year):
+        return self.customer_sets.take(self.cells["YEAR_ID"].to_numpy() == year).members()
+
+    def retention(self, from_year, to_year):
+        if self.customer_years is None:
+            return retention_rate(self.customers_in_year(from_year), self.customers_in_year(to_year))
+        before = self.customer_years.get(from_year, ThetaSketch())
+        base   = before.count()
+        kept   = before.intersection_count(self.customer_years.get(to_year, ThetaSketch()))
+        return round(min(kept, base) / base * 100, 1) if base > 0 else 0
+
+    def top_customers(self, n=10, years=None, products=None, deals=None):
+        cells = self.customer_cells[self._mask(self.customer_cells, years, products, deals)]
+        out   = (cells.groupby("CUSTOMERNAME", observed=True, sort=True)[["sales", "orders", "profit"]]
+                      .sum().reset_index())
+        return out.sort_values("sales", ascending=False).head(n)
+
+# % of the customers in `before` who are also in `after` (id arrays)
+def retention_rate(before, after):
+    base = len(before)
+    kept = len(np.intersect1d(before, after, assume_unique=True))
+    return round(kept / base * 100, 1) if base > 0 else 0
+
+# "YYYY-MM" label from YEAR_ID / MONTH_ID, as the raw MONTH column had
+def add_month_label(frame):
+    frame.insert(0, "MONTH", frame["YEAR_ID"].astype(str) + "-" + frame["MONTH_ID"].astype(str).str.zfill(2))
+    return frame
+
+# ── Build: the only passes over the raw rows ────────────────
+def build_cube(df):
+    grouped  = df.groupby(CUBE_DIMENSIONS, observed=True, dropna=False, sort=True)
+    cells    = grouped.agg(**MEASURES).reset_index()
+    cell_ids = grouped.ngroup().to_numpy()
+
+    customer_codes, customer_ids = pd.factorize(df["CUSTOMERNAME"])
+    order_codes, order_ids       = pd.factorize(df["ORDERNUMBER"])
+
+    customer_cells = (df.groupby(CUSTOMER_DIMENSIONS, observed=True, dropna=False, sort=True)
+                        .agg(sales=("SALES", "sum"), orders=("ORDERNUMBER", "count"), profit=("PROFIT", "sum"))
+                        .reset_index())
+
+    if APPROXIMATE:
+        years = df["YEAR_ID"].to_numpy()
+        return SalesCube(
+            cells          = cells,
+            customer_sets  = HllSets.build(cell_ids, customer_codes, customer_ids, len(cells)),
+            order_sets     = HllSets.build(cell_ids, order_codes, order_ids, len(cells)),
+            customer_cells = customer_cells,
+            customer_years = {year: ThetaSketch().update(df["CUSTOMERNAME"][years == year])
+                              for year in pd.unique(years[~pd.isna(years)])},
+        )
+
+    return SalesCube(
+        cells          = cells,
+        customer_sets  = PairSets.build(cell_ids, customer_codes, len(cells), len(customer_ids)),
+        order_sets     = PairSets.build(cell_ids, order_codes, len(cells), len(order_ids)),
+        customer_cells = customer_cells,
+    )
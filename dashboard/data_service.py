@@ -0,0 +1,62 @@
+import time
+import hashlib
+import threading
+import dataclasses
+import pandas as pd
+from etl.transform import get_kpi_snapshot
+
+# Content hash of a KpiSnapshot: equal data, equal version, in any
+# process. Hashes the values rather than the pickle, whose bytes differ
+# between a freshly built snapshot and one read back from the cache.
+def content_version(snapshot):
+    digest = hashlib.sha1()
+    for field in dataclasses.fields(snapshot):
+        value = getattr(snapshot, field.name)
+        if isinstance(value, pd.DataFrame):
+            digest.update(repr(list(value.columns)).encode("utf-8"))
+            digest.update(pd.util.hash_pandas_object(value).to_numpy().tobytes())
+        else:
+            digest.update(repr(value).encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+# ── KPI data service for the Dash app ───────────────────────
+# One KpiSnapshot per process, shared by every browser tab and
+# callback. It is refreshed at most once per refresh interval, and only
+# one thread refreshes at a time while the others wait and reuse its
+# result. The refresh itself goes through the shared result cache
+# (etl/cache.py), so several app processes cost one database round
+# trip per cache TTL or data load, not one per tab or tick.
+#
+# `version` is a hash of the snapshot's content: callbacks compare it
+# with what a page last rendered and skip the update when nothing
+# changed.
+class SnapshotService:
+    def __init__(self, refresh_seconds):
+        self.refresh_seconds = refresh_seconds
+        self._lock       = threading.Lock()
+        self._current    = None    # (snapshot, version), swapped as one
+        self._fetched_at = 0.0
+
+    def _stale(self):
+        return self._current is None or time.monotonic() - self._fetched_at >= self.refresh_seconds
+
+    def get(self):
+        if self._stale():
+            with self._lock:
+                if self._stale():
+                    self._refresh()
+        return self._current
+
+    # A failed refresh keeps serving the last good snapshot; with none
+    # to fall back on, the error reaches the callback.
+    def _refresh(self):
+        try:
+            snapshot = get_kpi_snapshot()
+        except Exception as e:
+            if self._current is None:
+                raise
+            print(f"⚠️  KPI refresh failed, serving the previous snapshot: {e}")
+            self._fetched_at = time.monotonic()
+            return
+        self._current    = (snapshot, content_version(snapshot))
+        self._fetched_at = time.monotonic()
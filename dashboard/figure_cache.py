@@ -0,0 +1,64 @@
+import json
+import threading
+import plotly.io as pio
+from etl.settings import get_setting
+from etl.cache import get_cache, MemoryBackend
+
+# ── Figure cache ────────────────────────────────────────────
+# Serialized Plotly figure JSON keyed on (figure id, filter key, data
+# version), in two tiers:
+#
+#   shared     the "figures" namespace of the result cache
+#              (etl/cache.py): one build per key across every process,
+#              prefilled after each ETL load by dashboard/warm.py
+#   in-process an LRU dict in front of it, so an unchanged figure costs
+#              a dictionary lookup, not a build, a cache read or a parse
+#
+# The JSON comes from fig.to_json(), which uses orjson when it is
+# installed. Entries never go stale (a new load means a new version in
+# the key); the TTL only bounds how long unused ones are kept. Callers
+# share the returned dicts / figures and must not modify them.
+TTL_SECONDS    = get_setting("figures", "ttl_seconds", 86400)
+MEMORY_ENTRIES = get_setting("figures", "memory_entries", 256)
+
+_memo  = MemoryBackend(MEMORY_ENTRIES)
+_lock  = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+def _shared():
+    return get_cache("figures", ttl=TTL_SECONDS)
+
+def _memoized(form, figure_id, filters, version, make):
+    key          = (form, figure_id, filters, version)
+    found, value = _memo.get(key)
+    if not found:
+        value = make()
+        _memo.set(key, value, TTL_SECONDS)
+    with _lock:
+        _stats["hits" if found else "misses"] += 1
+    return value
+
+# JSON text, as served over HTTP
+def figure_json(figure_id, build, filters=(), version=None):
+    return _memoized("json", figure_id, filters, version, lambda: _shared().get_or_compute(
+        figure_id, lambda: build().to_json(), params=(filters, version)))
+
+# Parsed dict, for Dash callback outputs
+def figure_dict(figure_id, build, filters=(), version=None):
+    return _memoized("dict", figure_id, filters, version,
+                     lambda: json.loads(figure_json(figure_id, build, filters, version)))
+
+# go.Figure, for st.plotly_chart
+def cached_figure(figure_id, build, filters=(), version=None):
+    return _memoized("figure", figure_id, filters, version,
+                     lambda: pio.from_json(figure_json(figure_id, build, filters, version)))
+
+# Store a freshly built figure in the shared tier (used by the warmer)
+def put_figure(figure_id, fig, filters=(), version=None):
+    _shared().set(figure_id, fig.to_json(), params=(filters, version))
+
+def figure_cache_stats():
+    with _lock:
+        stats = dict(_stats)
+    stats["entries"] = len(_memo)
+    return stats
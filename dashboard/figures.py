@@ -0,0 +1,319 @@
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from dashboard.charts import line_trace, downsample_frame, render_mode, window
+from reports.formatting import fmt_thousands, fmt_percent
+
+# ── Figure builders for both dashboards ─────────────────────
+# Pure functions of the views they chart, importable without Streamlit
+# or Dash, so figures can be prebuilt after an ETL load
+# (dashboard/warm.py) and served from the figure cache
+# (dashboard/figure_cache.py).
+
+# ── Plotly Theme (Streamlit dashboard) ──────────────────────
+CHART_BG    = "#080C14"
+PAPER_BG    = "#0D1421"
+GRID_COLOR  = "rgba(99,179,237,0.06)"
+FONT_COLOR  = "#94A3B8"
+ACCENT      = "#63B3ED"
+TEAL        = "#4FD1C5"
+AMBER       = "#F6AD55"
+GREEN       = "#48BB78"
+RED         = "#FC8181"
+PURPLE      = "#B794F4"
+
+COLORS      = [ACCENT, TEAL, AMBER, GREEN, RED, PURPLE, "#F687B3", "#68D391"]
+DEAL_COLORS = {"Small": ACCENT, "Medium": TEAL, "Large": AMBER}
+
+def chart_layout(fig, title="", height=380):
+    fig.update_layout(
+        title=dict(text=title, font=dict(family="Syne", size=14, color="#CBD5E0"), x=0, xanchor="left"),
+        paper_bgcolor=PAPER_BG,
+        plot_bgcolor=CHART_BG,
+        font=dict(family="DM Sans", color=FONT_COLOR, size=12),
+        height=height,
+        margin=dict(l=16, r=16, t=48, b=16),
+        legend=dict(
+            bgcolor="rgba(0,0,0,0)",
+            bordercolor="rgba(99,179,237,0.1)",
+            font=dict(size=11)
+        ),
+        xaxis=dict(gridcolor=GRID_COLOR, linecolor="rgba(99,179,237,0.1)", tickfont=dict(size=11)),
+        yaxis=dict(gridcolor=GRID_COLOR, linecolor="rgba(99,179,237,0.1)", tickfont=dict(size=11)),
+    )
+    return fig
+
+# ── Overview ────────────────────────────────────────────────
+def monthly_trend(views, all_time):
+    df_monthly = views["df_monthly"]
+    fig = go.Figure()
+    fig.add_trace(line_trace(
+        x=df_monthly["MONTH"], y=df_monthly["revenue"],
+        name="Revenue", fill="tozeroy",
+        fillcolor="rgba(99,179,237,0.08)",
+        line=dict(color=ACCENT, width=2.5),
+        mode="lines+markers",
+        marker=dict(size=5, color=ACCENT)
+    ))
+    fig.add_trace(line_trace(
+        x=df_monthly["MONTH"], y=df_monthly["profit"],
+        name="Profit", fill="tozeroy",
+        fillcolor="rgba(79,209,197,0.06)",
+        line=dict(color=TEAL, width=2, dash="dot"),
+        mode="lines+markers",
+        marker=dict(size=4, color=TEAL)
+    ))
+    fig.update_xaxes(tickangle=45, tickfont=dict(size=9))
+    chart_layout(fig, height=340)
+    return fig
+
+def revenue_split(views, all_time):
+    df_deal = views["df_deal"]
+    fig = go.Figure(go.Pie(
+        labels=df_deal["DEALSIZE"],
+        values=df_deal["SALES"],
+        hole=0.65,
+        marker=dict(colors=[ACCENT, TEAL, AMBER], line=dict(color=CHART_BG, width=3)),
+        textfont=dict(size=11),
+        textinfo="label+percent"
+    ))
+    fig.add_annotation(
+        text=f"${views['kpis']['total_revenue']/1e6:.1f}M",
+        x=0.5, y=0.5, showarrow=False,
+        font=dict(family="Syne", size=18, color="#F1F5F9")
+    )
+    chart_layout(fig, height=340)
+    fig.update_layout(showlegend=False)
+    return fig
+
+# ── Products ────────────────────────────────────────────────
+def product_revenue(views, all_time):
+    df_prod = views["df_prod"]
+    fig = go.Figure(go.Bar(
+        x=df_prod["revenue"], y=df_prod["PRODUCTLINE"],
+        orientation="h",
+        marker=dict(
+            color=df_prod["revenue"],
+            colorscale=[[0,"#1A3550"],[0.5,ACCENT],[1,"#90CDF4"]],
+            line=dict(color="rgba(0,0,0,0)")
+        ),
+        text=fmt_thousands(df_prod["revenue"]),
+        textposition="outside",
+        textfont=dict(size=11, color="#CBD5E0")
+    ))
+    chart_layout(fig, height=360)
+    fig.update_layout(yaxis=dict(tickfont=dict(size=12)))
+    return fig
+
+def product_margin(views, all_time):
+    df_prod = views["df_prod"]
+    fig = go.Figure(go.Bar(
+        x=df_prod["margin"], y=df_prod["PRODUCTLINE"],
+        orientation="h",
+        marker=dict(
+            color=df_prod["margin"],
+            colorscale=[[0,"#1A3550"],[0.5,TEAL],[1,"#81E6D9"]],
+        ),
+        text=fmt_percent(df_prod["margin"]),
+        textposition="outside",
+        textfont=dict(size=11, color="#CBD5E0")
+    ))
+    chart_layout(fig, height=360)
+    return fig
+
+def product_over_time(views, all_time):
+    df_pt = views["df_pt"]
+    fig = px.line(downsample_frame(df_pt, "MONTH", "SALES", by="PRODUCTLINE"),
+                  x="MONTH", y="SALES", color="PRODUCTLINE",
+                  color_discrete_sequence=COLORS, markers=False,
+                  render_mode=render_mode(df_pt, by="PRODUCTLINE"))
+    fig.update_traces(line=dict(width=2))
+    fig.update_xaxes(tickangle=45, tickfont=dict(size=9))
+    chart_layout(fig, height=320)
+    return fig
+
+# ── Regions ─────────────────────────────────────────────────
+def country_map(views, all_time):
+    fig = px.choropleth(
+        views["df_country"], locations="COUNTRY", locationmode="country names",
+        color="revenue", hover_name="COUNTRY",
+        color_continuous_scale=[[0,"#0D1421"],[0.3,"#1E3A5F"],[0.7,ACCENT],[1,"#90CDF4"]],
+        hover_data={"revenue": ":,.0f"}
+    )
+    fig.update_layout(
+        paper_bgcolor=PAPER_BG, plot_bgcolor=CHART_BG,
+        geo=dict(bgcolor=CHART_BG, lakecolor=CHART_BG, landcolor="#111827",
+                 showframe=False, showcoastlines=True, coastlinecolor="rgba(99,179,237,0.2)"),
+        coloraxis_colorbar=dict(tickfont=dict(color=FONT_COLOR), title=dict(font=dict(color=FONT_COLOR))),
+        margin=dict(l=0,r=0,t=40,b=0), height=360
+    )
+    return fig
+
+def top_countries(views, all_time):
+    df_top = views["df_country"].head(10)
+    fig = go.Figure(go.Bar(
+        x=df_top["revenue"],
+        y=df_top["COUNTRY"],
+        orientation="h",
+        marker=dict(color=COLORS[:10]),
+        text=fmt_thousands(df_top["revenue"]),
+        textposition="outside",
+        textfont=dict(size=10, color="#CBD5E0")
+    ))
+    chart_layout(fig, height=360)
+    return fig
+
+# ── Trends & YoY (all-time views) ───────────────────────────
+def yoy_comparison(views, all_time):
+    df_yoy = all_time["df_yoy"]
+
+    fig = go.Figure()
+    year_colors = {2003: ACCENT, 2004: TEAL, 2005: AMBER}
+    year_dashes = {2003: "solid", 2004: "dot", 2005: "dash"}
+
+    for year in sorted(df_yoy["YEAR_ID"].unique()):
+        d = df_yoy[df_yoy["YEAR_ID"] == year].sort_values("MONTH_ID")
+        fig.add_trace(line_trace(
+            x=d["MONTH_NAME"], y=d["SALES"],
+            name=str(year),
+            line=dict(color=year_colors.get(year, ACCENT), width=2.5, dash=year_dashes.get(year,"solid")),
+            mode="lines+markers",
+            marker=dict(size=6)
+        ))
+    chart_layout(fig, height=360)
+    return fig
+
+def annual_summary(views, all_time):
+    df_annual = all_time["df_annual"]
+
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig.add_trace(go.Bar(
+        x=df_annual["YEAR_ID"].astype(str), y=df_annual["revenue"],
+        name="Revenue", marker_color=[ACCENT, TEAL, AMBER],
+        text=fmt_thousands(df_annual["revenue"]),
+        textposition="outside", textfont=dict(size=10)
+    ), secondary_y=False)
+    fig.add_trace(go.Scatter(
+        x=df_annual["YEAR_ID"].astype(str), y=df_annual["growth"],
+        name="Growth %", line=dict(color=GREEN, width=2.5),
+        mode="lines+markers", marker=dict(size=8, color=GREEN),
+        yaxis="y2"
+    ), secondary_y=True)
+    fig.update_layout(paper_bgcolor=PAPER_BG, plot_bgcolor=CHART_BG,
+                      font=dict(family="DM Sans", color=FONT_COLOR),
+                      height=320, margin=dict(l=16,r=16,t=48,b=16),
+                      legend=dict(bgcolor="rgba(0,0,0,0)"),
+                      xaxis=dict(gridcolor=GRID_COLOR),
+                      yaxis=dict(gridcolor=GRID_COLOR),
+                      yaxis2=dict(gridcolor="rgba(0,0,0,0)", ticksuffix="%"))
+    return fig
+
+def seasonality_heatmap(views, all_time):
+    df_pivot = all_time["df_pivot"]
+    month_labels = ["Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"]
+    fig = go.Figure(go.Heatmap(
+        z=df_pivot.values,
+        x=[month_labels[i-1] for i in df_pivot.columns],
+        y=df_pivot.index.astype(str),
+        colorscale=[[0,"#0D1421"],[0.3,"#1E3A5F"],[0.7,ACCENT],[1,"#BEE3F8"]],
+        text=fmt_thousands(df_pivot.values),
+        texttemplate="%{text}",
+        textfont=dict(size=10),
+        showscale=False
+    ))
+    chart_layout(fig, height=320)
+    return fig
+
+# ── Deal Analysis ───────────────────────────────────────────
+def deal_mix_by_year(views, all_time):
+    fig = px.bar(all_time["df_deal_yr"], x="YEAR_ID", y="SALES", color="DEALSIZE",
+                 barmode="group",
+                 color_discrete_map=DEAL_COLORS,
+                 text_auto=False)
+    fig.update_traces(texttemplate="$%{y:.0f}", textposition="outside")
+    chart_layout(fig, height=340)
+    return fig
+
+def deal_by_product(views, all_time):
+    fig = px.bar(views["df_deal_prod"], x="PRODUCTLINE", y="SALES", color="DEALSIZE",
+                 barmode="stack", color_discrete_map=DEAL_COLORS)
+    fig.update_xaxes(tickangle=30, tickfont=dict(size=10))
+    chart_layout(fig, height=340)
+    return fig
+
+def deal_funnel(views, all_time):
+    df_status = views["df_status"]
+    fig = go.Figure(go.Funnel(
+        y=df_status["STATUS"],
+        x=df_status["SALES"],
+        textinfo="value+percent initial",
+        marker=dict(color=[ACCENT, TEAL, AMBER, GREEN, RED, PURPLE][:len(df_status)]),
+        textfont=dict(size=12)
+    ))
+    chart_layout(fig, height=320)
+    return fig
+
+# Figure id → (builder, uses the sidebar filters). Figures drawn from
+# the all-time views are the same for every filter selection, so they
+# are cached once per data version.
+STREAMLIT_FIGURES = {
+    "overview.monthly":    (monthly_trend,       True),
+    "overview.split":      (revenue_split,       True),
+    "products.revenue":    (product_revenue,     True),
+    "products.margin":     (product_margin,      True),
+    "products.over_time":  (product_over_time,   True),
+    "regions.map":         (country_map,         True),
+    "regions.top":         (top_countries,       True),
+    "trends.yoy":          (yoy_comparison,      False),
+    "trends.annual":       (annual_summary,      False),
+    "trends.heatmap":      (seasonality_heatmap, False),
+    "deals.by_year":       (deal_mix_by_year,    False),
+    "deals.by_product":    (deal_by_product,     True),
+    "deals.funnel":        (deal_funnel,         True),
+}
+
+# ── Dash dashboard (dashboard/app.py) ───────────────────────
+# The trend line is drawn from the rows in the visible x range,
+# downsampled to the point budget (dashboard/charts.py); zooming
+# re-fetches the new range at full detail.
+def monthly_figure(df_monthly, x0=None, x1=None):
+    visible = window(df_monthly, "month", x0, x1)
+    fig = px.line(
+        downsample_frame(visible, "month", "revenue"), x="month", y="revenue",
+        title="📅 Monthly Revenue Trend",
+        markers=True, color_discrete_sequence=["#00b4d8"],
+        render_mode=render_mode(visible)
+    )
+    if x0 is not None:
+        fig.update_xaxes(range=[x0, x1])
+    fig.update_layout(uirevision="monthly")
+    return fig
+
+def product_figure(df_product):
+    return px.bar(
+        df_product, x="product", y="revenue",
+        title="📦 Revenue by Product",
+        color="product", color_discrete_sequence=px.colors.qualitative.Set2
+    )
+
+def region_figure(df_region):
+    return px.pie(
+        df_region, names="region", values="revenue",
+        title="🌍 Revenue by Region",
+        color_discrete_sequence=px.colors.qualitative.Pastel
+    )
+
+def sales_figure(df_sales):
+    return px.bar(
+        df_sales, x="salesperson", y="revenue",
+        title="🏆 Top Salespeople",
+        color="salesperson", color_discrete_sequence=px.colors.qualitative.Bold
+    )
+
+# Figure id → builder from a KpiSnapshot
+DASH_FIGURES = {
+    "monthly": lambda snapshot: monthly_figure(snapshot.monthly_revenue),
+    "region":  lambda snapshot: region_figure(snapshot.revenue_by_region),
+    "product": lambda snapshot: product_figure(snapshot.revenue_by_product),
+    "sales":   lambda snapshot: sales_figure(snapshot.top_salespeople),
+}
@@ -0,0 +1,82 @@
+from dashboard.cube import CUBE_DIMENSIONS, MEASURES
+
+# ── Aggregation planner for dashboard charts ────────────────
+# Charts declare the dimensions (and distinct counts) they need up
+# front. run() scans the cube cells once, grouped at the union of all
+# requested dimensions, then derives every other grouping from the
+# smallest one already computed that contains its dimensions. Identical
+# requests share one grouping. `scans` counts passes over the cells.
+#
+# Intermediate groupings keep NaN keys (dropna=False) so coarser
+# roll-ups never lose rows; NaN keys are dropped only from the frames
+# handed back, which have the same shape as SalesCube.rollup.
+DISTINCT = {"customers": "customer_sets", "orders_distinct": "order_sets"}
+
+# Distinct sets follow their cells into the groups (cube.PairSets / HllSets)
+def _group(frame, sets, dims):
+    grouped = frame.groupby(list(dims), observed=True, dropna=False, sort=True)
+    codes   = grouped.ngroup().to_numpy()
+    out     = grouped[list(MEASURES)].sum().reset_index()
+    return out, {name: s.regroup(codes, len(out)) for name, s in sets.items()}
+
+class AggregationPlan:
+    def __init__(self, cube, mask=None):
+        self.cube     = cube
+        self.mask     = mask
+        self.requests = {}
+        self.computed = {}
+        self.scans    = 0
+
+    def add(self, name, dims=(), distinct=()):
+        unknown = set(distinct) - set(DISTINCT)
+        if unknown:
+            raise ValueError(f"Unknown distinct measure(s): {', '.join(sorted(unknown))}")
+        self.requests[name] = (tuple(dims), tuple(distinct))
+        return self
+
+    # ── Plan: grain each request is derived from ────────────
+    def grains(self):
+        return {dims for dims, _ in self.requests.values() if dims}
+
+    def union(self):
+        grains = self.grains()
+        return tuple(d for d in CUBE_DIMENSIONS if any(d in g for g in grains))
+
+    def _scan(self, dims, distinct):
+        self.scans += 1
+        cells = self.cube.cells if self.mask is None else self.cube.cells[self.mask]
+        sets  = {}
+        for name in distinct:
+            s = getattr(self.cube, DISTINCT[name])
+            sets[name] = s if self.mask is None else s.take(self.mask)
+        # no dimensions requested at all: totals straight off the cells
+        return (cells, sets) if not dims else _group(cells, sets, dims)
+
+    def _source(self, dims):
+        candidates = [g for g in self.computed if set(dims) <= set(g)]
+        return min(candidates, key=lambda g: len(self.computed[g][0]))
+
+    def run(self):
+        distinct      = sorted({d for _, ds in self.requests.values() for d in ds})
+        union         = self.union()
+        self.computed = {union: self._scan(union, distinct)}
+        for dims in sorted(self.grains(), key=len, reverse=True):
+            if dims not in self.computed:
+                frame, sets = self.computed[self._source(dims)]
+                self.computed[dims] = _group(frame, sets, dims)
+        return {name: self._result(dims, ds) for name, (dims, ds) in self.requests.items()}
+
+    # ── Results ─────────────────────────────────────────────
+    # dims=() → a totals dict like SalesCube.totals, else a frame
+    def _result(self, dims, distinct):
+        if not dims:
+            frame, sets = self.computed[self._source(dims)]
+            out = {name: frame[name].sum() for name in MEASURES}
+            out.update({name: sets[name].total() for name in distinct})
+            return out
+        frame, sets = self.computed[dims]
+        keep = frame[list(dims)].notna().all(axis=1).to_numpy()
+        out  = frame[keep].reset_index(drop=True)
+        for name in distinct:
+            out[name] = sets[name].take(keep).counts().astype(int)
+        return out
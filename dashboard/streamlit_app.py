@@ -1,9 +1,15 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import pandas as pd
-import numpy as np
+from etl.snapshot import ensure_snapshot
+from dashboard.views import load_frame, filter_options, filter_key, tab_views, all_time_views as compute_all_time
+from dashboard.cube import build_cube
+from dashboard.figures import STREAMLIT_FIGURES, ACCENT, DEAL_COLORS
+from dashboard.figure_cache import cached_figure
+from etl.settings import get_setting
+from reports.formatting import fmt_currency, fmt_thousands, fmt_percent
 
 st.set_page_config(
     page_title="KPI Intelligence Center",
@@ -177,8 +183,8 @@ section[data-testid="stSidebar"] .stMarkdown p {
     background: rgba(99, 179, 237, 0.1);
 }
 
-/* Tab styling */
-.stTabs [data-baseweb="tab-list"] {
+/* Tab bar (segmented control) styling */
+[data-testid="stButtonGroup"] {
     background: #0D1421;
     border-radius: 10px;
     padding: 4px;
@@ -186,7 +192,7 @@ section[data-testid="stSidebar"] .stMarkdown p {
     border: 1px solid rgba(99, 179, 237, 0.1);
 }
 
-.stTabs [data-baseweb="tab"] {
+[data-testid="stButtonGroup"] button {
     background: transparent;
     border-radius: 8px;
     color: #64748B;
@@ -196,7 +202,7 @@ section[data-testid="stSidebar"] .stMarkdown p {
     padding: 8px 20px;
 }
 
-.stTabs [aria-selected="true"] {
+[data-testid="stButtonGroup"] button[data-testid$="Active"] {
     background: linear-gradient(135deg, #1E3A5F, #1A3550) !important;
     color: #63B3ED !important;
 }
@@ -262,18 +268,26 @@ hr { border-color: rgba(99, 179, 237, 0.08) !important; }
 """, unsafe_allow_html=True)
 
 # ── Load & Prepare Data ──────────────────────────────────────
-@st.cache_data
-def load_data():
-    df = pd.read_csv("data/sales_data_sample.csv", encoding="latin1")
-    df.columns = df.columns.str.strip()
-    for col in ["SALES", "PRICEEACH", "QUANTITYORDERED", "MSRP"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-    df["PROFIT"]    = df["SALES"] * 0.45
-    df["ORDERDATE"] = pd.to_datetime(df["ORDERDATE"], errors="coerce")
-    df["MONTH"]     = df["YEAR_ID"].astype(str) + "-" + df["MONTH_ID"].astype(str).str.zfill(2)
-    return df
-
-df_all = load_data()
+# Maps only the columns the dashboard uses from the Arrow snapshot
+# (dashboard/views.py). st.cache_resource hands every session the same
+# frame (st.cache_data would give each rerun its own copy) and the
+# numeric columns are views of the mapped file, so memory stays flat
+# as viewers are added. Treat the frame as read-only. The snapshot
+# version keys the cache, so a rebuilt snapshot is picked up without
+# restarting the app.
+@st.cache_resource(max_entries=2)
+def load_data(version):
+    return load_frame()
+
+# Every chart below is a roll-up of this cube (dashboard/cube.py), so
+# reruns never go back to the raw rows.
+@st.cache_resource(max_entries=2)
+def load_cube(version):
+    return build_cube(load_data(version))
+
+data_version = ensure_snapshot()
+cube         = load_cube(data_version)
+options      = filter_options(cube)
 
 # ── Sidebar ──────────────────────────────────────────────────
 with st.sidebar:
@@ -287,7 +301,7 @@ with st.sidebar:
     st.markdown("---")
     st.markdown("**FILTERS**")
 
-    years = sorted(df_all["YEAR_ID"].dropna().unique().astype(int).tolist())
+    years = options["years"]
     selected_years = st.multiselect(
         "Year",
         options=years,
@@ -295,7 +309,7 @@ with st.sidebar:
         key="year_filter"
     )
 
-    product_lines = sorted(df_all["PRODUCTLINE"].dropna().unique().tolist())
+    product_lines = options["products"]
     selected_products = st.multiselect(
         "Product Line",
         options=product_lines,
@@ -303,7 +317,7 @@ with st.sidebar:
         key="product_filter"
     )
 
-    deal_sizes = sorted(df_all["DEALSIZE"].dropna().unique().tolist())
+    deal_sizes = options["deals"]
     selected_deals = st.multiselect(
         "Deal Size",
         options=deal_sizes,
@@ -327,67 +341,77 @@ with st.sidebar:
     """, unsafe_allow_html=True)
 
 # ── Apply Filters ────────────────────────────────────────────
-df = df_all.copy()
-if selected_years:
-    df = df[df["YEAR_ID"].isin(selected_years)]
-if selected_products:
-    df = df[df["PRODUCTLINE"].isin(selected_products)]
-if selected_deals:
-    df = df[df["DEALSIZE"].isin(selected_deals)]
-
-# ── Plotly Theme ─────────────────────────────────────────────
-CHART_BG    = "#080C14"
-PAPER_BG    = "#0D1421"
-GRID_COLOR  = "rgba(99,179,237,0.06)"
-FONT_COLOR  = "#94A3B8"
-ACCENT      = "#63B3ED"
-TEAL        = "#4FD1C5"
-AMBER       = "#F6AD55"
-GREEN       = "#48BB78"
-RED         = "#FC8181"
-PURPLE      = "#B794F4"
-
-COLORS = [ACCENT, TEAL, AMBER, GREEN, RED, PURPLE, "#F687B3", "#68D391"]
-
-def chart_layout(fig, title="", height=380):
-    fig.update_layout(
-        title=dict(text=title, font=dict(family="Syne", size=14, color="#CBD5E0"), x=0, xanchor="left"),
-        paper_bgcolor=PAPER_BG,
-        plot_bgcolor=CHART_BG,
-        font=dict(family="DM Sans", color=FONT_COLOR, size=12),
-        height=height,
-        margin=dict(l=16, r=16, t=48, b=16),
-        legend=dict(
-            bgcolor="rgba(0,0,0,0)",
-            bordercolor="rgba(99,179,237,0.1)",
-            font=dict(size=11)
-        ),
-        xaxis=dict(gridcolor=GRID_COLOR, linecolor="rgba(99,179,237,0.1)", tickfont=dict(size=11)),
-        yaxis=dict(gridcolor=GRID_COLOR, linecolor="rgba(99,179,237,0.1)", tickfont=dict(size=11)),
-    )
-    return fig
+# Sorted tuples (dashboard/views.py), so the same selection made in any
+# order (or in any session) maps to the same cache key.
+filters = filter_key(selected_years, selected_products, selected_deals)
+
+# ── Cached Aggregations ──────────────────────────────────────
+# Computed from the cube once per (data version, filters) and shared by
+# every session; st.cache_data evicts the least recently used entries
+# beyond max_entries. `_cube` is left out of the cache key (leading
+# underscore) because the version already identifies it.
+#
+# Each view registers every grouping its charts need with one
+# AggregationPlan (dashboard/planner.py), which scans the cube cells
+# once and derives the rest by roll-up. scan_stats collects the scans
+# made during this rerun; cache hits make none.
+CACHE_ENTRIES = get_setting("dashboard", "cache_entries", 128)
+scan_stats    = {"scans": 0}
+
+# ── Tabs: labels and the views each one charts ───────────────
+# Only the selected tab's filtered views are computed (and cached),
+# together with the KPI totals every tab shows in the header.
+TAB_VIEWS = {
+    "📊  Overview":      "overview",
+    "📦  Products":      "products",
+    "🌍  Regions":       "regions",
+    "📈  Trends & YoY":  "trends",
+    "💼  Deal Analysis": "deals",
+}
+DEFAULT_TAB = "📊  Overview"
+
+@st.cache_data(max_entries=CACHE_ENTRIES)
+def filtered_views(version, filters, tab, _cube):
+    views = tab_views(_cube, filters, tab)
+    scan_stats["scans"] += views["scans"]
+    return views
+
+# Unfiltered views: YoY, retention, trends and insights
+@st.cache_data(max_entries=CACHE_ENTRIES)
+def all_time_views(version, _cube):
+    views = compute_all_time(_cube)
+    scan_stats["scans"] += views["scans"]
+    return views
+
+# ── Charts ───────────────────────────────────────────────────
+# Figures come from dashboard/figures.py through the figure cache
+# (dashboard/figure_cache.py), keyed on (figure id, filters, snapshot
+# version): an unchanged figure is a dictionary lookup, and the default
+# view's figures are prebuilt after each ETL load (dashboard/warm.py).
+def chart(figure_id):
+    build, filtered = STREAMLIT_FIGURES[figure_id]
+    fig = cached_figure(figure_id, lambda: build(views, all_time),
+                        filters=filters if filtered else (), version=data_version)
+    st.plotly_chart(fig, use_container_width=True)
 
 # ── KPI Calculations ─────────────────────────────────────────
-total_revenue = df["SALES"].sum()
-total_profit  = df["PROFIT"].sum()
-profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
-total_orders  = df["ORDERNUMBER"].nunique()
-avg_order     = total_revenue / total_orders if total_orders > 0 else 0
-num_customers = df["CUSTOMERNAME"].nunique()
-cac           = round(500 / num_customers * 100, 2) if num_customers > 0 else 0
-
-# YoY Revenue Growth
-rev_by_year = df_all.groupby("YEAR_ID")["SALES"].sum()
-if len(rev_by_year) >= 2 and 2004 in rev_by_year and 2003 in rev_by_year:
-    yoy_growth = ((rev_by_year[2004] - rev_by_year[2003]) / rev_by_year[2003]) * 100
-else:
-    yoy_growth = 0
-
-# Retention
-c2004 = set(df_all[df_all["YEAR_ID"] == 2004]["CUSTOMERNAME"])
-c2005 = set(df_all[df_all["YEAR_ID"] == 2005]["CUSTOMERNAME"])
-retained  = len(c2004 & c2005)
-retention = round((retained / len(c2004)) * 100, 1) if len(c2004) > 0 else 0
+selected_tab  = st.session_state.get("active_tab") or DEFAULT_TAB
+views         = filtered_views(data_version, filters, TAB_VIEWS[selected_tab], cube)
+kpis          = views["kpis"]
+all_time      = all_time_views(data_version, cube)
+total_revenue = kpis["total_revenue"]
+total_profit  = kpis["total_profit"]
+profit_margin = kpis["profit_margin"]
+total_orders  = kpis["total_orders"]
+avg_order     = kpis["avg_order"]
+num_customers = kpis["num_customers"]
+cac           = kpis["cac"]
+yoy_growth    = all_time["yoy_growth"]
+retention     = all_time["retention"]
+
+# 0 on a cache hit, 1 for a new filter selection (+1 for the all-time
+# views the first time a data version is seen)
+st.sidebar.caption(f"⚙️ Aggregation scans this run: {scan_stats['scans']}")
 
 # ── Header ───────────────────────────────────────────────────
 st.markdown(f"""
@@ -397,7 +421,7 @@ st.markdown(f"""
             <div class="dashboard-title">Sales Intelligence Center</div>
             <div class="dashboard-subtitle">
                 Showing data for {', '.join(str(y) for y in sorted(selected_years)) if selected_years else 'No years selected'} 
-                &nbsp;·&nbsp; {len(df):,} transactions &nbsp;·&nbsp; {num_customers} customers
+                &nbsp;·&nbsp; {kpis["transactions"]:,} transactions &nbsp;·&nbsp; {num_customers} customers
             </div>
         </div>
         <div class="live-badge">
@@ -454,76 +478,22 @@ with c5:
 
 st.markdown("<br>", unsafe_allow_html=True)
 
-# ── Tabs ─────────────────────────────────────────────────────
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
-    "📊  Overview",
-    "📦  Products",
-    "🌍  Regions",
-    "📈  Trends & YoY",
-    "💼  Deal Analysis"
-])
-
 # ════════════════════════════════════════════════════════════
 # TAB 1 — OVERVIEW
 # ════════════════════════════════════════════════════════════
-with tab1:
+def render_overview():
+    df_cust = views["df_cust"]
     col1, col2 = st.columns([2, 1])
 
     with col1:
         st.markdown('<div class="section-header">Monthly Revenue & Profit</div>', unsafe_allow_html=True)
-        df_monthly = df.groupby("MONTH").agg(revenue=("SALES","sum"), profit=("PROFIT","sum")).reset_index().sort_values("MONTH")
-
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=df_monthly["MONTH"], y=df_monthly["revenue"],
-            name="Revenue", fill="tozeroy",
-            fillcolor="rgba(99,179,237,0.08)",
-            line=dict(color=ACCENT, width=2.5),
-            mode="lines+markers",
-            marker=dict(size=5, color=ACCENT)
-        ))
-        fig.add_trace(go.Scatter(
-            x=df_monthly["MONTH"], y=df_monthly["profit"],
-            name="Profit", fill="tozeroy",
-            fillcolor="rgba(79,209,197,0.06)",
-            line=dict(color=TEAL, width=2, dash="dot"),
-            mode="lines+markers",
-            marker=dict(size=4, color=TEAL)
-        ))
-        fig.update_xaxes(tickangle=45, tickfont=dict(size=9))
-        chart_layout(fig, height=340)
-        st.plotly_chart(fig, use_container_width=True)
+        chart("overview.monthly")
 
     with col2:
         st.markdown('<div class="section-header">Revenue Split</div>', unsafe_allow_html=True)
-        df_deal = df.groupby("DEALSIZE")["SALES"].sum().reset_index()
-        fig = go.Figure(go.Pie(
-            labels=df_deal["DEALSIZE"],
-            values=df_deal["SALES"],
-            hole=0.65,
-            marker=dict(colors=[ACCENT, TEAL, AMBER], line=dict(color=CHART_BG, width=3)),
-            textfont=dict(size=11),
-            textinfo="label+percent"
-        ))
-        fig.add_annotation(
-            text=f"${total_revenue/1e6:.1f}M",
-            x=0.5, y=0.5, showarrow=False,
-            font=dict(family="Syne", size=18, color="#F1F5F9")
-        )
-        chart_layout(fig, height=340)
-        fig.update_layout(showlegend=False)
-        st.plotly_chart(fig, use_container_width=True)
+        chart("overview.split")
 
     st.markdown('<div class="section-header">Top 10 Customers</div>', unsafe_allow_html=True)
-    df_cust = df.groupby("CUSTOMERNAME").agg(
-        revenue=("SALES","sum"),
-        orders=("ORDERNUMBER","count"),
-        profit=("PROFIT","sum")
-    ).reset_index().sort_values("revenue", ascending=False).head(10)
-    df_cust["margin"] = (df_cust["profit"] / df_cust["revenue"] * 100).round(1)
-    df_cust["revenue_fmt"] = df_cust["revenue"].apply(lambda x: f"${x:,.0f}")
-    df_cust["profit_fmt"]  = df_cust["profit"].apply(lambda x: f"${x:,.0f}")
-    df_cust["margin_fmt"]  = df_cust["margin"].apply(lambda x: f"{x}%")
     st.dataframe(
         df_cust[["CUSTOMERNAME","revenue_fmt","profit_fmt","margin_fmt","orders"]].rename(columns={
             "CUSTOMERNAME":"Customer","revenue_fmt":"Revenue",
@@ -535,188 +505,73 @@ with tab1:
 # ════════════════════════════════════════════════════════════
 # TAB 2 — PRODUCTS
 # ════════════════════════════════════════════════════════════
-with tab2:
+def render_products():
     col1, col2 = st.columns(2)
 
     with col1:
         st.markdown('<div class="section-header">Revenue by Product Line</div>', unsafe_allow_html=True)
-        df_prod = df.groupby("PRODUCTLINE").agg(revenue=("SALES","sum"), profit=("PROFIT","sum"), orders=("ORDERNUMBER","count")).reset_index().sort_values("revenue", ascending=True)
-        fig = go.Figure(go.Bar(
-            x=df_prod["revenue"], y=df_prod["PRODUCTLINE"],
-            orientation="h",
-            marker=dict(
-                color=df_prod["revenue"],
-                colorscale=[[0,"#1A3550"],[0.5,ACCENT],[1,"#90CDF4"]],
-                line=dict(color="rgba(0,0,0,0)")
-            ),
-            text=df_prod["revenue"].apply(lambda x: f"${x/1e3:.0f}K"),
-            textposition="outside",
-            textfont=dict(size=11, color="#CBD5E0")
-        ))
-        chart_layout(fig, height=360)
-        fig.update_layout(yaxis=dict(tickfont=dict(size=12)))
-        st.plotly_chart(fig, use_container_width=True)
+        chart("products.revenue")
 
     with col2:
         st.markdown('<div class="section-header">Profit Margin by Product</div>', unsafe_allow_html=True)
-        df_prod["margin"] = (df_prod["profit"] / df_prod["revenue"] * 100).round(1)
-        fig = go.Figure(go.Bar(
-            x=df_prod["margin"], y=df_prod["PRODUCTLINE"],
-            orientation="h",
-            marker=dict(
-                color=df_prod["margin"],
-                colorscale=[[0,"#1A3550"],[0.5,TEAL],[1,"#81E6D9"]],
-            ),
-            text=df_prod["margin"].apply(lambda x: f"{x}%"),
-            textposition="outside",
-            textfont=dict(size=11, color="#CBD5E0")
-        ))
-        chart_layout(fig, height=360)
-        st.plotly_chart(fig, use_container_width=True)
+        chart("products.margin")
 
     st.markdown('<div class="section-header">Product Performance Over Time</div>', unsafe_allow_html=True)
-    df_pt = df.groupby(["MONTH","PRODUCTLINE"])["SALES"].sum().reset_index()
-    fig = px.line(df_pt, x="MONTH", y="SALES", color="PRODUCTLINE",
-                  color_discrete_sequence=COLORS, markers=False)
-    fig.update_traces(line=dict(width=2))
-    fig.update_xaxes(tickangle=45, tickfont=dict(size=9))
-    chart_layout(fig, height=320)
-    st.plotly_chart(fig, use_container_width=True)
+    chart("products.over_time")
 
 # ════════════════════════════════════════════════════════════
 # TAB 3 — REGIONS
 # ════════════════════════════════════════════════════════════
-with tab3:
+def render_regions():
+    df_terr = views["df_terr"]
     col1, col2 = st.columns([1.2, 1])
 
     with col1:
         st.markdown('<div class="section-header">Revenue by Country</div>', unsafe_allow_html=True)
-        df_country = df.groupby("COUNTRY").agg(revenue=("SALES","sum"), orders=("ORDERNUMBER","count")).reset_index().sort_values("revenue", ascending=False)
-        fig = px.choropleth(
-            df_country, locations="COUNTRY", locationmode="country names",
-            color="revenue", hover_name="COUNTRY",
-            color_continuous_scale=[[0,"#0D1421"],[0.3,"#1E3A5F"],[0.7,ACCENT],[1,"#90CDF4"]],
-            hover_data={"revenue": ":,.0f"}
-        )
-        fig.update_layout(
-            paper_bgcolor=PAPER_BG, plot_bgcolor=CHART_BG,
-            geo=dict(bgcolor=CHART_BG, lakecolor=CHART_BG, landcolor="#111827",
-                     showframe=False, showcoastlines=True, coastlinecolor="rgba(99,179,237,0.2)"),
-            coloraxis_colorbar=dict(tickfont=dict(color=FONT_COLOR), title=dict(font=dict(color=FONT_COLOR))),
-            margin=dict(l=0,r=0,t=40,b=0), height=360
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        chart("regions.map")
 
     with col2:
         st.markdown('<div class="section-header">Top Countries</div>', unsafe_allow_html=True)
-        fig = go.Figure(go.Bar(
-            x=df_country.head(10)["revenue"],
-            y=df_country.head(10)["COUNTRY"],
-            orientation="h",
-            marker=dict(color=COLORS[:10]),
-            text=df_country.head(10)["revenue"].apply(lambda x: f"${x/1e3:.0f}K"),
-            textposition="outside",
-            textfont=dict(size=10, color="#CBD5E0")
-        ))
-        chart_layout(fig, height=360)
-        st.plotly_chart(fig, use_container_width=True)
+        chart("regions.top")
 
     st.markdown('<div class="section-header">Territory Performance</div>', unsafe_allow_html=True)
-    df_terr = df.groupby("TERRITORY").agg(
-        revenue=("SALES","sum"), profit=("PROFIT","sum"), orders=("ORDERNUMBER","count")
-    ).reset_index().dropna()
     col1, col2, col3 = st.columns(len(df_terr))
-    for i, (_, row) in enumerate(df_terr.iterrows()):
+    cards = df_terr.assign(
+        revenue_label = fmt_thousands(df_terr["revenue"]),
+        margin_label  = fmt_percent(df_terr["profit"] / df_terr["revenue"] * 100, 1),
+    )
+    for i, row in enumerate(cards.itertuples(index=False)):
         with [col1,col2,col3][i % 3]:
-            margin = row["profit"]/row["revenue"]*100
             st.markdown(f"""
             <div class="kpi-card" style="text-align:center; margin-bottom:10px;">
-                <div class="kpi-label">{row['TERRITORY']}</div>
-                <div class="kpi-value" style="font-size:20px;">${row['revenue']/1e3:.0f}K</div>
-                <div class="kpi-delta delta-up">{margin:.1f}% margin · {int(row['orders'])} orders</div>
+                <div class="kpi-label">{row.TERRITORY}</div>
+                <div class="kpi-value" style="font-size:20px;">{row.revenue_label}</div>
+                <div class="kpi-delta delta-up">{row.margin_label} margin · {int(row.orders)} orders</div>
             </div>""", unsafe_allow_html=True)
 
 # ════════════════════════════════════════════════════════════
 # TAB 4 — TRENDS & YOY
 # ════════════════════════════════════════════════════════════
-with tab4:
+def render_trends():
     st.markdown('<div class="section-header">Year-over-Year Revenue Comparison</div>', unsafe_allow_html=True)
 
-    df_yoy = df_all.groupby(["YEAR_ID","MONTH_ID"])["SALES"].sum().reset_index()
-    df_yoy["MONTH_NAME"] = pd.to_datetime(df_yoy["MONTH_ID"], format="%m").dt.strftime("%b")
-
-    fig = go.Figure()
-    year_colors = {2003: ACCENT, 2004: TEAL, 2005: AMBER}
-    year_dashes = {2003: "solid", 2004: "dot", 2005: "dash"}
-
-    for year in sorted(df_yoy["YEAR_ID"].unique()):
-        d = df_yoy[df_yoy["YEAR_ID"] == year].sort_values("MONTH_ID")
-        fig.add_trace(go.Scatter(
-            x=d["MONTH_NAME"], y=d["SALES"],
-            name=str(year),
-            line=dict(color=year_colors.get(year, ACCENT), width=2.5, dash=year_dashes.get(year,"solid")),
-            mode="lines+markers",
-            marker=dict(size=6)
-        ))
-    chart_layout(fig, height=360)
-    st.plotly_chart(fig, use_container_width=True)
+    chart("trends.yoy")
 
     col1, col2 = st.columns(2)
 
     with col1:
         st.markdown('<div class="section-header">Annual Revenue Summary</div>', unsafe_allow_html=True)
-        df_annual = df_all.groupby("YEAR_ID").agg(
-            revenue=("SALES","sum"), profit=("PROFIT","sum"), orders=("ORDERNUMBER","count")
-        ).reset_index()
-        df_annual["growth"] = df_annual["revenue"].pct_change() * 100
-        df_annual["margin"] = df_annual["profit"] / df_annual["revenue"] * 100
-
-        fig = make_subplots(specs=[[{"secondary_y": True}]])
-        fig.add_trace(go.Bar(
-            x=df_annual["YEAR_ID"].astype(str), y=df_annual["revenue"],
-            name="Revenue", marker_color=[ACCENT, TEAL, AMBER],
-            text=df_annual["revenue"].apply(lambda x: f"${x/1e3:.0f}K"),
-            textposition="outside", textfont=dict(size=10)
-        ), secondary_y=False)
-        fig.add_trace(go.Scatter(
-            x=df_annual["YEAR_ID"].astype(str), y=df_annual["growth"],
-            name="Growth %", line=dict(color=GREEN, width=2.5),
-            mode="lines+markers", marker=dict(size=8, color=GREEN),
-            yaxis="y2"
-        ), secondary_y=True)
-        fig.update_layout(paper_bgcolor=PAPER_BG, plot_bgcolor=CHART_BG,
-                          font=dict(family="DM Sans", color=FONT_COLOR),
-                          height=320, margin=dict(l=16,r=16,t=48,b=16),
-                          legend=dict(bgcolor="rgba(0,0,0,0)"),
-                          xaxis=dict(gridcolor=GRID_COLOR),
-                          yaxis=dict(gridcolor=GRID_COLOR),
-                          yaxis2=dict(gridcolor="rgba(0,0,0,0)", ticksuffix="%"))
-        st.plotly_chart(fig, use_container_width=True)
+        chart("trends.annual")
 
     with col2:
         st.markdown('<div class="section-header">Monthly Seasonality Heatmap</div>', unsafe_allow_html=True)
-        df_heat = df_all.groupby(["YEAR_ID","MONTH_ID"])["SALES"].sum().reset_index()
-        df_pivot = df_heat.pivot(index="YEAR_ID", columns="MONTH_ID", values="SALES").fillna(0)
-        month_labels = ["Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"]
-        fig = go.Figure(go.Heatmap(
-            z=df_pivot.values,
-            x=[month_labels[i-1] for i in df_pivot.columns],
-            y=df_pivot.index.astype(str),
-            colorscale=[[0,"#0D1421"],[0.3,"#1E3A5F"],[0.7,ACCENT],[1,"#BEE3F8"]],
-            text=[[f"${v/1e3:.0f}K" for v in row] for row in df_pivot.values],
-            texttemplate="%{text}",
-            textfont=dict(size=10),
-            showscale=False
-        ))
-        chart_layout(fig, height=320)
-        st.plotly_chart(fig, use_container_width=True)
+        chart("trends.heatmap")
 
     # AI Insights
     st.markdown('<div class="section-header">📌 Analyst Insights</div>', unsafe_allow_html=True)
-    best_month_idx = df_all.groupby("MONTH_ID")["SALES"].sum().idxmax()
-    best_month_name = pd.to_datetime(str(best_month_idx), format="%m").strftime("%B")
-    best_year = int(df_all.groupby("YEAR_ID")["SALES"].sum().idxmax())
-    best_product = df_all.groupby("PRODUCTLINE")["SALES"].sum().idxmax()
+    best_month_name = all_time["best_month_name"]
+    best_year       = all_time["best_year"]
+    best_product    = all_time["best_product"]
 
     st.markdown(f"""
     <div class="insight-card success">
@@ -736,43 +591,39 @@ with tab4:
 # ════════════════════════════════════════════════════════════
 # TAB 5 — DEAL ANALYSIS
 # ════════════════════════════════════════════════════════════
-with tab5:
+def render_deals():
     col1, col2, col3 = st.columns(3)
 
-    df_deal_full = df.groupby("DEALSIZE").agg(
-        revenue=("SALES","sum"),
-        profit=("PROFIT","sum"),
-        orders=("ORDERNUMBER","count"),
-        avg_value=("SALES","mean"),
-        customers=("CUSTOMERNAME","nunique")
-    ).reset_index()
-
-    deal_colors = {"Small": ACCENT, "Medium": TEAL, "Large": AMBER}
+    df_deal_full = views["df_deal_full"]
 
-    for i, (_, row) in enumerate(df_deal_full.iterrows()):
+    cards = df_deal_full.assign(
+        revenue_label = fmt_thousands(df_deal_full["revenue"]),
+        avg_label     = fmt_currency(df_deal_full["avg_value"]),
+        margin_label  = fmt_percent(df_deal_full["profit"] / df_deal_full["revenue"] * 100, 1),
+    )
+    for i, row in enumerate(cards.itertuples(index=False)):
         with [col1, col2, col3][i % 3]:
-            margin = row["profit"] / row["revenue"] * 100
-            color  = deal_colors.get(row["DEALSIZE"], ACCENT)
+            color = DEAL_COLORS.get(row.DEALSIZE, ACCENT)
             st.markdown(f"""
             <div class="kpi-card" style="border-bottom: 3px solid {color}; margin-bottom: 16px;">
-                <div class="kpi-label">{row['DEALSIZE']} Deals</div>
-                <div class="kpi-value">${row['revenue']/1e3:.0f}K</div>
+                <div class="kpi-label">{row.DEALSIZE} Deals</div>
+                <div class="kpi-value">{row.revenue_label}</div>
                 <div style="margin-top:12px; display:grid; grid-template-columns:1fr 1fr; gap:8px;">
                     <div>
                         <div style="font-size:10px;color:#475569;">Orders</div>
-                        <div style="font-size:14px;font-weight:600;color:#CBD5E0;">{int(row['orders']):,}</div>
+                        <div style="font-size:14px;font-weight:600;color:#CBD5E0;">{int(row.orders):,}</div>
                     </div>
                     <div>
                         <div style="font-size:10px;color:#475569;">Avg Value</div>
-                        <div style="font-size:14px;font-weight:600;color:#CBD5E0;">${row['avg_value']:,.0f}</div>
+                        <div style="font-size:14px;font-weight:600;color:#CBD5E0;">{row.avg_label}</div>
                     </div>
                     <div>
                         <div style="font-size:10px;color:#475569;">Margin</div>
-                        <div style="font-size:14px;font-weight:600;color:{color};">{margin:.1f}%</div>
+                        <div style="font-size:14px;font-weight:600;color:{color};">{row.margin_label}</div>
                     </div>
                     <div>
                         <div style="font-size:10px;color:#475569;">Customers</div>
-                        <div style="font-size:14px;font-weight:600;color:#CBD5E0;">{int(row['customers'])}</div>
+                        <div style="font-size:14px;font-weight:600;color:#CBD5E0;">{int(row.customers)}</div>
                     </div>
                 </div>
             </div>""", unsafe_allow_html=True)
@@ -781,35 +632,34 @@ with tab5:
 
     with col1:
         st.markdown('<div class="section-header">Deal Size Mix by Year</div>', unsafe_allow_html=True)
-        df_deal_yr = df_all.groupby(["YEAR_ID","DEALSIZE"])["SALES"].sum().reset_index()
-        fig = px.bar(df_deal_yr, x="YEAR_ID", y="SALES", color="DEALSIZE",
-                     barmode="group",
-                     color_discrete_map=deal_colors,
-                     text_auto=False)
-        fig.update_traces(texttemplate="$%{y:.0f}", textposition="outside")
-        chart_layout(fig, height=340)
-        st.plotly_chart(fig, use_container_width=True)
+        chart("deals.by_year")
 
     with col2:
         st.markdown('<div class="section-header">Deal Size by Product Line</div>', unsafe_allow_html=True)
-        df_deal_prod = df.groupby(["PRODUCTLINE","DEALSIZE"])["SALES"].sum().reset_index()
-        fig = px.bar(df_deal_prod, x="PRODUCTLINE", y="SALES", color="DEALSIZE",
-                     barmode="stack", color_discrete_map=deal_colors)
-        fig.update_xaxes(tickangle=30, tickfont=dict(size=10))
-        chart_layout(fig, height=340)
-        st.plotly_chart(fig, use_container_width=True)
+        chart("deals.by_product")
 
     st.markdown('<div class="section-header">Deal Conversion Funnel</div>', unsafe_allow_html=True)
-    df_status = df.groupby("STATUS")["SALES"].sum().reset_index().sort_values("SALES", ascending=False)
-    fig = go.Figure(go.Funnel(
-        y=df_status["STATUS"],
-        x=df_status["SALES"],
-        textinfo="value+percent initial",
-        marker=dict(color=[ACCENT, TEAL, AMBER, GREEN, RED, PURPLE][:len(df_status)]),
-        textfont=dict(size=12)
-    ))
-    chart_layout(fig, height=320)
-    st.plotly_chart(fig, use_container_width=True)
+    chart("deals.funnel")
+
+# ── Tab bar ──────────────────────────────────────────────────
+# Only the selected tab is rendered, so a rerun builds one tab's
+# figures rather than all five (st.tabs builds every tab's content and
+# merely hides it). The selection is keyed widget state, read from
+# st.session_state before the views above were computed; clicking the
+# selected segment clears it, which falls back to the overview.
+TAB_RENDERERS = {
+    "overview": render_overview,
+    "products": render_products,
+    "regions":  render_regions,
+    "trends":   render_trends,
+    "deals":    render_deals,
+}
+
+st.segmented_control(
+    "Section", options=list(TAB_VIEWS), default=DEFAULT_TAB,
+    key="active_tab", label_visibility="collapsed"
+)
+TAB_RENDERERS[TAB_VIEWS[selected_tab]]()
 
 # ── Footer ───────────────────────────────────────────────────
 st.markdown("---")
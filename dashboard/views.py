@@ -0,0 +1,155 @@
+import pandas as pd
+from etl.snapshot import mapped_frame
+from dashboard.cube import build_cube, add_month_label
+from dashboard.planner import AggregationPlan
+from reports.formatting import fmt_currency, fmt_percent
+
+# ── Dashboard views over the sales cube ─────────────────────
+# The frames and KPI numbers the Streamlit dashboard charts, as plain
+# functions of (cube, filters). streamlit_app.py memoizes them per data
+# version; dashboard/warm.py calls them directly after an ETL load to
+# prebuild the default view's figures. Both dicts carry "scans", the
+# passes over the cube cells their AggregationPlan made.
+#
+# Maps only the columns the dashboard uses from the Arrow snapshot
+# (etl/snapshot.py); numeric columns are read-only views of the file.
+DASHBOARD_COLUMNS = ["SALES", "YEAR_ID", "MONTH_ID", "PRODUCTLINE", "DEALSIZE", "ORDERNUMBER",
+                     "CUSTOMERNAME", "COUNTRY", "TERRITORY", "STATUS"]
+
+def load_frame():
+    df = mapped_frame(DASHBOARD_COLUMNS)
+    df["PROFIT"] = df["SALES"] * 0.45
+    return df
+
+def load_cube():
+    return build_cube(load_frame())
+
+# Sidebar options; selecting all of them is the default view
+def filter_options(cube):
+    return {
+        "years":    sorted(cube.cells["YEAR_ID"].dropna().unique().astype(int).tolist()),
+        "products": sorted(cube.cells["PRODUCTLINE"].dropna().unique().tolist()),
+        "deals":    sorted(cube.cells["DEALSIZE"].dropna().unique().tolist()),
+    }
+
+# Sorted tuples, so the same selection made in any order (or in any
+# session) maps to the same cache key; empty selections mean "all".
+def filter_key(years, products, deals):
+    return tuple(sorted(years)), tuple(sorted(products)), tuple(sorted(deals))
+
+def default_filters(cube):
+    options = filter_options(cube)
+    return filter_key(options["years"], options["products"], options["deals"])
+
+# ── Tabs: the filtered groupings each one charts ────────────
+# Only the selected tab's groupings are computed, together with the
+# KPI totals every tab shows in the header.
+TABS = ["overview", "products", "regions", "trends", "deals"]
+
+TAB_GROUPINGS = {
+    "overview": {"monthly":      (["YEAR_ID","MONTH_ID"], ()),
+                 "deal":         (["DEALSIZE"], ())},
+    "products": {"product":      (["PRODUCTLINE"], ()),
+                 "product_time": (["YEAR_ID","MONTH_ID","PRODUCTLINE"], ())},
+    "regions":  {"country":      (["COUNTRY"], ()),
+                 "territory":    (["TERRITORY"], ())},
+    "trends":   {},  # unfiltered: served by all_time_views
+    "deals":    {"deal_full":    (["DEALSIZE"], ("customers",)),
+                 "deal_product": (["PRODUCTLINE","DEALSIZE"], ()),
+                 "status":       (["STATUS"], ())},
+}
+
+def tab_views(cube, filters, tab):
+    plan = AggregationPlan(cube, cube.select(*filters))
+    plan.add("totals", distinct=["customers", "orders_distinct"])
+    for name, (dims, distinct) in TAB_GROUPINGS[tab].items():
+        plan.add(name, dims, distinct)
+    frames = plan.run()
+
+    totals        = frames["totals"]
+    total_revenue = totals["sales"]
+    total_orders  = totals["orders_distinct"]
+    num_customers = totals["customers"]
+    views = {"scans": plan.scans, "kpis": {
+        "total_revenue": total_revenue,
+        "total_profit":  totals["profit"],
+        "profit_margin": (totals["profit"] / total_revenue * 100) if total_revenue > 0 else 0,
+        "total_orders":  total_orders,
+        "avg_order":     total_revenue / total_orders if total_orders > 0 else 0,
+        "num_customers": num_customers,
+        "cac":           round(500 / num_customers * 100, 2) if num_customers > 0 else 0,
+        "transactions":  totals["lines"],
+    }}
+
+    if tab == "overview":
+        df_cust = cube.top_customers(10, *filters).rename(columns={"sales":"revenue"})
+        df_cust["margin"] = (df_cust["profit"] / df_cust["revenue"] * 100).round(1)
+        df_cust["revenue_fmt"] = fmt_currency(df_cust["revenue"])
+        df_cust["profit_fmt"]  = fmt_currency(df_cust["profit"])
+        df_cust["margin_fmt"]  = fmt_percent(df_cust["margin"])
+        views["df_monthly"] = add_month_label(frames["monthly"]).rename(columns={"sales":"revenue"})
+        views["df_deal"]    = frames["deal"].rename(columns={"sales":"SALES"})
+        views["df_cust"]    = df_cust
+
+    elif tab == "products":
+        df_prod = frames["product"].rename(columns={"sales":"revenue"}).sort_values("revenue", ascending=True)
+        df_prod["margin"] = (df_prod["profit"] / df_prod["revenue"] * 100).round(1)
+        views["df_prod"] = df_prod
+        views["df_pt"]   = add_month_label(frames["product_time"]).rename(columns={"sales":"SALES"})
+
+    elif tab == "regions":
+        views["df_country"] = frames["country"].rename(columns={"sales":"revenue"}).sort_values("revenue", ascending=False)
+        views["df_terr"]    = frames["territory"].rename(columns={"sales":"revenue"})
+
+    elif tab == "deals":
+        df_deal_full = frames["deal_full"].rename(columns={"sales":"revenue"})
+        df_deal_full["avg_value"] = df_deal_full["revenue"] / df_deal_full["sales_n"]
+        views["df_deal_full"] = df_deal_full
+        views["df_deal_prod"] = frames["deal_product"].rename(columns={"sales":"SALES"})
+        views["df_status"]    = frames["status"].rename(columns={"sales":"SALES"}).sort_values("SALES", ascending=False)
+
+    return views
+
+# Unfiltered views: YoY, retention, trends and insights
+def all_time_views(cube):
+    plan = AggregationPlan(cube)
+    plan.add("by_year",    ["YEAR_ID"])
+    plan.add("annual",     ["YEAR_ID"])
+    plan.add("yoy",        ["YEAR_ID","MONTH_ID"])
+    plan.add("heat",       ["YEAR_ID","MONTH_ID"])
+    plan.add("by_month",   ["MONTH_ID"])
+    plan.add("by_product", ["PRODUCTLINE"])
+    plan.add("deal_year",  ["YEAR_ID","DEALSIZE"])
+    frames = plan.run()
+
+    rev_by_year = frames["by_year"].set_index("YEAR_ID")["sales"]
+    if len(rev_by_year) >= 2 and 2004 in rev_by_year and 2003 in rev_by_year:
+        yoy_growth = ((rev_by_year[2004] - rev_by_year[2003]) / rev_by_year[2003]) * 100
+    else:
+        yoy_growth = 0
+
+    retention = cube.retention(2004, 2005)
+
+    df_yoy = frames["yoy"].rename(columns={"sales":"SALES"})
+    df_yoy["MONTH_NAME"] = pd.to_datetime(df_yoy["MONTH_ID"], format="%m").dt.strftime("%b")
+
+    df_annual = frames["annual"].rename(columns={"sales":"revenue"})
+    df_annual["growth"] = df_annual["revenue"].pct_change() * 100
+    df_annual["margin"] = df_annual["profit"] / df_annual["revenue"] * 100
+
+    df_heat  = frames["heat"].rename(columns={"sales":"SALES"})
+    df_pivot = df_heat.pivot(index="YEAR_ID", columns="MONTH_ID", values="SALES").fillna(0)
+
+    best_month_idx = frames["by_month"].set_index("MONTH_ID")["sales"].idxmax()
+    return {
+        "scans":           plan.scans,
+        "yoy_growth":      yoy_growth,
+        "retention":       retention,
+        "df_yoy":          df_yoy,
+        "df_annual":       df_annual,
+        "df_pivot":        df_pivot,
+        "best_month_name": pd.to_datetime(str(best_month_idx), format="%m").strftime("%B"),
+        "best_year":       int(rev_by_year.idxmax()),
+        "best_product":    frames["by_product"].set_index("PRODUCTLINE")["sales"].idxmax(),
+        "df_deal_yr":      frames["deal_year"].rename(columns={"sales":"SALES"}),
+    }
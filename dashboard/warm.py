@@ -0,0 +1,61 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+from etl.snapshot import ensure_snapshot
+from etl.transform import get_kpi_snapshot
+from dashboard.data_service import content_version
+from dashboard.figure_cache import put_figure
+from dashboard.figures import DASH_FIGURES, STREAMLIT_FIGURES
+from dashboard.views import load_cube, default_filters, tab_views, all_time_views
+
+# ── Figure cache warm-up ────────────────────────────────────
+# Called by the loaders once a load has committed and the caches were
+# invalidated (etl/import_to_sql.py, etl/embedded.py), or by hand:
+#
+#   python dashboard/warm.py
+#
+# Builds every Dash figure for the new KPI snapshot and every Streamlit
+# figure for the default (unfiltered) view of the new Arrow snapshot,
+# and stores their JSON in the shared figure cache, so the first
+# viewers after a load are served prebuilt figures. Other filter
+# selections are built on first use and shared from then on.
+def warm_dash():
+    snapshot = get_kpi_snapshot()
+    version  = content_version(snapshot)
+    for figure_id, build in DASH_FIGURES.items():
+        put_figure(figure_id, build(snapshot), version=version)
+    return len(DASH_FIGURES)
+
+def warm_streamlit():
+    version  = ensure_snapshot()
+    cube     = load_cube()
+    filters  = default_filters(cube)
+    all_time = all_time_views(cube)
+    views    = {}
+    for figure_id, (build, filtered) in STREAMLIT_FIGURES.items():
+        tab = figure_id.split(".")[0]
+        if tab not in views:
+            views[tab] = tab_views(cube, filters, tab)
+        put_figure(figure_id, build(views[tab], all_time),
+                   filters=filters if filtered else (), version=version)
+    return len(STREAMLIT_FIGURES)
+
+WARMERS = {"Dash": warm_dash, "Streamlit": warm_streamlit}
+
+# A failed warm-up never fails the load: the figures are then simply
+# built on first view.
+def warm_figures():
+    started = time.perf_counter()
+    built   = 0
+    for name, warm in WARMERS.items():
+        try:
+            built += warm()
+        except Exception as e:
+            print(f"⚠️  Skipped warming the {name} figures: {e}")
+    print(f"🔥 {built} dashboard figures prebuilt in {time.perf_counter() - started:.1f}s")
+    return built
+
+if __name__ == "__main__":
+    warm_figures()
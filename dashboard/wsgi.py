@@ -0,0 +1,43 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+from etl.settings import get_setting
+from dashboard.app import app
+
+# ── Production entry point for the Dash dashboard ───────────
+# `server` is the Flask WSGI app behind Dash:
+#
+#   waitress (Windows / Linux, threads):
+#       python dashboard/wsgi.py
+#   gunicorn (Linux, worker processes):
+#       gunicorn "dashboard.wsgi:server" --workers 4 --threads 4 --bind 0.0.0.0:8050
+#
+# Workers share the KPI snapshot and figure JSON through the SQLite
+# result cache (cache.backend: sqlite), and a miss is computed by one
+# worker while the others wait for it, so adding workers does not add
+# database load.
+server = app.server
+
+HOST    = get_setting("dashboard", "host", "127.0.0.1")
+PORT    = get_setting("dashboard", "port", 8050)
+THREADS = get_setting("dashboard", "threads", 8)
+
+def serve(host=HOST, port=PORT, threads=THREADS):
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        raise RuntimeError("The production server needs: pip install waitress")
+    if get_setting("cache", "backend", "sqlite") == "memory":
+        print("⚠️  cache.backend is 'memory': results are not shared between worker processes")
+    print(f"🌐 Serving dashboard on http://{host}:{port} ({threads} threads)")
+    waitress_serve(server, host=host, port=port, threads=threads)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the Dash dashboard with waitress")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--threads", type=int, default=THREADS)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.threads)
@@ -0,0 +1,58 @@
+import os
+from etl.settings import get_setting
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# ── Storage backends ────────────────────────────────────────
+# mssql is the production SQL Server. sqlite and duckdb are embedded
+# files loaded from the CSV by etl/embedded.py, so the KPI engine can
+# run on Linux workers without an ODBC server. duckdb needs the
+# optional `duckdb` and `duckdb-engine` packages.
+BACKENDS = ["mssql", "sqlite", "duckdb"]
+
+EMBEDDED_PATHS = {
+    "sqlite": "data/kpi.sqlite",
+    "duckdb": "data/kpi.duckdb",
+}
+
+# Raw sales rows: written by the loaders (etl/import_to_sql.py,
+# etl/embedded.py), read by every KPI query
+SALES_TABLE = get_setting("database", "table", "sales")
+
+def get_backend():
+    backend = get_setting("database", "backend", "mssql")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown database backend '{backend}'. Choose from: {', '.join(BACKENDS)}")
+    return backend
+
+def embedded_path(backend):
+    return os.path.join(ROOT_DIR, get_setting("database", f"{backend}_path", EMBEDDED_PATHS[backend]))
+
+def require_duckdb():
+    try:
+        import duckdb
+        import duckdb_engine
+    except ImportError:
+        raise RuntimeError("The duckdb backend needs: pip install duckdb duckdb-engine")
+    return duckdb
+
+def database_url(backend=None):
+    backend = backend or get_backend()
+    if backend == "mssql":
+        return get_setting("database", "url", env="DB_URL")
+    if backend == "duckdb":
+        require_duckdb()
+    return f"{backend}:///{embedded_path(backend)}"
+
+# ── Dialect-specific SQL fragments ──────────────────────────
+# KPI query templates use {top} / {limit} for "first N rows", which
+# T-SQL spells `SELECT TOP n` and everything else `LIMIT n`.
+# `grouping_sets`: whether GROUP BY GROUPING SETS is available.
+DIALECTS = {
+    "mssql":  {"top": "TOP 10", "limit": "",         "grouping_sets": True},
+    "sqlite": {"top": "",       "limit": "LIMIT 10", "grouping_sets": False},
+    "duckdb": {"top": "",       "limit": "LIMIT 10", "grouping_sets": True},
+}
+
+def sql_fragments(dialect):
+    return DIALECTS.get(dialect, DIALECTS["sqlite"])
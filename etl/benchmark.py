@@ -0,0 +1,76 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+import argparse
+import statistics
+import pandas as pd
+from etl.backends import BACKENDS, embedded_path
+from etl.embedded import load_csv
+from etl.transform import (dispose_engine, query_kpi_snapshot, _query_kpi,
+                           KPI_QUERIES, KPI_SOURCES)
+
+# ── KPI engine benchmark across storage backends ────────────
+# Times the full snapshot and every per-KPI query against the raw
+# table, bypassing the result cache and the running KPI state (also for
+# the KPIs approx mode reads from sketches), and reports the median. A
+# missing embedded file is loaded without bumping the data version, so
+# a benchmark run never clears the shared cache.
+def _median_ms(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 2)
+
+def benchmark_backend(backend, repeats=5):
+    raw     = KPI_SOURCES["raw"]
+    queries = {"kpi_snapshot": lambda: query_kpi_snapshot(raw)}
+    queries.update({name: (lambda name=name: _query_kpi(name, 60, raw)) for name in KPI_QUERIES})
+
+    previous = os.environ.get("DATABASE_BACKEND")
+    os.environ["DATABASE_BACKEND"] = backend
+    dispose_engine()
+    try:
+        if backend != "mssql" and not os.path.exists(embedded_path(backend)):
+            load_csv(backend, invalidate=False)
+        timings = {}
+        for name, fn in queries.items():
+            fn()  # warm-up: connection, page cache, plan cache
+            timings[name] = _median_ms(fn, repeats)
+        return timings
+    finally:
+        dispose_engine()
+        if previous is None:
+            os.environ.pop("DATABASE_BACKEND", None)
+        else:
+            os.environ["DATABASE_BACKEND"] = previous
+
+def run_benchmark(backends, repeats=5):
+    results, errors = {}, {}
+    for backend in backends:
+        print(f"⏱️  Benchmarking {backend}...")
+        try:
+            results[backend] = benchmark_backend(backend, repeats)
+        except Exception as e:
+            errors[backend] = e
+            print(f"   ❌ {backend} skipped: {e}")
+    return pd.DataFrame(results), errors
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare KPI query times across storage backends")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["sqlite", "duckdb"])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    table, errors = run_benchmark(args.backends, args.repeats)
+    if table.empty:
+        sys.exit(1)
+
+    print("\n📊 Median query time (ms)")
+    print(table.to_string())
+    totals = table.sum()
+    print(f"\n🏆 Fastest backend: {totals.idxmin()} "
+          f"({totals.min():,.1f} ms for all KPI queries, {table.loc['kpi_snapshot', totals.idxmin()]:,.1f} ms snapshot)")
@@ -0,0 +1,296 @@
+import os
+import time
+import uuid
+import pickle
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from etl.settings import get_setting
+from etl.sketches import SKETCH_MODE
+
+ROOT_DIR  = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_DIR = os.path.join(ROOT_DIR, get_setting("cache", "dir", "data/cache"))
+
+VERSION_FILE = os.path.join(CACHE_DIR, "data_version")
+
+# ── Data version ────────────────────────────────────────────
+# Bumped by the import pipeline after every load. It is part of every
+# cache key, so a new load makes all older entries unreachable, in
+# this process and in every other process sharing the cache dir.
+def get_data_version():
+    try:
+        with open(VERSION_FILE, encoding="utf-8") as f:
+            return f.read().strip() or "0"
+    except FileNotFoundError:
+        return "0"
+
+def bump_data_version():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    version = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    tmp     = f"{VERSION_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp, VERSION_FILE)
+    return version
+
+# ── In-process backend: LRU dict with per-entry expiry ──────
+class MemoryBackend:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.evictions   = 0
+        self._entries    = OrderedDict()
+        self._leases     = {}
+        self._lock       = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self, prefix=""):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def acquire(self, key, ttl):
+        with self._lock:
+            now = time.time()
+            if self._leases.get(key, 0) > now:
+                return False
+            self._leases[key] = now + ttl
+            return True
+
+    def release(self, key):
+        with self._lock:
+            self._leases.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+# ── On-disk backend: SQLite file shared between processes ───
+class SqliteBackend:
+    def __init__(self, path, max_entries):
+        self.path        = path
+        self.max_entries = max_entries
+        self.evictions   = 0
+        self._local      = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key         TEXT PRIMARY KEY,
+                    value       BLOB,
+                    expires_at  REAL,
+                    last_access REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_leases (
+                    key         TEXT PRIMARY KEY,
+                    expires_at  REAL
+                )
+            """)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        row  = conn.execute(
+            "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return False, None
+        now = time.time()
+        with conn:
+            if row[1] < now:
+                conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                return False, None
+            conn.execute("UPDATE cache_entries SET last_access = ? WHERE key = ?", (now, key))
+        try:
+            return True, pickle.loads(row[0])
+        except Exception:
+            # Written by code that no longer unpickles here (e.g. a class
+            # pickled under __main__): treat it as a miss and recompute.
+            return False, None
+
+    def set(self, key, value, ttl):
+        conn = self._conn()
+        now  = time.time()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?)",
+                (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now + ttl, now)
+            )
+            conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (now,))
+            evicted = conn.execute("""
+                DELETE FROM cache_entries WHERE key IN (
+                    SELECT key FROM cache_entries
+                    ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,)).rowcount
+        self.evictions += max(evicted, 0)
+
+    def clear(self, prefix=""):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM cache_entries WHERE key LIKE ?", (prefix + "%",))
+
+    # A lease row marks "being computed" for every process sharing the
+    # file; an expired lease (holder crashed or hung) can be taken over.
+    def acquire(self, key, ttl):
+        conn = self._conn()
+        now  = time.time()
+        with conn:
+            conn.execute("DELETE FROM cache_leases WHERE key = ? AND expires_at < ?", (key, now))
+            return conn.execute("INSERT OR IGNORE INTO cache_leases VALUES (?, ?)",
+                                (key, now + ttl)).rowcount == 1
+
+    def release(self, key):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM cache_leases WHERE key = ?", (key,))
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+# ── Result cache ────────────────────────────────────────────
+# Keys are (namespace, name, data version, params).
+#
+# A miss is computed once: the first caller takes a lease on the key
+# and computes, while every other thread or process sharing the
+# backend waits for its result instead of running the same query.
+class ResultCache:
+    def __init__(self, namespace, backend=None, ttl=None, enabled=None, lease=None):
+        self.namespace = namespace
+        self.ttl       = ttl if ttl is not None else get_setting("cache", "ttl_seconds", 900)
+        self.enabled   = enabled if enabled is not None else get_setting("cache", "enabled", True)
+        self.lease     = lease if lease is not None else get_setting("cache", "lease_seconds", 120)
+        self._backend  = backend
+        self._lock     = threading.Lock()
+        self._stats    = {"hits": 0, "misses": 0, "sets": 0, "waits": 0}
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = _make_backend()
+        return self._backend
+
+    # The sketch mode is part of every key: exact and approximate
+    # results of the same data version are never served for each other
+    def make_key(self, name, params=()):
+        digest = hashlib.sha1(repr(params).encode("utf-8")).hexdigest()[:16]
+        return f"{self.namespace}:{name}:{SKETCH_MODE}:{get_data_version()}:{digest}"
+
+    def get(self, name, params=()):
+        found, value = self.backend.get(self.make_key(name, params))
+        with self._lock:
+            self._stats["hits" if found else "misses"] += 1
+        return found, value
+
+    def set(self, name, value, params=()):
+        self.backend.set(self.make_key(name, params), value, self.ttl)
+        with self._lock:
+            self._stats["sets"] += 1
+
+    def get_or_compute(self, name, compute, params=()):
+        if not self.enabled:
+            return compute()
+        found, value = self.get(name, params)
+        if found:
+            return value
+
+        key = self.make_key(name, params)
+        while not self.backend.acquire(key, self.lease):
+            with self._lock:
+                self._stats["waits"] += 1
+            time.sleep(0.1)
+            found, value = self.backend.get(key)
+            if found:
+                return value
+        try:
+            value = compute()
+            self.set(name, value, params)
+        finally:
+            self.backend.release(key)
+        return value
+
+    def cached(self, name):
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                params = (args, tuple(sorted(kwargs.items())))
+                return self.get_or_compute(name, lambda: fn(*args, **kwargs), params)
+            return wrapper
+        return decorator
+
+    def clear(self):
+        self.backend.clear(f"{self.namespace}:")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"]  = round(stats["hits"] / lookups, 3) if lookups else 0
+        stats["evictions"] = self.backend.evictions
+        stats["entries"]   = len(self.backend)
+        return stats
+
+def _make_backend():
+    max_entries = get_setting("cache", "max_entries", 256)
+    if get_setting("cache", "backend", "sqlite") == "memory":
+        return MemoryBackend(max_entries)
+    path = os.path.join(ROOT_DIR, get_setting("cache", "path", "data/cache/kpi_cache.db"))
+    return SqliteBackend(path, max_entries)
+
+_caches = {}
+
+# Options apply when the namespace is first created
+def get_cache(namespace="kpi", ttl=None):
+    if namespace not in _caches:
+        _caches[namespace] = ResultCache(namespace, ttl=ttl)
+    return _caches[namespace]
+
+def get_cache_stats():
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+# ── Called by the import pipeline once a load has committed ─
+def invalidate_all():
+    version = bump_data_version()
+    get_cache().backend.clear()
+    for cache in _caches.values():
+        cache.clear()
+    return version
+
+# Prebuilds the dashboard figures for the new data. Imported here, not
+# at module load, so the loaders never need plotly; if the dashboard
+# cannot be imported the figures are simply built on first view.
+def warm_dashboard():
+    try:
+        from dashboard.warm import warm_figures
+    except Exception as e:
+        print(f"⚠️  Dashboard figures not prebuilt, dashboard.warm unavailable: {e}")
+        return 0
+    return warm_figures()
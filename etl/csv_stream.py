@@ -0,0 +1,42 @@
+import os
+import pandas as pd
+from etl.settings import get_setting
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CSV_PATH = os.path.join(ROOT_DIR, get_setting("loader", "csv_path", "data/sales_data_sample.csv"))
+
+MEMORY_BUDGET_MB = get_setting("loader", "memory_budget_mb", 256)
+
+# ── Batch size from a peak-memory budget ────────────────────
+# Samples the head of the file to estimate in-memory bytes per row.
+# `copies` is how many versions of a batch the consumer holds at once
+# (raw strings, cleaned frame, parameter tuples, ...).
+def rows_for_budget(path, budget_mb=None, usecols=None, copies=4, encoding="latin1"):
+    budget_mb = budget_mb or MEMORY_BUDGET_MB
+    sample    = pd.read_csv(path, encoding=encoding, dtype=str, usecols=usecols, nrows=1000)
+    per_row   = sample.memory_usage(deep=True, index=False).sum() / max(len(sample), 1)
+    return max(1000, int(budget_mb * 1024 * 1024 / (per_row * copies)))
+
+# ── Stream a CSV as fixed-size DataFrame batches ────────────
+# `offset` starts reading at that byte (the start of a line) instead of
+# after the header, e.g. to read only rows appended since a known size.
+def iter_csv_batches(path, batch_rows=None, usecols=None, dtype=str,
+                     encoding="latin1", progress=True, copies=4, offset=0):
+    batch_rows = batch_rows or get_setting("loader", "batch_rows", 0) or \
+                 rows_for_budget(path, usecols=usecols, copies=copies, encoding=encoding)
+    total_bytes = os.path.getsize(path)
+    rows_read   = 0
+    header      = {}
+    if offset:
+        header = {"header": None, "names": pd.read_csv(path, encoding=encoding, nrows=0).columns}
+
+    with open(path, "rb") as fh:
+        fh.seek(offset)
+        reader = pd.read_csv(fh, encoding=encoding, dtype=dtype, usecols=usecols, chunksize=batch_rows, **header)
+        for batch in reader:
+            batch.columns = batch.columns.str.strip()
+            rows_read += len(batch)
+            if progress:
+                pct = min(fh.tell() / total_bytes * 100, 100) if total_bytes else 100
+                print(f"   ⏳ {rows_read:,} rows read ({pct:.0f}%)")
+            yield batch
@@ -0,0 +1,84 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+import argparse
+import sqlite3
+from etl.backends import get_backend, embedded_path, require_duckdb
+from etl.csv_stream import CSV_PATH, iter_csv_batches
+from etl.schema import KPI_TABLE, COLUMNS, clean_frame, index_ddl
+from etl.transform import dispose_engine
+from etl.cache import invalidate_all, warm_dashboard
+from etl.incremental import rebuild_db_state
+
+# ── CSV → embedded database ─────────────────────────────────
+# Each loader builds a fresh file next to the target and renames it
+# into place, so readers never open a half-loaded database.
+def load_sqlite(path, target):
+    conn = sqlite3.connect(target)
+    rows = 0
+    for batch in iter_csv_batches(path):
+        batch = clean_frame(batch)[COLUMNS]
+        batch.to_sql(KPI_TABLE, conn, if_exists="append", index=False)
+        rows += len(batch)
+    for _, sql in index_ddl("sqlite", KPI_TABLE):
+        conn.execute(sql)
+    conn.commit()
+    conn.close()
+    return rows
+
+def load_duckdb(path, target):
+    duckdb = require_duckdb()
+    conn   = duckdb.connect(target)
+    rows   = 0
+    for batch in iter_csv_batches(path):
+        batch = clean_frame(batch)[COLUMNS]
+        conn.register("csv_batch", batch)
+        conn.execute(f"CREATE TABLE {KPI_TABLE} AS SELECT * FROM csv_batch" if rows == 0
+                     else f"INSERT INTO {KPI_TABLE} SELECT * FROM csv_batch")
+        conn.unregister("csv_batch")
+        rows += len(batch)
+    conn.close()
+    return rows
+
+LOADERS = {"sqlite": load_sqlite, "duckdb": load_duckdb}
+
+# invalidate=False leaves the data version (and so the shared result
+# cache) alone, for loads no cached result was computed from
+def load_csv(backend=None, path=CSV_PATH, invalidate=True):
+    backend = backend or get_backend()
+    if backend not in LOADERS:
+        raise ValueError(f"{backend} is not an embedded backend; load SQL Server with etl/import_to_sql.py")
+
+    target = embedded_path(backend)
+    tmp    = f"{target}.{os.getpid()}.tmp"
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    rows = LOADERS[backend](path, tmp)
+    dispose_engine()
+    os.replace(tmp, target)
+    if invalidate:
+        invalidate_all()
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load the sales CSV into an embedded SQLite or DuckDB file")
+    parser.add_argument("--backend", choices=list(LOADERS), default=None,
+                        help="defaults to database.backend in config/config.yaml")
+    parser.add_argument("--csv", default=CSV_PATH)
+    args = parser.parse_args()
+
+    backend = args.backend or get_backend()
+    started = time.perf_counter()
+    rows    = load_csv(backend, args.csv)
+    print(f"✅ Loaded {rows:,} rows into {embedded_path(backend)} ({backend}) "
+          f"in {time.perf_counter() - started:.1f}s")
+    try:
+        rebuild_db_state()
+        print("🧮 Running KPI state rebuilt")
+    except Exception as e:
+        print(f"⚠️  Running KPI state not rebuilt, KPIs use full queries until the next load: {e}")
+    warm_dashboard()
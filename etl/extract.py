@@ -38,6 +38,13 @@ CREATE TABLE IF NOT EXISTS customers (
 )
 """)
 
+# ── Indexes for the date / product / region / salesperson rollups ──
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_date ON sales (date, revenue, profit)")
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_product ON sales (product, revenue, profit)")
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_region ON sales (region, revenue, profit)")
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_salesperson ON sales (salesperson, revenue)")
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_customers_active ON customers (is_active, acquisition_cost)")
+
 # ── Generate Dummy Data ─────────────────────────────────────
 products    = ["Product A", "Product B", "Product C", "Product D"]
 regions     = ["North", "South", "East", "West"]
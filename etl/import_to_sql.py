@@ -1,126 +1,636 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+import hashlib
+import argparse
 import pandas as pd
 import pyodbc
-import numpy as np
+from etl.cache import invalidate_all, get_data_version, warm_dashboard
+from etl.settings import get_setting
+from etl.backends import SALES_TABLE
+from etl.csv_stream import CSV_PATH, iter_csv_batches
+from etl.schema import COLUMNS, INT_COLUMNS, FLOAT_COLUMNS, clean_frame, index_ddl
+from etl.snapshot import build_snapshot
+from etl.incremental import ROW_COLUMNS, deltas_from_rows, update_db_state
 
-# ── Load CSV ────────────────────────────────────────────────
-df = pd.read_csv(
-    r"C:\Users\USER\Desktop\Data Analysis Tutorial\kpi-reporting-system\data\sales_data_sample.csv",
-    encoding="latin1",
-    dtype=str
+CONNECTION_STRING = get_setting(
+    "loader", "connection_string",
+    "DRIVER={ODBC Driver 17 for SQL Server};"
+    "SERVER=DESKTOP-FHDJ2FC\\SQLEXPRESS;"
+    "DATABASE=sales_db;"
+    "Trusted_Connection=yes;"
 )
+CHUNK_SIZE = get_setting("loader", "chunk_size", 5000)
 
-df.columns = df.columns.str.strip()
-df = df.apply(lambda col: col.str.strip() if col.dtype == "object" else col)
+KEY_COLUMNS  = ["ORDERNUMBER", "ORDERLINENUMBER"]
+LOAD_COLUMNS = COLUMNS + ["ROW_HASH"]
 
-# ── Force ALL NaN/None/empty to Python None ─────────────────
-def clean(val):
-    if val is None:
-        return None
-    if isinstance(val, float) and np.isnan(val):
-        return None
-    s = str(val).strip()
-    if s.lower() in ("nan", "none", "null", ""):
-        return None
-    return s
+def insert_sql(table, columns=LOAD_COLUMNS):
+    return f"""
+        INSERT INTO {table} ({", ".join(columns)})
+        VALUES ({",".join("?" * len(columns))})
+    """
 
-for col in df.columns:
-    df[col] = df[col].apply(clean)
+# ── Change detection ────────────────────────────────────────
+# ROW_HASH is a 64-bit hash of every cleaned column, stored with each
+# row so an incremental load can tell unchanged rows from edited ones.
+def add_row_hashes(df):
+    df["ROW_HASH"] = pd.util.hash_pandas_object(df[COLUMNS], index=False).to_numpy().view("int64")
+    return df
 
-def to_int(val):
-    try:
-        return int(float(val)) if val is not None else None
-    except:
-        return None
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
-def to_float(val):
-    try:
-        return float(val) if val is not None else None
-    except:
-        return None
+# DataFrame → list of parameter tuples with Python None for NULL
+def to_params(df, columns=LOAD_COLUMNS):
+    df = df[columns]
+    return df.astype(object).where(df.notna(), None).to_numpy().tolist()
 
-print(f"✅ CSV loaded and cleaned: {len(df)} rows")
+# ── KPI aggregate tables ────────────────────────────────────
+# Summaries of the sales table that etl/transform.py reads instead of
+# the raw rows: daily and monthly grain by product line, country and
+# customer, with the number of rows behind each group (`lines`). They
+# change in the same transaction as the rows, and sales_agg_meta
+# records the id of the load they reflect; readers fall back to the raw
+# table unless it is the latest load id.
+AGG_KEYS     = ["YEAR_ID", "MONTH_ID", "PRODUCTLINE", "COUNTRY", "CUSTOMERNAME"]
+AGG_MEASURES = ["revenue", "orders", "lines"]
 
-# ── Connect ──────────────────────────────────────────────────
-conn = pyodbc.connect(
-    "DRIVER={ODBC Driver 17 for SQL Server};"
-    "SERVER=DESKTOP-FHDJ2FC\\SQLEXPRESS;"
-    "DATABASE=sales_db;"
-    "Trusted_Connection=yes;"
-)
-cursor = conn.cursor()
+AGG_DDL = [
+    "IF COL_LENGTH('sales_agg_meta', 'load_id') IS NULL AND OBJECT_ID('sales_agg_meta', 'U') IS NOT NULL "
+    "DROP TABLE sales_agg_meta",
+    # Tables from before `lines` are dropped and rebuilt by the next load
+    """
+    IF OBJECT_ID('sales_daily_agg', 'U') IS NOT NULL AND COL_LENGTH('sales_daily_agg', 'lines') IS NULL
+    BEGIN
+        DROP TABLE sales_daily_agg
+        IF OBJECT_ID('sales_monthly_agg', 'U') IS NOT NULL DROP TABLE sales_monthly_agg
+        IF OBJECT_ID('sales_agg_meta', 'U') IS NOT NULL DELETE FROM sales_agg_meta
+    END
+    """,
+    """
+    IF OBJECT_ID('sales_agg_meta', 'U') IS NULL
+    CREATE TABLE sales_agg_meta (
+        built_at DATETIME2,
+        load_id  INT
+    )
+    """,
+]
 
-cursor.execute("DELETE FROM sales")
-conn.commit()
-print("🗑️  Cleared existing table data")
+# {daily} / {monthly} are the live tables, or their staging copies
+# during a full reload
+AGG_TABLE_DDL = [
+    """
+    IF OBJECT_ID('{daily}', 'U') IS NULL
+    CREATE TABLE {daily} (
+        ORDER_DAY    DATE,
+        YEAR_ID      INT,
+        MONTH_ID     INT,
+        PRODUCTLINE  NVARCHAR(255),
+        COUNTRY      NVARCHAR(255),
+        CUSTOMERNAME NVARCHAR(255),
+        revenue      FLOAT,
+        orders       INT,
+        lines        INT
+    )
+    """,
+    """
+    IF OBJECT_ID('{monthly}', 'U') IS NULL
+    CREATE TABLE {monthly} (
+        YEAR_ID      INT,
+        MONTH_ID     INT,
+        PRODUCTLINE  NVARCHAR(255),
+        COUNTRY      NVARCHAR(255),
+        CUSTOMERNAME NVARCHAR(255),
+        revenue      FLOAT,
+        orders       INT,
+        lines        INT
+    )
+    """,
+]
 
-# ── Insert Rows ──────────────────────────────────────────────
-inserted  = 0
-errors    = 0
-error_log = []
+AGG_REFRESH = [
+    "DELETE FROM {daily}",
+    """
+    INSERT INTO {daily}
+    SELECT
+        CAST(TRY_CONVERT(DATETIME, ORDERDATE) AS DATE),
+        YEAR_ID, MONTH_ID, PRODUCTLINE, COUNTRY, CUSTOMERNAME,
+        SUM(SALES), COUNT(ORDERNUMBER), COUNT(*)
+    FROM {source}
+    GROUP BY CAST(TRY_CONVERT(DATETIME, ORDERDATE) AS DATE),
+             YEAR_ID, MONTH_ID, PRODUCTLINE, COUNTRY, CUSTOMERNAME
+    """,
+    "DELETE FROM {monthly}",
+    """
+    INSERT INTO {monthly}
+    SELECT YEAR_ID, MONTH_ID, PRODUCTLINE, COUNTRY, CUSTOMERNAME,
+           SUM(revenue), SUM(orders), SUM(lines)
+    FROM {daily}
+    GROUP BY YEAR_ID, MONTH_ID, PRODUCTLINE, COUNTRY, CUSTOMERNAME
+    """,
+]
 
-for idx, row in df.iterrows():
-    try:
-        cursor.execute("""
-            INSERT INTO sales (
-                ORDERNUMBER, QUANTITYORDERED, PRICEEACH, ORDERLINENUMBER,
-                SALES, ORDERDATE, STATUS, QTR_ID, MONTH_ID, YEAR_ID,
-                PRODUCTLINE, MSRP, PRODUCTCODE, CUSTOMERNAME, PHONE,
-                ADDRESSLINE1, ADDRESSLINE2, CITY, STATE, POSTALCODE,
-                COUNTRY, TERRITORY, CONTACTLASTNAME, CONTACTFIRSTNAME, DEALSIZE
-            ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-        """,
-            to_int(row["ORDERNUMBER"]),
-            to_int(row["QUANTITYORDERED"]),
-            to_float(row["PRICEEACH"]),
-            to_int(row["ORDERLINENUMBER"]),
-            to_float(row["SALES"]),
-            row["ORDERDATE"],
-            row["STATUS"],
-            to_int(row["QTR_ID"]),
-            to_int(row["MONTH_ID"]),
-            to_int(row["YEAR_ID"]),
-            row["PRODUCTLINE"],
-            to_int(row["MSRP"]),
-            row["PRODUCTCODE"],
-            row["CUSTOMERNAME"],
-            row["PHONE"],
-            row["ADDRESSLINE1"],
-            row["ADDRESSLINE2"],
-            row["CITY"],
-            row["STATE"],
-            row["POSTALCODE"],
-            row["COUNTRY"],
-            row["TERRITORY"],
-            row["CONTACTLASTNAME"],
-            row["CONTACTFIRSTNAME"],
-            row["DEALSIZE"]
-        )
-        inserted += 1
-
-        if inserted % 200 == 0:
+def agg_tables(suffix=""):
+    return {"daily": f"sales_daily_agg{suffix}", "monthly": f"sales_monthly_agg{suffix}"}
+
+def agg_table_ddl(suffix=""):
+    return [sql.format(**agg_tables(suffix)) for sql in AGG_TABLE_DDL]
+
+# Runs inside the caller's transaction, so readers see either the old
+# or the new aggregates, never a half-built table. A full reload builds
+# staging copies (`suffix`) from its staging table and swaps them in
+# with it.
+def build_aggregates(cursor, source=SALES_TABLE, suffix=""):
+    for sql in agg_table_ddl(suffix) + AGG_REFRESH:
+        cursor.execute(sql.format(source=source, **agg_tables(suffix)))
+
+# ── Aggregate deltas from the MERGE output ──────────────────
+# An incremental load only touches the groups of the rows it wrote:
+# #merge_out holds the new values of every inserted or updated row and
+# the old values of every updated one, which are summed into signed
+# per-group deltas (+new, -old) and merged into both aggregate tables.
+# Groups whose `lines` drop to zero are removed, so the tables match a
+# full rebuild. Keys are compared NULL-safely (EXISTS … INTERSECT).
+def _delta_rows(prefix, sign, where=""):
+    return f"""
+        SELECT {sign} AS sign,
+               CAST(TRY_CONVERT(DATETIME, {prefix}ORDERDATE) AS DATE) AS ORDER_DAY,
+               {", ".join(f"{prefix}{c} AS {c}" for c in AGG_KEYS)},
+               {prefix}SALES AS SALES, {prefix}ORDERNUMBER AS ORDERNUMBER
+        FROM #merge_out {where}
+    """
+
+AGG_DELTA_SQL = f"""
+    SELECT ORDER_DAY, {", ".join(AGG_KEYS)},
+           SUM(sign * SALES) AS revenue,
+           SUM(CASE WHEN ORDERNUMBER IS NOT NULL THEN sign ELSE 0 END) AS orders,
+           SUM(sign) AS lines
+    INTO #agg_delta
+    FROM ({_delta_rows("new_", 1)}
+          UNION ALL
+          {_delta_rows("old_", -1, "WHERE merge_action = 'UPDATE'")}) d
+    GROUP BY ORDER_DAY, {", ".join(AGG_KEYS)}
+"""
+
+def _apply_delta_sql(table, keys, source):
+    return [f"""
+        MERGE {table} AS a
+        USING ({source}) AS d
+           ON EXISTS (SELECT {", ".join(f"a.{c}" for c in keys)}
+                      INTERSECT
+                      SELECT {", ".join(f"d.{c}" for c in keys)})
+        WHEN MATCHED THEN
+            UPDATE SET revenue = COALESCE(a.revenue, 0) + COALESCE(d.revenue, 0),
+                       orders  = a.orders + d.orders,
+                       lines   = a.lines + d.lines
+        WHEN NOT MATCHED BY TARGET THEN
+            INSERT ({", ".join(keys + AGG_MEASURES)})
+            VALUES ({", ".join(f"d.{c}" for c in keys + AGG_MEASURES)});
+    """, f"DELETE FROM {table} WHERE lines <= 0"]
+
+AGG_APPLY_DELTA = [AGG_DELTA_SQL] + _apply_delta_sql(
+    "sales_daily_agg", ["ORDER_DAY"] + AGG_KEYS, "SELECT * FROM #agg_delta"
+) + _apply_delta_sql(
+    "sales_monthly_agg", AGG_KEYS,
+    f"SELECT {', '.join(AGG_KEYS)}, SUM(revenue) AS revenue, SUM(orders) AS orders, SUM(lines) AS lines "
+    f"FROM #agg_delta GROUP BY {', '.join(AGG_KEYS)}"
+) + ["DROP TABLE #agg_delta"]
+
+def apply_aggregate_deltas(cursor):
+    for sql in AGG_APPLY_DELTA:
+        cursor.execute(sql)
+
+# ── Load bookkeeping ────────────────────────────────────────
+STATE_DDL = [
+    f"""
+    IF COL_LENGTH('{SALES_TABLE}', 'ROW_HASH') IS NULL
+    ALTER TABLE {SALES_TABLE} ADD ROW_HASH BIGINT NULL
+    """,
+    """
+    IF OBJECT_ID('sales_load_state', 'U') IS NULL
+    CREATE TABLE sales_load_state (
+        source_hash  CHAR(64),
+        loaded_at    DATETIME2,
+        mode         NVARCHAR(20),
+        rows_changed INT
+    )
+    """,
+    """
+    IF COL_LENGTH('sales_load_state', 'load_id') IS NULL
+    ALTER TABLE sales_load_state ADD load_id INT NULL
+    """,
+]
+
+def last_source_hash(cursor):
+    cursor.execute("SELECT TOP 1 source_hash FROM sales_load_state "
+                   "WHERE mode <> 'rollback' ORDER BY loaded_at DESC")
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+# Aggregates stamped with the latest load describe the live rows
+def aggregates_current(cursor):
+    cursor.execute("SELECT m.load_id, (SELECT MAX(load_id) FROM sales_load_state) FROM sales_agg_meta m")
+    row = cursor.fetchone()
+    return row is not None and row[0] is not None and row[0] == row[1]
+
+# Records the load and stamps the aggregates with its id, inside the
+# caller's transaction: the rows, the aggregates and the stamp commit
+# together, so readers never trust aggregates of another generation.
+def record_load(cursor, source_hash, mode, rows_changed):
+    cursor.execute("""
+        INSERT INTO sales_load_state (source_hash, loaded_at, mode, rows_changed, load_id)
+        SELECT ?, SYSDATETIME(), ?, ?, COALESCE(MAX(load_id), 0) + 1
+        FROM sales_load_state WITH (UPDLOCK, HOLDLOCK)
+    """, source_hash, mode, rows_changed)
+    cursor.execute("SELECT MAX(load_id) FROM sales_load_state")
+    load_id = cursor.fetchone()[0]
+    cursor.execute("DELETE FROM sales_agg_meta")
+    cursor.execute("INSERT INTO sales_agg_meta (built_at, load_id) VALUES (SYSDATETIME(), ?)", load_id)
+    return load_id
+
+# ── Bulk Insert ─────────────────────────────────────────────
+# One executemany per chunk (fast_executemany sends the whole chunk as
+# a parameter array) and one commit per chunk. If a chunk is rejected,
+# it is retried row by row so a single bad row only skips itself.
+def bulk_insert(conn, df, table=SALES_TABLE, chunk_size=CHUNK_SIZE, error_log=None):
+    cursor = conn.cursor()
+    cursor.fast_executemany = True
+    sql       = insert_sql(table)
+    inserted  = 0
+    errors    = 0
+    error_log = [] if error_log is None else error_log
+
+    for start in range(0, len(df), chunk_size):
+        chunk  = df.iloc[start:start + chunk_size]
+        params = to_params(chunk)
+        try:
+            cursor.executemany(sql, params)
+            conn.commit()
+            inserted += len(params)
+        except pyodbc.Error:
+            conn.rollback()
+            for idx, row in zip(chunk.index, params):
+                try:
+                    cursor.execute(sql, row)
+                    inserted += 1
+                except Exception as e:
+                    errors += 1
+                    if len(error_log) < 3:
+                        record = dict(zip(LOAD_COLUMNS, row))
+                        error_log.append(
+                            f"\nRow {idx}:\n"
+                            f"  POSTALCODE={repr(record['POSTALCODE'])}\n"
+                            f"  STATE={repr(record['STATE'])}\n"
+                            f"  TERRITORY={repr(record['TERRITORY'])}\n"
+                            f"  DEALSIZE={repr(record['DEALSIZE'])}\n"
+                            f"  ERROR: {str(e)}\n"
+                        )
             conn.commit()
-            print(f"   ⏳ {inserted} rows inserted...")
 
+    return inserted, errors, error_log
+
+# ── Streaming load ──────────────────────────────────────────
+# The CSV is read, cleaned and inserted one batch at a time, so peak
+# memory is set by loader.memory_budget_mb, not by the file size.
+# `select` can narrow each batch before it is sent (incremental mode).
+def load_batches(conn, path=CSV_PATH, table=SALES_TABLE, select=None, totals=None):
+    inserted  = 0
+    errors    = 0
+    error_log = []
+    for batch in iter_csv_batches(path):
+        batch = add_row_hashes(clean_frame(batch))
+        if select is not None:
+            batch = select(batch)
+        if totals is not None:
+            totals["rows"]  = totals.get("rows", 0) + len(batch)
+            totals["sales"] = totals.get("sales", 0.0) + float(batch["SALES"].sum())
+        batch_inserted, batch_errors, _ = bulk_insert(conn, batch, table=table, error_log=error_log)
+        inserted += batch_inserted
+        errors   += batch_errors
+    return inserted, errors, error_log
+
+# ── Full reload via staging table swap ──────────────────────
+# The new generation is loaded, indexed, validated and aggregated in
+# staging tables while readers keep using `sales` and its aggregates.
+# A single short transaction then renames each live table to *_prev
+# and its staging copy into place, so readers see the old generation
+# or the new one, never a mix. The *_prev tables are kept for
+# --rollback until the next full reload.
+def staging_name(table):
+    return f"{table}_staging"
+
+def previous_name(table):
+    return f"{table}_prev"
+
+def drop_sql(table):
+    return f"IF OBJECT_ID('{table}', 'U') IS NOT NULL DROP TABLE {table}"
+
+STAGING_TABLE  = staging_name(SALES_TABLE)
+PREVIOUS_TABLE = previous_name(SALES_TABLE)
+SWAP_TABLES    = [SALES_TABLE] + list(agg_tables().values())
+
+# Explicit DDL, not SELECT … INTO, so every generation gets the same
+# types, clustered primary key, KPI indexes and grants as the live table
+def sql_type(col):
+    return "INT" if col in INT_COLUMNS else "FLOAT" if col in FLOAT_COLUMNS else "NVARCHAR(255)"
+
+def column_type(col):
+    return f"{sql_type(col)} NOT NULL" if col in KEY_COLUMNS else sql_type(col)
+
+def sales_table_ddl(table):
+    columns = ",\n".join(f"        {col} {column_type(col)}" for col in COLUMNS)
+    return f"""
+    CREATE TABLE {table} (
+{columns},
+        ROW_HASH BIGINT,
+        PRIMARY KEY CLUSTERED ({", ".join(KEY_COLUMNS)})
+    )
+    """
+
+# Index names follow the live table, so they survive the swap unchanged
+def sales_index_ddl(table):
+    return [sql for _, sql in index_ddl("mssql", SALES_TABLE, on=table)]
+
+def ensure_sales_table(cursor):
+    cursor.execute(f"SELECT OBJECT_ID('{SALES_TABLE}', 'U')")
+    if cursor.fetchone()[0] is None:
+        for sql in [sales_table_ddl(SALES_TABLE)] + sales_index_ddl(SALES_TABLE):
+            cursor.execute(sql)
+
+# Sales table, load bookkeeping and aggregate tables, created or
+# migrated before every run
+def prepare_tables(conn):
+    cursor = conn.cursor()
+    ensure_sales_table(cursor)
+    for sql in STATE_DDL + AGG_DDL + agg_table_ddl():
+        cursor.execute(sql)
+    conn.commit()
+
+# Object-level GRANT / DENY of the live table, replayed on its copy
+GRANTS_SQL = """
+    SELECT state_desc, permission_name, USER_NAME(grantee_principal_id)
+    FROM sys.database_permissions
+    WHERE class = 1 AND minor_id = 0 AND major_id = OBJECT_ID(?)
+"""
+
+def copy_grants(cursor, source, target):
+    cursor.execute(GRANTS_SQL, source)
+    for state, permission, grantee in cursor.fetchall():
+        verb   = "DENY" if state == "DENY" else "GRANT"
+        option = " WITH GRANT OPTION" if state == "GRANT_WITH_GRANT_OPTION" else ""
+        cursor.execute(f"{verb} {permission} ON {target} TO [{grantee}]{option}")
+
+SWAP_SQL = [sql for table in SWAP_TABLES for sql in [
+    drop_sql(previous_name(table)),
+    f"IF OBJECT_ID('{table}', 'U') IS NOT NULL EXEC sp_rename '{table}', '{previous_name(table)}'",
+    f"EXEC sp_rename '{staging_name(table)}', '{table}'",
+]]
+
+ROLLBACK_SQL = [sql for table in SWAP_TABLES for sql in [
+    f"EXEC sp_rename '{table}', '{table}_swap_tmp'",
+    f"EXEC sp_rename '{previous_name(table)}', '{table}'",
+    f"EXEC sp_rename '{table}_swap_tmp', '{previous_name(table)}'",
+]]
+
+def validate_staging(cursor, totals, errors):
+    cursor.execute(f"SELECT COUNT(*), COALESCE(SUM(SALES), 0) FROM {STAGING_TABLE}")
+    staged_rows, staged_sales = cursor.fetchone()
+    cursor.execute(f"SELECT COUNT(*) FROM {SALES_TABLE}")
+    live_rows = cursor.fetchone()[0]
+
+    problems = []
+    if staged_rows != totals.get("rows", 0) - errors:
+        problems.append(f"row count {staged_rows:,} != {totals.get('rows', 0) - errors:,} expected from file")
+    if not errors and abs(float(staged_sales) - totals.get("sales", 0.0)) > 0.01 * max(staged_rows, 1):
+        problems.append(f"SUM(SALES) {float(staged_sales):,.2f} != {totals.get('sales', 0.0):,.2f} from file")
+    min_ratio = get_setting("loader", "min_row_ratio", 0.9)
+    if live_rows and staged_rows < live_rows * min_ratio:
+        problems.append(f"only {staged_rows:,} rows vs {live_rows:,} live (below {min_ratio:.0%} safety ratio)")
+    return problems
+
+def full_load(conn, source_hash, path=CSV_PATH):
+    cursor = conn.cursor()
+    for table in SWAP_TABLES:
+        cursor.execute(drop_sql(staging_name(table)))
+    cursor.execute(sales_table_ddl(STAGING_TABLE))
+    conn.commit()
+    print(f"🧱 Created {STAGING_TABLE}")
+
+    print(f"📥 Streaming {path}")
+    totals = {}
+    inserted, errors, error_log = load_batches(conn, path, table=STAGING_TABLE, totals=totals)
+
+    for sql in sales_index_ddl(STAGING_TABLE):
+        cursor.execute(sql)
+    conn.commit()
+    print(f"🗂️  Indexed {STAGING_TABLE}")
+
+    problems = validate_staging(cursor, totals, errors)
+    if problems:
+        raise RuntimeError(f"{STAGING_TABLE} failed validation, live table left untouched: " + "; ".join(problems))
+    print(f"🔍 {STAGING_TABLE} validated")
+
+    # The staging aggregates are built before the swap, outside its transaction
+    build_aggregates(cursor, source=STAGING_TABLE, suffix="_staging")
+    for table in SWAP_TABLES:
+        copy_grants(cursor, table, staging_name(table))
+    conn.commit()
+    print("📊 Staging KPI aggregate tables built")
+
+    # Swap the rows and their aggregates and record the load, in one transaction
+    for sql in SWAP_SQL:
+        cursor.execute(sql)
+    record_load(cursor, source_hash, "full", inserted)
+    conn.commit()
+    print(f"🔁 Swapped {STAGING_TABLE} in as {SALES_TABLE} (previous generation kept as {PREVIOUS_TABLE})")
+
+    return {"inserted": inserted, "updated": 0}, errors, error_log
+
+def rollback(conn):
+    cursor  = conn.cursor()
+    missing = []
+    for table in SWAP_TABLES:
+        cursor.execute(f"SELECT OBJECT_ID('{previous_name(table)}', 'U')")
+        if cursor.fetchone()[0] is None:
+            missing.append(previous_name(table))
+    if missing:
+        raise RuntimeError(f"No previous generation to roll back to (missing {', '.join(missing)})")
+    for sql in ROLLBACK_SQL:
+        cursor.execute(sql)
+    record_load(cursor, None, "rollback", 0)
+    conn.commit()
+
+# ── Incremental upsert keyed on (ORDERNUMBER, ORDERLINENUMBER)
+# Every row of the file is staged and a single MERGE applies it; the
+# server skips rows whose ROW_HASH is unchanged, so the loader never
+# reads the stored keys back. Rows missing from the file are left in
+# place (exports are append/amend only). The MERGE outputs the KPI
+# columns of every row it wrote (and, for updates, their old values)
+# into #merge_out, which feeds the aggregate tables and the running
+# KPI state.
+DELTA_COLUMNS = ROW_COLUMNS + ["ORDERDATE"]
+
+# Every column nullable: an INSERT outputs NULL for each deleted.* value,
+# including the key columns that are NOT NULL in the sales table
+MERGE_OUT_COLUMNS = ["merge_action NVARCHAR(10) NULL"] + [
+    f"{prefix}{c} {sql_type(c)} NULL" for prefix in ("new_", "old_") for c in DELTA_COLUMNS
+]
+
+MERGE_OUT_DDL = "CREATE TABLE #merge_out ({})".format(", ".join(MERGE_OUT_COLUMNS))
+
+MERGE_SQL = f"""
+    MERGE {SALES_TABLE} WITH (HOLDLOCK) AS t
+    USING #sales_stage AS s
+       ON t.ORDERNUMBER = s.ORDERNUMBER AND t.ORDERLINENUMBER = s.ORDERLINENUMBER
+    WHEN MATCHED AND (t.ROW_HASH IS NULL OR t.ROW_HASH <> s.ROW_HASH) THEN
+        UPDATE SET {", ".join(f"{c} = s.{c}" for c in LOAD_COLUMNS if c not in KEY_COLUMNS)}
+    WHEN NOT MATCHED BY TARGET THEN
+        INSERT ({", ".join(LOAD_COLUMNS)})
+        VALUES ({", ".join(f"s.{c}" for c in LOAD_COLUMNS)})
+    OUTPUT $action, {", ".join(f"inserted.{c}" for c in DELTA_COLUMNS)},
+                    {", ".join(f"deleted.{c}" for c in DELTA_COLUMNS)}
+    INTO #merge_out;
+"""
+
+MERGE_OUT_ROWS = f"""
+    SELECT merge_action, {", ".join(f"new_{c}" for c in ROW_COLUMNS)},
+                         {", ".join(f"old_{c}" for c in ROW_COLUMNS)}
+    FROM #merge_out
+"""
+
+DEDUPE_STAGE_SQL = """
+    WITH ranked AS (
+        SELECT ROW_NUMBER() OVER (
+            PARTITION BY ORDERNUMBER, ORDERLINENUMBER ORDER BY (SELECT NULL)
+        ) AS rn
+        FROM #sales_stage
+    )
+    DELETE FROM ranked WHERE rn > 1
+"""
+
+# +new values for inserts and updates, -old values for updates
+def merge_deltas(output):
+    width    = len(ROW_COLUMNS)
+    inserted = pd.DataFrame([row[1:1 + width] for row in output], columns=ROW_COLUMNS)
+    deleted  = pd.DataFrame([row[1 + width:] for row in output if row[0] == "UPDATE"], columns=ROW_COLUMNS)
+    return pd.concat([deltas_from_rows(inserted), deltas_from_rows(deleted, sign=-1)], ignore_index=True)
+
+def incremental_load(conn, source_hash, path=CSV_PATH):
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT TOP 0 * INTO #sales_stage FROM {SALES_TABLE}")
+    conn.commit()
+
+    print(f"📥 Streaming {path}")
+    staged, errors, error_log = load_batches(conn, path, table="#sales_stage")
+    print(f"🔎 {staged:,} rows staged, comparing row hashes on the server")
+
+    cursor.execute(DEDUPE_STAGE_SQL)
+    cursor.execute(MERGE_OUT_DDL)
+    cursor.execute(MERGE_SQL)
+    cursor.execute(MERGE_OUT_ROWS)
+    output  = cursor.fetchall()
+    actions = [row[0] for row in output]
+    counts  = {"inserted": actions.count("INSERT"), "updated": actions.count("UPDATE")}
+
+    # Aggregates and the load record commit with the MERGE: current
+    # aggregates take this load's deltas, stale ones are rebuilt
+    if not aggregates_current(cursor):
+        build_aggregates(cursor)
+    elif output:
+        apply_aggregate_deltas(cursor)
+    cursor.execute("DROP TABLE #merge_out")
+    cursor.execute("DROP TABLE #sales_stage")
+    record_load(cursor, source_hash, "incremental", len(output))
+    conn.commit()
+    return counts, errors, error_log, merge_deltas(output)
+
+# The load has committed by now: if the state cannot be updated it
+# stays at the old data version and KPI reads fall back to full queries.
+def refresh_kpi_state(deltas, previous_version):
+    try:
+        update_db_state(deltas, previous_version)
+        print("🧮 Running KPI state updated")
     except Exception as e:
-        errors += 1
-        if errors <= 3:
-            error_log.append(
-                f"\nRow {idx}:\n"
-                f"  POSTALCODE={repr(row['POSTALCODE'])}\n"
-                f"  STATE={repr(row['STATE'])}\n"
-                f"  TERRITORY={repr(row['TERRITORY'])}\n"
-                f"  DEALSIZE={repr(row['DEALSIZE'])}\n"
-                f"  ERROR: {str(e)}\n"
-            )
-
-conn.commit()
-conn.close()
-
-print(f"\n✅ Import complete!")
-print(f"   → {inserted} rows inserted successfully")
-print(f"   → {errors} rows skipped due to errors")
-
-if error_log:
-    print("\n⚠️  Sample errors:")
-    for err in error_log:
-        print(err)
\ No newline at end of file
+        print(f"⚠️  Running KPI state not updated, KPIs use full queries until the next load: {e}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the sales CSV into SQL Server")
+    parser.add_argument("--full", action="store_true",
+                        help="reload every row into a staging table and swap it in")
+    parser.add_argument("--rollback", action="store_true",
+                        help="swap the previous full-load generation back in")
+    args = parser.parse_args()
+    mode = "full" if args.full else get_setting("loader", "mode", "incremental")
+
+    started = time.perf_counter()
+
+    # ── Connect ─────────────────────────────────────────────
+    conn   = pyodbc.connect(CONNECTION_STRING)
+    cursor = conn.cursor()
+    prepare_tables(conn)
+
+    if args.rollback:
+        rollback(conn)
+        conn.close()
+        version = invalidate_all()
+        refresh_kpi_state(None, None)
+        print(f"⏪ Rolled back to the previous generation (data version {version})")
+        warm_dashboard()
+        return
+
+    # ── Skip unchanged files ────────────────────────────────
+    source_hash = file_hash(CSV_PATH)
+    if mode == "incremental" and source_hash == last_source_hash(cursor):
+        conn.close()
+        print("✅ Source file unchanged since the last load — nothing to do")
+        return
+
+    # ── Stream, clean & load rows ───────────────────────────
+    # (the aggregate tables and the load record commit with the rows)
+    if mode == "full":
+        counts, errors, error_log = full_load(conn, source_hash)
+        deltas = None
+    else:
+        counts, errors, error_log, deltas = incremental_load(conn, source_hash)
+    changed = counts["inserted"] + counts["updated"]
+    if changed or mode == "full":
+        print("📊 KPI aggregate tables updated")
+    conn.close()
+
+    # ── Invalidate cached KPI results ───────────────────────
+    previous = get_data_version()
+    version  = invalidate_all() if changed or mode == "full" else None
+
+    # ── Apply this load's rows to the running KPI state ─────
+    # (a full load recomputes it)
+    if version:
+        refresh_kpi_state(deltas, previous)
+
+    # ── Refresh the columnar snapshot for CSV readers ───────
+    build_snapshot(CSV_PATH)
+
+    # ── Prebuild dashboard figures for the new data ─────────
+    if version:
+        warm_dashboard()
+
+    print(f"\n✅ {mode.title()} import complete in {time.perf_counter() - started:.1f}s!")
+    print(f"   → {counts['inserted']} rows inserted successfully")
+    print(f"   → {counts['updated']} rows updated")
+    print(f"   → {errors} rows skipped due to errors")
+    if version:
+        print(f"   → KPI cache invalidated (data version {version})")
+
+    if error_log:
+        print("\n⚠️  Sample errors:")
+        for err in error_log:
+            print(err)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
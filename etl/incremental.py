@@ -0,0 +1,356 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+import pickle
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+from etl.settings import get_setting
+from etl.cache import get_data_version
+from etl.csv_stream import CSV_PATH, iter_csv_batches
+from etl.schema import clean_frame
+from etl.snapshot import ensure_snapshot, snapshot_meta, iter_snapshot_batches
+from etl.sketches import SKETCH_MODE, APPROXIMATE, CustomerSketch, TopCustomers, merge_sketches
+from etl.backends import SALES_TABLE, get_backend
+from etl.transform import (get_connection, KpiSnapshot, _profit_metrics, _cac,
+                           _customer_status, _customer_status_counts, _revenue_by, _top_customers, _monthly)
+
+ROOT_DIR  = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STATE_DIR = os.path.join(ROOT_DIR, get_setting("incremental", "dir", "data/kpi_state"))
+
+# ── Running KPI state ───────────────────────────────────────
+# Every KPI in KpiSnapshot is a function of a few additive tables:
+# sums and counts per product, country, month and customer, plus a
+# row count per (year, customer) for the retention sets. The state
+# keeps those tables on disk and applies only the rows each load adds
+# (or removes: an updated row is applied as -old +new), so building
+# today's KPIs costs the day's rows plus the size of these tables,
+# not a pass over the full history.
+#
+# Two sources feed a state, each kept in its own file:
+#   db   the loader's MERGE output (etl/import_to_sql.py); read by
+#        etl.transform.get_kpi_snapshot while it matches the data version.
+#        One file per backend and sales table (db-sqlite-sales.pkl), so
+#        a state is only ever served for the database it was built from
+#   csv  rows appended to the sales CSV since the last refresh; read by
+#        the cloud email report (reports/email_report_cloud.py)
+#
+#   python etl/incremental.py --verify     compare with a full recompute
+#   python etl/incremental.py --rebuild    recompute from scratch
+STATE_FORMAT = 2    # bump when the stored layout changes, to force a rebuild
+
+GRAIN        = ["YEAR_ID", "MONTH_ID", "PRODUCTLINE", "COUNTRY", "CUSTOMERNAME"]
+ROW_COLUMNS  = GRAIN + ["SALES", "ORDERNUMBER"]
+INT_KEYS     = ["YEAR_ID", "MONTH_ID"]
+MEASURES     = ["revenue", "orders", "lines"]
+GROUP_TABLES = {
+    "by_product":       ["PRODUCTLINE"],
+    "by_country":       ["COUNTRY"],
+    "by_month":         ["YEAR_ID", "MONTH_ID"],
+}
+CUSTOMER_TABLES = {
+    "by_customer":      ["CUSTOMERNAME"],
+    "by_year_customer": ["YEAR_ID", "CUSTOMERNAME"],
+}
+
+# With sketches.mode: approx the per-customer tables give way to
+# customer sketches per month and per product (etl/sketches.py) for
+# CAC and retention, and to a bounded top-customers table for the top
+# customers, so the state takes the same memory at any customer count.
+# Sketches only add: rows taken back out (-old) are not removed from
+# them, which --verify reports until the next --rebuild.
+SKETCH_PARTITIONS = {"month": ["YEAR_ID", "MONTH_ID"], "product": ["PRODUCTLINE"]}
+STATE_TABLES      = GROUP_TABLES if APPROXIMATE else {**GROUP_TABLES, **CUSTOMER_TABLES}
+
+# ── Deltas: grain keys + revenue / orders / lines ───────────
+# Raw rows count as +1 line each (sign=-1 takes them back out). revenue
+# follows SUM(SALES) and orders COUNT(ORDERNUMBER), so NULLs add 0.
+def deltas_from_rows(rows, sign=1):
+    return _normalized(pd.DataFrame({
+        **{c: rows[c] for c in GRAIN},
+        "revenue": pd.to_numeric(rows["SALES"], errors="coerce").fillna(0.0) * sign,
+        "orders":  rows["ORDERNUMBER"].notna().astype("int64") * sign,
+        "lines":   np.full(len(rows), sign, dtype="int64"),
+    }))
+
+def _normalized(deltas):
+    for col in GRAIN:
+        deltas[col] = deltas[col].astype("Int64" if col in INT_KEYS else object)
+    deltas["revenue"] = deltas["revenue"].astype(float).fillna(0.0)
+    deltas[["orders", "lines"]] = deltas[["orders", "lines"]].astype("int64")
+    return deltas
+
+class KpiState:
+    def __init__(self, source):
+        self.source = source
+        self.tables = {}
+        self.totals   = dict.fromkeys(MEASURES, 0)
+        self.meta     = {}
+        self.sketches = {name: {} for name in SKETCH_PARTITIONS} if APPROXIMATE else {}
+        self.top      = TopCustomers() if APPROXIMATE else None
+
+    # Keys whose line count drops to zero are removed, so a customer
+    # with no rows left in a year leaves that year's set.
+    def apply(self, deltas):
+        if deltas.empty:
+            return self
+        for name, keys in STATE_TABLES.items():
+            change  = deltas.groupby(keys, dropna=False)[MEASURES].sum()
+            current = self.tables.get(name)
+            if current is not None:
+                change = pd.concat([current, change]).groupby(level=keys, dropna=False).sum()
+            self.tables[name] = change[change["lines"] != 0]
+        for measure in MEASURES:
+            self.totals[measure] += deltas[measure].sum().item()
+        if APPROXIMATE:
+            self._sketch(deltas[deltas["lines"] > 0])
+            self.top.update(deltas)
+        return self
+
+    def _sketch(self, rows):
+        for name, keys in SKETCH_PARTITIONS.items():
+            for key, customers in rows.groupby(keys)["CUSTOMERNAME"]:
+                self.sketches[name].setdefault(key, CustomerSketch()).update(customers)
+
+    def year_sketch(self, year):
+        return merge_sketches(sketch for (y, _), sketch in self.sketches["month"].items() if y == year)
+
+    def frame(self, name):
+        table = self.tables.get(name)
+        if table is None:
+            return pd.DataFrame(columns=STATE_TABLES[name] + MEASURES)
+        return table.reset_index()
+
+    @property
+    def customer_count(self):
+        if APPROXIMATE:
+            return merge_sketches(self.sketches["month"].values()).count()
+        return int(self.frame("by_customer")["CUSTOMERNAME"].nunique())
+
+    def customer_status(self):
+        if not APPROXIMATE:
+            return _customer_status(self.frame("by_year_customer"))
+        total, active = self.year_sketch(2004).overlap(self.year_sketch(2005))
+        return _customer_status_counts(active, total)
+
+    def customers(self):
+        return self.top.frame() if APPROXIMATE else self.frame("by_customer")
+
+    # Same builders as etl.transform.query_kpi_snapshot, fed the state tables
+    def snapshot(self):
+        total_revenue = round(self.totals["revenue"], 2)
+        profit        = _profit_metrics(total_revenue)
+        return KpiSnapshot(
+            total_revenue      = total_revenue,
+            total_profit       = profit["total_profit"],
+            profit_margin_pct  = profit["profit_margin_pct"],
+            cac                = _cac(self.customer_count),
+            customer_status    = self.customer_status(),
+            revenue_by_product = _revenue_by(self.frame("by_product"), "PRODUCTLINE", "product"),
+            revenue_by_region  = _revenue_by(self.frame("by_country"), "COUNTRY", "region"),
+            top_salespeople    = _top_customers(self.customers()),
+            monthly_revenue    = _monthly(self.frame("by_month")),
+        )
+
+    # ── Persistence: one pickle per source, replaced atomically ─
+    @staticmethod
+    def path(source):
+        return os.path.join(STATE_DIR, f"{source}.pkl")
+
+    @classmethod
+    def load(cls, source):
+        try:
+            with open(cls.path(source), "rb") as f:
+                stored = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️  Unreadable KPI state for {source}, it will be rebuilt: {e}")
+            return None
+        if stored.get("format") != STATE_FORMAT or stored.get("sketch_mode", "exact") != SKETCH_MODE:
+            return None
+        state = cls(source)
+        state.tables, state.totals, state.meta = stored["tables"], stored["totals"], stored["meta"]
+        state.sketches, state.top = stored["sketches"], stored["top"]
+        return state
+
+    def save(self):
+        os.makedirs(STATE_DIR, exist_ok=True)
+        self.meta["updated_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        tmp = f"{self.path(self.source)}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump({"format": STATE_FORMAT, "tables": self.tables, "totals": self.totals,
+                         "meta": self.meta, "sketch_mode": SKETCH_MODE, "sketches": self.sketches,
+                         "top": self.top},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path(self.source))
+        return self
+
+# ── Source: the database ────────────────────────────────────
+# Full recompute at the grain, straight from the loader's table, the
+# one its MERGE deltas are taken from.
+RECOMPUTE_QUERY = """
+    SELECT
+        YEAR_ID, MONTH_ID, PRODUCTLINE, COUNTRY, CUSTOMERNAME,
+        SUM(SALES) as revenue,
+        COUNT(ORDERNUMBER) as orders,
+        COUNT(*) as lines
+    FROM {table}
+    GROUP BY YEAR_ID, MONTH_ID, PRODUCTLINE, COUNTRY, CUSTOMERNAME
+"""
+
+def db_source():
+    return f"db-{get_backend()}-{SALES_TABLE}"
+
+def recompute_db_state():
+    conn = get_connection()
+    try:
+        grain = pd.read_sql(RECOMPUTE_QUERY.format(table=SALES_TABLE), conn)
+    finally:
+        conn.close()
+    return KpiState(db_source()).apply(_normalized(grain))
+
+def rebuild_db_state():
+    state = recompute_db_state()
+    state.meta["data_version"] = get_data_version()
+    return state.save()
+
+# Called by the loader after its load committed and bumped the data
+# version. `previous_version` is the version the deltas were computed
+# against; a state that is missing or was not kept up to date with it
+# is recomputed instead. deltas=None (full load, rollback) recomputes.
+def update_db_state(deltas, previous_version):
+    state = KpiState.load(db_source())
+    if deltas is None or state is None or state.meta.get("data_version") != previous_version:
+        return rebuild_db_state()
+    state.apply(deltas)
+    state.meta["data_version"] = get_data_version()
+    return state.save()
+
+# The db state, if it reflects the current data version
+def current_db_state():
+    state = KpiState.load(db_source())
+    if state is None or state.meta.get("data_version") != get_data_version():
+        return None
+    return state
+
+# ── Source: the sales CSV (append-only exports) ─────────────
+# The state records how many bytes of the file it has applied, with a
+# hash of the file's first and last 64 KB before that point. A file
+# that grew past that point with both hashes unchanged only needs its
+# new rows read; a shorter or rewritten file is recomputed from the
+# snapshot. An edit in the middle of an otherwise appended file is not
+# detected by the hashes; --verify catches it.
+FINGERPRINT_BYTES = 64 * 1024
+
+def _fingerprint(path, size):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        digest.update(f.read(min(size, FINGERPRINT_BYTES)))
+        f.seek(max(size - FINGERPRINT_BYTES, 0))
+        digest.update(f.read(min(size, FINGERPRINT_BYTES)))
+    return digest.hexdigest()
+
+def _csv_meta(path, size):
+    return {"source": os.path.abspath(path), "offset": size, "fingerprint": _fingerprint(path, size)}
+
+def recompute_csv_state(path=CSV_PATH):
+    ensure_snapshot(path)
+    state = KpiState("csv")
+    for batch in iter_snapshot_batches(ROW_COLUMNS, csv_path=path):
+        state.apply(deltas_from_rows(batch))
+    state.meta = _csv_meta(path, snapshot_meta()["size"])
+    return state
+
+def _appendable(state, path):
+    if state is None or state.meta.get("source") != os.path.abspath(path):
+        return False
+    offset = state.meta["offset"]
+    return os.path.getsize(path) >= offset and _fingerprint(path, offset) == state.meta["fingerprint"]
+
+def refresh_csv_state(path=CSV_PATH):
+    state = KpiState.load("csv")
+    if not _appendable(state, path):
+        return recompute_csv_state(path).save()
+    offset = state.meta["offset"]
+    size   = os.path.getsize(path)
+    if size == offset:
+        return state
+    for batch in iter_csv_batches(path, offset=offset, progress=False):
+        state.apply(deltas_from_rows(clean_frame(batch)))
+    state.meta.update(_csv_meta(path, size))
+    return state.save()
+
+# ── Verification: state vs a full recompute ─────────────────
+def _compare_frames(name, keys, state, full, rtol, atol):
+    joined = state.merge(full, on=keys, how="outer", suffixes=("_state", "_full"), indicator=True)
+    only   = joined[joined["_merge"] != "both"]
+    both   = joined[joined["_merge"] == "both"]
+    wrong  = np.zeros(len(both), dtype=bool)
+    for measure in MEASURES:
+        wrong |= ~np.isclose(both[f"{measure}_state"].astype(float),
+                             both[f"{measure}_full"].astype(float), rtol=rtol, atol=atol)
+    if len(only) or wrong.any():
+        example = (only if len(only) else both[wrong]).iloc[0][keys].tolist()
+        return [f"{name}: {len(only)} keys missing on one side, "
+                f"{int(wrong.sum())} with different values (e.g. {example})"]
+    return []
+
+def compare_states(state, full, rtol=1e-9, atol=1e-6):
+    problems = []
+    for measure in MEASURES:
+        if not np.isclose(state.totals[measure], full.totals[measure], rtol=rtol, atol=atol):
+            problems.append(f"total {measure}: {state.totals[measure]:,} vs {full.totals[measure]:,}")
+    for name, keys in STATE_TABLES.items():
+        problems += _compare_frames(name, keys, state.frame(name), full.frame(name), rtol, atol)
+    # The top-customers table is only comparable while neither side has evicted
+    if APPROXIMATE and not (state.top.evicted or full.top.evicted):
+        problems += _compare_frames("top customers", ["CUSTOMERNAME"], state.top.frame(), full.top.frame(), rtol, atol)
+    for name, sketches in state.sketches.items():
+        differ = [key for key in sorted(set(sketches) | set(full.sketches[name]))
+                  if sketches.get(key) != full.sketches[name].get(key)]
+        if differ:
+            problems.append(f"{name} sketches: {len(differ)} differ from a recompute (e.g. {differ[0]})")
+    return problems
+
+def verify(source):
+    if source == "db":
+        state = KpiState.load(db_source())
+        if state is None:
+            return [f"no {db_source()} state saved yet"]
+        if state.meta.get("data_version") != get_data_version():
+            return [f"db state is at data version {state.meta.get('data_version')}, "
+                    f"current is {get_data_version()}"]
+        return compare_states(state, recompute_db_state())
+    return compare_states(refresh_csv_state(), recompute_csv_state())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain and check the running KPI state")
+    parser.add_argument("--source", choices=["csv", "db"], default=get_setting("incremental", "source", "csv"))
+    parser.add_argument("--rebuild", action="store_true", help="recompute the state from the full history")
+    parser.add_argument("--verify", action="store_true", help="compare the state with a full recompute")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.verify:
+        problems = verify(args.source)
+        elapsed  = time.perf_counter() - started
+        if problems:
+            print(f"❌ KPI state ({args.source}) differs from a full recompute:")
+            for problem in problems:
+                print(f"   → {problem}")
+            sys.exit(1)
+        print(f"✅ KPI state ({args.source}) matches a full recompute ({elapsed:.2f}s)")
+        sys.exit(0)
+
+    if args.source == "db":
+        state = rebuild_db_state() if args.rebuild else (current_db_state() or rebuild_db_state())
+    else:
+        state = recompute_csv_state().save() if args.rebuild else refresh_csv_state()
+    snapshot = state.snapshot()
+    print(f"✅ KPI state ({args.source}) ready in {time.perf_counter() - started:.2f}s")
+    print(f"   → {state.totals['lines']:,} rows, {state.customer_count:,} customers, "
+          f"revenue ${snapshot.total_revenue:,.2f}, retention {snapshot.retention_pct}%")
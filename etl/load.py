@@ -5,12 +5,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 import gspread
 from google.oauth2.service_account import Credentials
 from datetime import datetime
-from etl.transform import (
-    get_total_revenue, get_profit_metrics, get_cac,
-    get_customer_status, get_revenue_by_product,
-    get_revenue_by_region, get_top_salespeople,
-    get_monthly_revenue
-)
+from etl.transform import get_kpi_snapshot
+from reports.formatting import table_rows, rounded, integers
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -40,22 +36,19 @@ def sync_to_sheets():
     except:
         ws1 = spreadsheet.add_worksheet("KPI Summary", rows=20, cols=5)
 
-    profit    = get_profit_metrics()
-    cac       = get_cac()
-    status    = get_customer_status()
-    active    = int(status["active_customers"][0])
-    churned   = int(status["churned_customers"][0])
-    total     = active + churned
-    retention = round((active / total) * 100, 1) if total > 0 else 0
+    snapshot  = get_kpi_snapshot()
+    active    = snapshot.active_customers
+    churned   = snapshot.churned_customers
+    retention = snapshot.retention_pct
 
     kpi_data = [
         ["📊 KPI SUMMARY", f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}"],
         [""],
         ["Metric", "Value"],
-        ["💰 Total Revenue",    f"${get_total_revenue():,.2f}"],
-        ["📈 Total Profit",     f"${profit['total_profit']:,.2f}"],
-        ["📉 Profit Margin",    f"{profit['profit_margin_pct']}%"],
-        ["🧲 Cust. Acq. Cost", f"${cac:,.2f}"],
+        ["💰 Total Revenue",    f"${snapshot.total_revenue:,.2f}"],
+        ["📈 Total Profit",     f"${snapshot.total_profit:,.2f}"],
+        ["📉 Profit Margin",    f"{snapshot.profit_margin_pct}%"],
+        ["🧲 Cust. Acq. Cost", f"${snapshot.cac:,.2f}"],
         ["✅ Active Customers", str(active)],
         ["❌ Churned Customers",str(churned)],
         ["🔁 Retention Rate",   f"{retention}%"],
@@ -69,11 +62,9 @@ def sync_to_sheets():
     except:
         ws2 = spreadsheet.add_worksheet("By Product", rows=20, cols=5)
 
-    df_product   = get_revenue_by_product()
-    product_data = [["Product", "Revenue", "Profit"]] + [
-        [row["product"], round(row["revenue"], 2), round(row["profit"], 2)]
-        for _, row in df_product.iterrows()
-    ]
+    df_product   = snapshot.revenue_by_product
+    product_data = [["Product", "Revenue", "Profit"]] + table_rows(
+        df_product, ["product", "revenue", "profit"], {"revenue": rounded, "profit": rounded})
     clear_and_write(ws2, product_data)
     print("✅ By Product tab updated")
 
@@ -83,11 +74,9 @@ def sync_to_sheets():
     except:
         ws3 = spreadsheet.add_worksheet("By Region", rows=30, cols=5)
 
-    df_region   = get_revenue_by_region()
-    region_data = [["Region", "Revenue", "Profit"]] + [
-        [row["region"], round(row["revenue"], 2), round(row["profit"], 2)]
-        for _, row in df_region.iterrows()
-    ]
+    df_region   = snapshot.revenue_by_region
+    region_data = [["Region", "Revenue", "Profit"]] + table_rows(
+        df_region, ["region", "revenue", "profit"], {"revenue": rounded, "profit": rounded})
     clear_and_write(ws3, region_data)
     print("✅ By Region tab updated")
 
@@ -97,11 +86,9 @@ def sync_to_sheets():
     except:
         ws4 = spreadsheet.add_worksheet("Top Customers", rows=20, cols=5)
 
-    df_sales   = get_top_salespeople()
-    sales_data = [["Customer", "Revenue", "Total Orders"]] + [
-        [row["salesperson"], round(row["revenue"], 2), int(row["total_sales"])]
-        for _, row in df_sales.iterrows()
-    ]
+    df_sales   = snapshot.top_salespeople
+    sales_data = [["Customer", "Revenue", "Total Orders"]] + table_rows(
+        df_sales, ["salesperson", "revenue", "total_sales"], {"revenue": rounded, "total_sales": integers})
     clear_and_write(ws4, sales_data)
     print("✅ Top Customers tab updated")
 
@@ -111,11 +98,9 @@ def sync_to_sheets():
     except:
         ws5 = spreadsheet.add_worksheet("Monthly Trend", rows=40, cols=5)
 
-    df_monthly   = get_monthly_revenue()
-    monthly_data = [["Month", "Revenue", "Profit"]] + [
-        [row["month"], round(row["revenue"], 2), round(row["profit"], 2)]
-        for _, row in df_monthly.iterrows()
-    ]
+    df_monthly   = snapshot.monthly_revenue
+    monthly_data = [["Month", "Revenue", "Profit"]] + table_rows(
+        df_monthly, ["month", "revenue", "profit"], {"revenue": rounded, "profit": rounded})
     clear_and_write(ws5, monthly_data)
     print("✅ Monthly Trend tab updated")
 
@@ -0,0 +1,254 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import xml.etree.ElementTree as ET
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from etl.settings import get_setting
+from etl.backends import SALES_TABLE, sql_fragments
+from etl.transform import get_connection, snapshot_query, KPI_SOURCES, KPI_QUERIES
+
+KPI_TABLE = SALES_TABLE
+
+# ── Sales CSV columns and types ─────────────────────────────
+# Shared by the SQL Server loader and the embedded backends.
+COLUMNS = [
+    "ORDERNUMBER", "QUANTITYORDERED", "PRICEEACH", "ORDERLINENUMBER",
+    "SALES", "ORDERDATE", "STATUS", "QTR_ID", "MONTH_ID", "YEAR_ID",
+    "PRODUCTLINE", "MSRP", "PRODUCTCODE", "CUSTOMERNAME", "PHONE",
+    "ADDRESSLINE1", "ADDRESSLINE2", "CITY", "STATE", "POSTALCODE",
+    "COUNTRY", "TERRITORY", "CONTACTLASTNAME", "CONTACTFIRSTNAME", "DEALSIZE"
+]
+INT_COLUMNS   = ["ORDERNUMBER", "QUANTITYORDERED", "ORDERLINENUMBER",
+                 "QTR_ID", "MONTH_ID", "YEAR_ID", "MSRP"]
+FLOAT_COLUMNS = ["PRICEEACH", "SALES"]
+NULL_TOKENS   = ["nan", "none", "null", ""]
+
+# ── Clean & convert, column at a time ───────────────────────
+# Strips whitespace, turns nan/none/null/empty into NA, then coerces
+# the numeric columns; anything unparseable becomes NULL, as before.
+def clean_frame(df):
+    df = df.apply(lambda col: col.str.strip())
+    df = df.mask(df.apply(lambda col: col.str.lower().isin(NULL_TOKENS)))
+    for col in INT_COLUMNS:
+        values  = pd.to_numeric(df[col], errors="coerce").replace([np.inf, -np.inf], np.nan)
+        df[col] = np.trunc(values).astype("Int64")
+    for col in FLOAT_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+# ── Indexes the KPI queries need ────────────────────────────
+# Every KPI query filters or groups on YEAR_ID, MONTH_ID, PRODUCTLINE,
+# COUNTRY or CUSTOMERNAME and reads only SALES / ORDERNUMBER, so each
+# index below covers its queries and none of them touch the base rows.
+# SQLite has no INCLUDE clause; the included columns become trailing keys.
+# DuckDB is columnar and aggregates by scanning, so it gets none.
+KPI_INDEXES = [
+    {"name": "IX_{table}_period",   "keys": ["YEAR_ID", "MONTH_ID"],
+     "include": ["PRODUCTLINE", "COUNTRY", "CUSTOMERNAME", "SALES", "ORDERNUMBER"]},
+    {"name": "IX_{table}_customer", "keys": ["CUSTOMERNAME", "YEAR_ID"],
+     "include": ["SALES", "ORDERNUMBER"]},
+    {"name": "IX_{table}_product",  "keys": ["PRODUCTLINE"], "include": ["SALES"]},
+    {"name": "IX_{table}_country",  "keys": ["COUNTRY"],     "include": ["SALES"]},
+]
+
+# Optional SQL Server alternative: one nonclustered columnstore index
+# serves every KPI aggregate with batch-mode scans.
+COLUMNSTORE_INDEX = {"name": "NCCI_{table}_kpi",
+                     "columns": ["YEAR_ID", "MONTH_ID", "PRODUCTLINE", "COUNTRY",
+                                 "CUSTOMERNAME", "SALES", "ORDERNUMBER"]}
+
+# Names come from `table`; `on` creates them on another table (a
+# staging copy that is renamed to `table` later)
+def index_ddl(dialect="mssql", table=KPI_TABLE, columnstore=None, on=None):
+    columnstore = get_setting("schema", "columnstore", False) if columnstore is None else columnstore
+    on  = on or table
+    ddl = []
+    if dialect == "duckdb":
+        return ddl
+    for spec in KPI_INDEXES:
+        name = spec["name"].format(table=table)
+        if dialect == "mssql":
+            sql = (f"CREATE NONCLUSTERED INDEX {name} ON {on} ({', '.join(spec['keys'])}) "
+                   f"INCLUDE ({', '.join(spec['include'])})")
+        else:
+            sql = f"CREATE INDEX IF NOT EXISTS {name} ON {on} ({', '.join(spec['keys'] + spec['include'])})"
+        ddl.append((name, sql))
+    if columnstore and dialect == "mssql":
+        name = COLUMNSTORE_INDEX["name"].format(table=table)
+        ddl.append((name, f"CREATE NONCLUSTERED COLUMNSTORE INDEX {name} ON {on} "
+                          f"({', '.join(COLUMNSTORE_INDEX['columns'])})"))
+    return ddl
+
+def existing_indexes(conn, table=KPI_TABLE):
+    cursor = conn.connection.cursor()
+    if conn.dialect.name == "mssql":
+        cursor.execute("SELECT name FROM sys.indexes WHERE object_id = OBJECT_ID(?) AND name IS NOT NULL", (table,))
+        return {row[0] for row in cursor.fetchall()}
+    if conn.dialect.name == "duckdb":
+        cursor.execute("SELECT index_name FROM duckdb_indexes() WHERE table_name = ?", (table,))
+        return {row[0] for row in cursor.fetchall()}
+    cursor.execute(f"PRAGMA index_list('{table}')")
+    return {row[1] for row in cursor.fetchall()}
+
+# ── Create / verify ─────────────────────────────────────────
+def ensure_indexes(conn=None, table=KPI_TABLE):
+    if conn is None:
+        with get_connection() as conn:
+            return ensure_indexes(conn, table)
+    existing = existing_indexes(conn, table)
+    cursor   = conn.connection.cursor()
+    created  = []
+    for name, sql in index_ddl(conn.dialect.name, table):
+        if name not in existing:
+            cursor.execute(sql)
+            created.append(name)
+    conn.connection.commit()
+    return created
+
+def verify_indexes(conn=None, table=KPI_TABLE):
+    if conn is None:
+        with get_connection() as conn:
+            return verify_indexes(conn, table)
+    existing = existing_indexes(conn, table)
+    return [name for name, _ in index_ddl(conn.dialect.name, table) if name not in existing]
+
+# ── Query plans ─────────────────────────────────────────────
+# Every query transform.py can send to the raw table, by name.
+def kpi_queries(table=KPI_TABLE, dialect="mssql"):
+    raw     = dict(KPI_SOURCES["raw"], table=table, **sql_fragments(dialect))
+    queries = {"kpi_snapshot": snapshot_query(dialect).format(**raw)}
+    queries.update({name: sql.format(**raw) for name, (sql, _) in KPI_QUERIES.items()})
+    return queries
+
+@dataclass
+class QueryPlan:
+    operators:  list = field(default_factory=list)
+    full_scans: list = field(default_factory=list)
+    error:      str  = None
+
+    @property
+    def ok(self):
+        return self.error is None and not self.full_scans
+
+SHOWPLAN_NS   = "{http://schemas.microsoft.com/sqlserver/2004/07/showplan}"
+FULL_SCAN_OPS = ("Table Scan", "Clustered Index Scan")
+
+def _parse_showplan(xml, table):
+    plan = QueryPlan()
+    for relop in ET.fromstring(xml).iter(f"{SHOWPLAN_NS}RelOp"):
+        op  = relop.get("PhysicalOp")
+        obj = next((o for o in relop.iter(f"{SHOWPLAN_NS}Object")), None)
+        if obj is None:
+            plan.operators.append(op)
+            continue
+        target = f"{obj.get('Table', '')}.{obj.get('Index', '')}".strip(".")
+        plan.operators.append(f"{op} {target}")
+        if op in FULL_SCAN_OPS and obj.get("Table", "").strip("[]").lower() == table.lower():
+            plan.full_scans.append(f"{op} {target}")
+    return plan
+
+def _mssql_plan(cursor, sql, table, actual):
+    if not actual:
+        cursor.execute("SET SHOWPLAN_XML ON")
+        try:
+            cursor.execute(sql)
+            xml = cursor.fetchone()[0]
+        finally:
+            cursor.execute("SET SHOWPLAN_XML OFF")
+        return _parse_showplan(xml, table)
+
+    # Actual plan: runs the query; the plan arrives as a trailing result set
+    cursor.execute("SET STATISTICS XML ON")
+    try:
+        cursor.execute(sql)
+        xml = None
+        while True:
+            if cursor.description and "Showplan" in cursor.description[0][0]:
+                xml = cursor.fetchone()[0]
+            if not cursor.nextset():
+                break
+    finally:
+        cursor.execute("SET STATISTICS XML OFF")
+    return _parse_showplan(xml, table)
+
+# SQLite: a bare "SCAN <table>" reads every row; "SCAN <table> USING
+# COVERING INDEX ..." reads only the (narrow) index.
+def _sqlite_plan(cursor, sql, table):
+    cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+    plan = QueryPlan()
+    for row in cursor.fetchall():
+        detail = row[-1]
+        plan.operators.append(detail)
+        if detail.split()[:2] == ["SCAN", table] and "INDEX" not in detail:
+            plan.full_scans.append(detail)
+    return plan
+
+# DuckDB always scans (column by column), so its plans are only printed
+def _duckdb_plan(cursor, sql):
+    cursor.execute(f"EXPLAIN {sql}")
+    return QueryPlan(operators=[line for row in cursor.fetchall() for line in row[-1].splitlines()])
+
+def explain(conn, sql, table=KPI_TABLE, actual=False):
+    cursor = conn.connection.cursor()
+    try:
+        if conn.dialect.name == "mssql":
+            return _mssql_plan(cursor, sql, table, actual)
+        if conn.dialect.name == "duckdb":
+            return _duckdb_plan(cursor, sql)
+        return _sqlite_plan(cursor, sql, table)
+    except Exception as e:
+        conn.connection.rollback()
+        return QueryPlan(error=str(e))
+
+def check_plans(conn=None, actual=False, table=KPI_TABLE):
+    if conn is None:
+        with get_connection() as conn:
+            return check_plans(conn, actual, table)
+    return {name: explain(conn, sql, table, actual) for name, sql in kpi_queries(table, conn.dialect.name).items()}
+
+# ── Setup / diagnostic command ──────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description="Create and check the indexes the KPI queries rely on")
+    parser.add_argument("--ensure", action="store_true", help="create any missing KPI indexes")
+    parser.add_argument("--explain", action="store_true", help="print the plan of every KPI query")
+    parser.add_argument("--actual", action="store_true", help="run the queries and show actual plans (SQL Server)")
+    parser.add_argument("--table", default=KPI_TABLE, help=f"table to index and check (default: {KPI_TABLE})")
+    args  = parser.parse_args()
+    table = args.table
+
+    if args.ensure:
+        created = ensure_indexes(table=table)
+        print(f"🗂️  Created {len(created)} index(es): {', '.join(created)}" if created
+              else "🗂️  All KPI indexes already exist")
+
+    missing = verify_indexes(table=table)
+    if missing:
+        print(f"⚠️  Missing indexes on {table}: {', '.join(missing)} (run with --ensure)")
+    else:
+        print(f"✅ All KPI indexes present on {table}")
+
+    plans   = check_plans(actual=args.actual, table=table)
+    flagged = [name for name, plan in plans.items() if not plan.ok]
+    for name, plan in plans.items():
+        status = "❌" if plan.error else ("⚠️ " if plan.full_scans else "✅")
+        print(f"\n{status} {name}")
+        if plan.error:
+            print(f"   error: {plan.error}")
+            continue
+        for scan in plan.full_scans:
+            print(f"   full scan: {scan}")
+        if args.explain:
+            for op in plan.operators:
+                print(f"   → {op}")
+
+    if missing or flagged:
+        print(f"\n⚠️  {len(flagged)} KPI query(ies) need attention: {', '.join(flagged)}")
+        sys.exit(1)
+    print("\n✅ Every KPI query is served by an index")
+
+if __name__ == "__main__":
+    main()
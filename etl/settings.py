@@ -0,0 +1,38 @@
+import os
+import yaml
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CONFIG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "config", "config.yaml"))
+
+_config = None
+
+# ── Load config/config.yaml once per process ────────────────
+def load_config():
+    global _config
+    if _config is None:
+        try:
+            with open(CONFIG_PATH, encoding="utf-8") as f:
+                _config = yaml.safe_load(f) or {}
+        except FileNotFoundError:
+            _config = {}
+    return _config
+
+def _coerce(value, default):
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int):
+        return int(value)
+    if isinstance(default, float):
+        return float(value)
+    return value
+
+# ── Setting lookup: env var wins, then config.yaml, then default
+# e.g. get_setting("database", "pool_size", 5) reads DATABASE_POOL_SIZE
+def get_setting(section, key, default=None, env=None):
+    for name in (env, f"{section}_{key}".upper()):
+        if name and os.getenv(name) is not None:
+            return _coerce(os.getenv(name), default)
+    value = (load_config().get(section) or {}).get(key)
+    return default if value is None else value
@@ -0,0 +1,303 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import numpy as np
+import pandas as pd
+from etl.settings import get_setting
+
+# ── Distinct-count sketches for customer KPIs ───────────────
+# Exact distinct counts need memory proportional to the number of
+# customers: a set, a COUNT(DISTINCT), or the (cube cell, customer) pairs. With
+# sketches.mode: approx the customer KPIs use fixed-size sketches
+# instead, which merge across partitions (months, products, cube
+# cells, loads) without going back to the rows:
+#
+#   HyperLogLog  2^p one-byte registers, merged by element-wise max.
+#                Distinct counts, relative standard error 1.04 / √2^p:
+#                p=12 → 4 KB, ±1.6 %    p=14 → 16 KB, ±0.8 %
+#   Theta (KMV)  the k smallest 64-bit hashes seen, merged by union.
+#                Distinct counts (±1 / √k) and set intersections, e.g.
+#                customers in both 2004 and 2005; the error of |A ∩ B|
+#                is about √(|A ∪ B| / |A ∩ B|) / √k relative, so small
+#                overlaps of large sets are the least accurate.
+#                k=4096 → 32 KB, ±1.6 %; exact below k customers
+#
+# About 95 % of estimates fall within two standard errors. Sketches
+# only add: a customer whose rows are all deleted stays counted until
+# the sketch is rebuilt (see etl/incremental.py --verify / --rebuild).
+# sketches.mode: exact (the default) keeps the exact paths, and
+#
+#   python etl/sketches.py --verify
+#
+# compares every sketch estimate with the exact count from the
+# snapshot.
+SKETCH_MODE   = get_setting("sketches", "mode", "exact")
+APPROXIMATE   = SKETCH_MODE == "approx"
+HLL_PRECISION = get_setting("sketches", "hll_precision", 12)
+THETA_ENTRIES = get_setting("sketches", "theta_entries", 4096)
+TOP_CUSTOMERS = get_setting("sketches", "top_customers", 1024)
+
+# 64-bit hashes of the non-null values, as text so the same customer
+# hashes alike from every source (SQL, CSV, Parquet categoricals)
+def hash_values(values):
+    values = pd.Series(values).dropna()
+    return pd.util.hash_array(values.astype(str).to_numpy(dtype=object), categorize=False)
+
+def hll_error(p=HLL_PRECISION):
+    return 1.04 / np.sqrt(2 ** p)
+
+def theta_error(k=THETA_ENTRIES):
+    return 1 / np.sqrt(k - 1)
+
+# ── HyperLogLog ─────────────────────────────────────────────
+# The first p bits of a hash pick a register, which keeps the longest
+# run of leading zeros (+1) seen in the remaining bits.
+def _bit_length(values):
+    values = values.copy()
+    length = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = values >= np.uint64(1 << shift)
+        length[big] += shift
+        values[big] >>= np.uint64(shift)
+    return length + (values > 0)
+
+def hll_positions(hashes, p=HLL_PRECISION):
+    index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+    rest  = hashes & np.uint64((1 << (64 - p)) - 1)
+    rank  = (64 - p) - _bit_length(rest) + 1
+    return index, rank.astype(np.uint8)
+
+# One row of registers per group: groups[i] is the row of hashes[i]
+def hll_registers(hashes, groups=None, n_groups=1, p=HLL_PRECISION):
+    registers   = np.zeros((n_groups, 2 ** p), dtype=np.uint8)
+    index, rank = hll_positions(hashes, p)
+    rows        = np.zeros(len(hashes), dtype=np.int64) if groups is None else groups
+    np.maximum.at(registers, (rows, index), rank)
+    return registers
+
+# Estimate per row of registers (any leading shape), with linear
+# counting while many registers are still empty
+def hll_estimate(registers):
+    m     = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw   = alpha * m * m / np.exp2(-registers.astype(np.float64)).sum(axis=-1)
+    zeros = np.count_nonzero(registers == 0, axis=-1)
+    small = m * np.log(m / np.maximum(zeros, 1))
+    return np.rint(np.where((raw <= 2.5 * m) & (zeros > 0), small, raw)).astype(np.int64)
+
+class HyperLogLog:
+    def __init__(self, p=HLL_PRECISION):
+        self.registers = np.zeros(2 ** p, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        self.registers = np.maximum(self.registers, hll_registers(hashes, p=self.precision)[0])
+        return self
+
+    def update(self, values):
+        return self.add_hashes(hash_values(values))
+
+    def merge(self, other):
+        self.registers = np.maximum(self.registers, other.registers)
+        return self
+
+    @property
+    def precision(self):
+        return int(self.registers.size).bit_length() - 1
+
+    def count(self):
+        return int(hll_estimate(self.registers))
+
+    def __eq__(self, other):
+        return isinstance(other, HyperLogLog) and np.array_equal(self.registers, other.registers)
+
+# ── Theta sketch (k minimum values) ─────────────────────────
+# Keeps the hashes below theta, at most k of them; theta starts above
+# every hash (None) and drops to the (k+1)-th smallest hash once more
+# than k are seen. Every hash below theta is kept, so unions and
+# intersections of two sketches are exact over that sample, and
+# estimates scale the sample by 2^64 / theta.
+class ThetaSketch:
+    def __init__(self, k=THETA_ENTRIES):
+        self.k      = k
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.theta  = None
+
+    def _keep(self, hashes, theta):
+        if theta is not None:
+            hashes = hashes[hashes < np.uint64(theta)]
+        hashes = np.unique(hashes)
+        if len(hashes) > self.k:
+            theta, hashes = int(hashes[self.k]), hashes[:self.k]
+        self.hashes, self.theta = hashes, theta
+        return self
+
+    def add_hashes(self, hashes):
+        return self._keep(np.concatenate([self.hashes, hashes]), self.theta)
+
+    def update(self, values):
+        return self.add_hashes(hash_values(values))
+
+    def merge(self, other):
+        return self._keep(np.concatenate([self.hashes, other.hashes]), _min_theta(self, other))
+
+    def _below(self, theta):
+        return self.hashes if theta is None else self.hashes[self.hashes < np.uint64(theta)]
+
+    @staticmethod
+    def _scale(theta, n):
+        return int(round(n if theta is None else n * 2.0 ** 64 / theta))
+
+    def count(self):
+        return self._scale(self.theta, len(self.hashes))
+
+    def intersection_count(self, other):
+        theta = _min_theta(self, other)
+        return self._scale(theta, len(np.intersect1d(self._below(theta), other._below(theta), assume_unique=True)))
+
+    def __eq__(self, other):
+        return (isinstance(other, ThetaSketch) and self.theta == other.theta
+                and np.array_equal(self.hashes, other.hashes))
+
+def _min_theta(*sketches):
+    thetas = [s.theta for s in sketches if s.theta is not None]
+    return min(thetas) if thetas else None
+
+# ── Customer sketch: HLL for counts, theta for overlaps ─────
+class CustomerSketch:
+    def __init__(self):
+        self.hll   = HyperLogLog()
+        self.theta = ThetaSketch()
+
+    def update(self, values):
+        hashes = hash_values(values)
+        self.hll.add_hashes(hashes)
+        self.theta.add_hashes(hashes)
+        return self
+
+    def merge(self, other):
+        self.hll.merge(other.hll)
+        self.theta.merge(other.theta)
+        return self
+
+    def count(self):
+        return self.hll.count()
+
+    # (customers in self, of them also in other), both from the theta
+    # samples below the same theta, so the overlap never exceeds the base
+    def overlap(self, other):
+        theta = _min_theta(self.theta, other.theta)
+        base  = self.theta._below(theta)
+        kept  = np.intersect1d(base, other.theta._below(theta), assume_unique=True)
+        return ThetaSketch._scale(theta, len(base)), ThetaSketch._scale(theta, len(kept))
+
+    def __eq__(self, other):
+        return isinstance(other, CustomerSketch) and self.hll == other.hll and self.theta == other.theta
+
+def merge_sketches(sketches):
+    merged = CustomerSketch()
+    for sketch in sketches:
+        merged.merge(sketch)
+    return merged
+
+# ── Top customers by revenue (bounded) ──────────────────────
+# Revenue, orders and lines of at most `capacity` customers. Each batch
+# of deltas is added to the tracked customers (new ones join, rows
+# taken back out subtract) and, past capacity, the lowest-revenue
+# customers are evicted. `floor` is the highest revenue evicted so
+# far: while nothing has been evicted the table is exact, afterwards
+# any customer above the floor is still tracked (a customer evicted
+# early may reappear with only its later revenue).
+class TopCustomers:
+    COLUMNS = ["revenue", "orders", "lines"]
+
+    def __init__(self, capacity=TOP_CUSTOMERS):
+        self.capacity = capacity
+        self.table    = pd.DataFrame(columns=self.COLUMNS, index=pd.Index([], name="CUSTOMERNAME"))
+        self.floor    = None
+
+    @property
+    def evicted(self):
+        return self.floor is not None
+
+    def update(self, deltas):
+        change = deltas.groupby("CUSTOMERNAME", dropna=False)[self.COLUMNS].sum()
+        table  = change if self.table.empty else pd.concat([self.table, change]).groupby(level=0, dropna=False).sum()
+        table  = table[table["lines"] != 0].sort_values("revenue", ascending=False)
+        if len(table) > self.capacity:
+            dropped    = float(table["revenue"].iloc[self.capacity])
+            self.floor = dropped if self.floor is None else max(self.floor, dropped)
+            table      = table.iloc[:self.capacity]
+        self.table = table
+        return self
+
+    def frame(self):
+        return self.table.reset_index()
+
+    def __eq__(self, other):
+        return (isinstance(other, TopCustomers) and self.floor == other.floor
+                and self.table.sort_index().equals(other.table.sort_index()))
+
+# ── Verification: sketches vs exact sets from the snapshot ──
+PARTITIONS = {"year": ["YEAR_ID"], "month": ["YEAR_ID", "MONTH_ID"], "product": ["PRODUCTLINE"]}
+
+def _partition_key(keys):
+    return keys if isinstance(keys, tuple) else (keys,)
+
+def compare_with_exact(retention_years=(2004, 2005)):
+    from etl.snapshot import ensure_snapshot, iter_snapshot_batches
+    ensure_snapshot()
+    exact    = {name: {} for name in PARTITIONS}
+    sketched = {name: {} for name in PARTITIONS}
+    for df in iter_snapshot_batches(["YEAR_ID", "MONTH_ID", "PRODUCTLINE", "CUSTOMERNAME"]):
+        for name, keys in PARTITIONS.items():
+            for key, group in df.groupby(keys, observed=True)["CUSTOMERNAME"]:
+                key = _partition_key(key)
+                exact[name].setdefault(key, set()).update(group.dropna())
+                sketched[name].setdefault(key, CustomerSketch()).update(group)
+
+    rows = []
+    for name in PARTITIONS:
+        for key in sorted(exact[name]):
+            rows.append({"partition": name, "key": "/".join(map(str, key)), "kind": "distinct",
+                         "exact": len(exact[name][key]), "estimate": sketched[name][key].count(),
+                         "bound": hll_error()})
+    total = merge_sketches(sketched["year"].values())
+    rows.append({"partition": "all", "key": "", "kind": "distinct", "bound": hll_error(),
+                 "exact": len(set().union(*exact["year"].values())), "estimate": total.count()})
+
+    before, after = (retention_years[0],), (retention_years[1],)
+    empty         = CustomerSketch()
+    base, kept    = sketched["year"].get(before, empty).overlap(sketched["year"].get(after, empty))
+    exact_before  = exact["year"].get(before, set())
+    exact_kept    = exact_before & exact["year"].get(after, set())
+    union         = len(exact_before | exact["year"].get(after, set()))
+    rows.append({"partition": "retention", "key": "→".join(map(str, retention_years)), "kind": "overlap",
+                 "exact": len(exact_kept), "estimate": kept,
+                 "bound": theta_error() * np.sqrt(union / max(len(exact_kept), 1))})
+    rows.append({"partition": "retention", "key": str(retention_years[0]), "kind": "base",
+                 "exact": len(exact_before), "estimate": base, "bound": theta_error()})
+
+    report = pd.DataFrame(rows)
+    report["error"] = (report["estimate"] - report["exact"]) / report["exact"].where(report["exact"] > 0)
+    return report.fillna({"error": 0.0})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare customer sketches with exact distinct counts")
+    parser.add_argument("--verify", action="store_true", help="exit 1 if an estimate is off by more than 3 standard errors")
+    args = parser.parse_args()
+
+    report = compare_with_exact()
+    report["error %"] = (report["error"] * 100).round(2)
+    report["bound %"] = (report["bound"] * 100).round(2)
+    print(f"📐 HyperLogLog p={HLL_PRECISION} ({2 ** HLL_PRECISION / 1024:.0f} KB, ±{hll_error():.2%}), "
+          f"theta k={THETA_ENTRIES} ({THETA_ENTRIES * 8 / 1024:.0f} KB, ±{theta_error():.2%})")
+    print(report[["partition", "key", "kind", "exact", "estimate", "error %", "bound %"]].to_string(index=False))
+
+    outliers = report[report["error"].abs() > 3 * report["bound"]]
+    print(f"   → worst error {report['error'].abs().max():.2%}")
+    if len(outliers):
+        print(f"❌ {len(outliers)} estimate(s) outside 3 standard errors")
+        sys.exit(1 if args.verify else 0)
+    print("✅ Sketch estimates within their error bounds")
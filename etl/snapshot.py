@@ -0,0 +1,217 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import glob
+import json
+import time
+import hashlib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from etl.settings import get_setting
+from etl.csv_stream import CSV_PATH, iter_csv_batches
+from etl.schema import COLUMNS, INT_COLUMNS, FLOAT_COLUMNS, clean_frame
+
+ROOT_DIR      = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SNAPSHOT_PATH = os.path.join(ROOT_DIR, get_setting("snapshot", "path", "data/snapshot/sales.parquet"))
+META_PATH     = SNAPSHOT_PATH + ".json"
+ARROW_BASE    = os.path.splitext(SNAPSHOT_PATH)[0]
+
+# ── Columnar snapshot of the sales CSV ──────────────────────
+# The CSV is parsed, cleaned and typed once into a compressed Parquet
+# file. Text columns come back as categoricals and ORDERDATE as a real
+# datetime, and readers load only the columns they ask for.
+DATE_COLUMNS     = ["ORDERDATE"]
+DATE_FORMAT      = "%m/%d/%Y %H:%M"
+SNAPSHOT_FORMAT  = 2    # bump when the stored layout changes, to force a rebuild
+CATEGORY_COLUMNS = [c for c in COLUMNS if c not in INT_COLUMNS + FLOAT_COLUMNS + DATE_COLUMNS]
+
+# ── Freshness: source size + mtime, then content hash ───────
+def _source_stat(path):
+    stat = os.stat(path)
+    return {"source": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def _source_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _read_meta():
+    try:
+        with open(META_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _write_meta(meta):
+    tmp = f"{META_PATH}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, META_PATH)
+
+# A touched-but-identical CSV only costs one hash, not a rebuild
+def snapshot_is_fresh(csv_path=CSV_PATH):
+    meta = _read_meta()
+    if meta is None or meta.get("format") != SNAPSHOT_FORMAT \
+            or not os.path.exists(SNAPSHOT_PATH) or not os.path.exists(_arrow_path(meta)):
+        return False
+    stat = _source_stat(csv_path)
+    if all(meta.get(k) == v for k, v in stat.items()):
+        return True
+    if meta.get("source") == stat["source"] and meta.get("size") == stat["size"] \
+            and meta.get("sha256") == _source_hash(csv_path):
+        _write_meta({**meta, **stat})
+        return True
+    return False
+
+def snapshot_version():
+    meta = _read_meta()
+    return meta["sha256"] if meta else None
+
+# Source size / hash / row count the current snapshot was built from
+def snapshot_meta():
+    return _read_meta()
+
+def _arrow_path(meta):
+    return os.path.join(os.path.dirname(SNAPSHOT_PATH), meta.get("arrow", ""))
+
+# ── Build ───────────────────────────────────────────────────
+def _typed(batch):
+    batch = clean_frame(batch)
+    for col in DATE_COLUMNS:
+        batch[col] = pd.to_datetime(batch[col], format=DATE_FORMAT, errors="coerce")
+    return batch[COLUMNS]
+
+# Streams the CSV batch by batch into row groups, so building the
+# snapshot stays within the loader's memory budget.
+def build_snapshot(csv_path=CSV_PATH, force=False):
+    if not force and snapshot_is_fresh(csv_path):
+        return SNAPSHOT_PATH
+
+    started = time.perf_counter()
+    os.makedirs(os.path.dirname(SNAPSHOT_PATH), exist_ok=True)
+    tmp    = f"{SNAPSHOT_PATH}.{os.getpid()}.tmp"
+    writer = None
+    rows   = 0
+    try:
+        for batch in iter_csv_batches(csv_path, progress=False):
+            table = pa.Table.from_pandas(_typed(batch), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, table.schema, compression="zstd")
+            else:
+                table = table.cast(writer.schema)
+            writer.write_table(table)
+            rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp, SNAPSHOT_PATH)
+
+    sha256 = _source_hash(csv_path)
+    arrow  = _write_arrow(f"{ARROW_BASE}.{sha256[:12]}.arrow")
+    _write_meta({**_source_stat(csv_path), "sha256": sha256, "rows": rows, "format": SNAPSHOT_FORMAT,
+                 "arrow": os.path.basename(arrow),
+                 "built_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                 "build_seconds": round(time.perf_counter() - started, 3)})
+    _remove_stale_arrow(arrow)
+    return SNAPSHOT_PATH
+
+# ── Memory-mappable Arrow IPC copy ──────────────────────────
+# Uncompressed Arrow IPC, so every process maps the same file pages
+# instead of holding its own decoded copy. Text columns are stored as
+# dictionaries with sorted values, one dictionary per column. Each
+# build gets a new file name: a file that is still mapped is never
+# overwritten, which also keeps Windows from refusing the replace.
+def _sorted_dictionary(column):
+    values     = column.cast(pa.string())
+    dictionary = pc.drop_null(pc.unique(values))
+    dictionary = dictionary.take(pc.sort_indices(dictionary))
+    indices    = _compact_int(pc.index_in(values, value_set=dictionary).combine_chunks())
+    return pa.DictionaryArray.from_arrays(indices, dictionary)
+
+# Integer columns are stored in the narrowest type that holds every
+# value (ids and calendar fields fit in int8/int16/int32), which the
+# mapped frame then exposes without a copy. Floats stay float64: SALES
+# is summed into revenue totals, where float32 would lose cents.
+COMPACT_INT_TYPES = [pa.int8(), pa.int16(), pa.int32()]
+
+def _compact_int(column):
+    bounds = pc.min_max(column).as_py()
+    if bounds["min"] is None:
+        return column
+    for dtype in COMPACT_INT_TYPES:
+        info = np.iinfo(dtype.to_pandas_dtype())
+        if info.min <= bounds["min"] and bounds["max"] <= info.max:
+            return column.cast(dtype)
+    return column
+
+def _write_arrow(path):
+    table   = pq.read_table(SNAPSHOT_PATH)
+    columns = [_sorted_dictionary(table[c]) if c in CATEGORY_COLUMNS
+               else _compact_int(table[c].combine_chunks()) if c in INT_COLUMNS
+               else table[c].combine_chunks()
+               for c in table.column_names]
+    table   = pa.table(columns, names=table.column_names)
+    tmp     = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+    return path
+
+def _remove_stale_arrow(current):
+    for path in glob.glob(f"{ARROW_BASE}.*.arrow"):
+        if path != current:
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # still mapped by a running process; removed on a later build
+
+def ensure_snapshot(csv_path=CSV_PATH):
+    build_snapshot(csv_path)
+    return snapshot_version()
+
+# ── Read with column projection ─────────────────────────────
+# Categories are put in sorted order so groupby output is ordered the
+# same way as it was for plain string columns.
+def _to_frame(table):
+    df = table.to_pandas()
+    for col in df.columns.intersection(CATEGORY_COLUMNS):
+        df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+    return df
+
+def read_snapshot(columns=None, csv_path=CSV_PATH):
+    ensure_snapshot(csv_path)
+    columns = columns or COLUMNS
+    table   = pq.read_table(SNAPSHOT_PATH, columns=columns,
+                            read_dictionary=[c for c in columns if c in CATEGORY_COLUMNS])
+    return _to_frame(table)
+
+def iter_snapshot_batches(columns=None, batch_rows=65536, csv_path=CSV_PATH):
+    ensure_snapshot(csv_path)
+    parquet = pq.ParquetFile(SNAPSHOT_PATH, read_dictionary=[c for c in (columns or COLUMNS) if c in CATEGORY_COLUMNS])
+    for batch in parquet.iter_batches(batch_size=batch_rows, columns=columns):
+        yield _to_frame(batch)
+
+def open_mapped(columns=None, csv_path=CSV_PATH):
+    ensure_snapshot(csv_path)
+    table = pa.ipc.open_file(pa.memory_map(_arrow_path(_read_meta()), "r")).read_all()
+    return table.select(columns) if columns else table
+
+# Numeric columns come back as zero-copy (read-only) views of the
+# mapped file and text columns as categoricals over the stored
+# dictionaries. split_blocks keeps pandas from consolidating (copying)
+# same-typed columns into one block.
+def mapped_frame(columns=None, csv_path=CSV_PATH):
+    return open_mapped(columns, csv_path).to_pandas(split_blocks=True, ignore_metadata=True)
+
+if __name__ == "__main__":
+    path = build_snapshot(force="--force" in sys.argv)
+    meta = _read_meta()
+    print(f"✅ Snapshot ready at {path}")
+    print(f"   → {meta['rows']:,} rows, {os.path.getsize(path) / 1024:,.0f} KB "
+          f"(CSV {meta['size'] / 1024:,.0f} KB), built {meta['built_at']}")
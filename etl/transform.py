@@ -1,158 +1,507 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import pandas as pd
-from sqlalchemy import create_engine
+from dataclasses import dataclass
+from sqlalchemy import create_engine, event
+from etl.settings import get_setting
+from etl.cache import get_cache
+from etl.sketches import APPROXIMATE
+from etl.backends import SALES_TABLE, database_url, get_backend, sql_fragments
 
-def get_connection():
+# ── Connection Pool ─────────────────────────────────────────
+# One engine per process: the pool keeps connections open between
+# KPI calls so long-lived processes (dashboard, scheduler) never pay
+# engine construction or a fresh ODBC handshake per query.
+_engine      = None
+_engine_lock = threading.Lock()
+_stats_lock  = threading.Lock()
+_pool_stats  = {
+    "connects":       0,
+    "connect_time_s": 0.0,
+    "checkouts":      0,
+    "checkins":       0,
+    "waits":          0,
+    "wait_time_s":    0.0,
+}
+
+def _record(**deltas):
+    with _stats_lock:
+        for key, value in deltas.items():
+            _pool_stats[key] += value
+
+def _create_engine():
     engine = create_engine(
-        "mssql+pyodbc://DESKTOP-FHDJ2FC\\SQLEXPRESS/sales_db"
-        "?driver=ODBC+Driver+17+for+SQL+Server"
-        "&trusted_connection=yes"
+        database_url(),
+        pool_size     = get_setting("database", "pool_size", 5),
+        max_overflow  = get_setting("database", "max_overflow", 10),
+        pool_timeout  = get_setting("database", "pool_timeout", 30),
+        pool_recycle  = get_setting("database", "pool_recycle", 1800),
+        pool_pre_ping = get_setting("database", "pool_pre_ping", True),
+    )
+
+    @event.listens_for(engine, "do_connect")
+    def _before_connect(dialect, conn_rec, cargs, cparams):
+        conn_rec.info["connect_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, conn_rec):
+        started = conn_rec.info.pop("connect_started", None)
+        if started is not None:
+            _record(connects=1, connect_time_s=time.perf_counter() - started)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_conn, conn_rec, conn_proxy):
+        _record(checkouts=1)
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_conn, conn_rec):
+        _record(checkins=1)
+
+    return engine
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _create_engine()
+    return _engine
+
+def dispose_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+
+def get_connection():
+    engine    = get_engine()
+    pool      = engine.pool
+    limit     = get_setting("database", "pool_size", 5) + get_setting("database", "max_overflow", 10)
+    saturated = hasattr(pool, "checkedout") and pool.checkedout() >= limit
+    started   = time.perf_counter()
+    conn      = engine.connect()
+    if saturated:
+        _record(waits=1, wait_time_s=time.perf_counter() - started)
+    return conn
+
+# ── Pool statistics for monitoring ──────────────────────────
+def get_pool_stats():
+    pool = get_engine().pool
+    with _stats_lock:
+        stats = dict(_pool_stats)
+    stats["avg_connect_ms"] = round(stats["connect_time_s"] / stats["connects"] * 1000, 2) if stats["connects"] else 0
+    stats["pool_size"]      = pool.size() if hasattr(pool, "size") else None
+    stats["checked_out"]    = pool.checkedout() if hasattr(pool, "checkedout") else None
+    stats["overflow"]       = pool.overflow() if hasattr(pool, "overflow") else None
+    stats["status"]         = pool.status()
+    return stats
+
+# ── KPI Snapshot: all eight KPIs from one grouped scan ──────
+# Each KPI needs sales at its own grain only: the grand total, or one
+# row per product line, country, customer or month. One GROUPING SETS
+# query computes all of them in a single pass and returns O(groups of
+# each KPI) rows, labelled by `grouping_set`. Per customer it also
+# flags the years 2004 and 2005 for the retention KPI. SQLite has no
+# GROUPING SETS and gets the same rows from one UNION ALL batch.
+PROFIT_RATE = 0.45
+
+SNAPSHOT_SETS = {
+    "total":    [],
+    "product":  ["PRODUCTLINE"],
+    "region":   ["COUNTRY"],
+    "customer": ["CUSTOMERNAME"],
+    "month":    ["YEAR_ID", "MONTH_ID"],
+}
+SNAPSHOT_KEYS     = ["PRODUCTLINE", "COUNTRY", "CUSTOMERNAME", "YEAR_ID", "MONTH_ID"]
+SNAPSHOT_MEASURES = """
+        {revenue} as revenue,
+        {orders} as orders,
+        MAX(CASE WHEN YEAR_ID = 2004 THEN 1 ELSE 0 END) as in_2004,
+        MAX(CASE WHEN YEAR_ID = 2005 THEN 1 ELSE 0 END) as in_2005"""
+
+def snapshot_query(dialect):
+    if sql_fragments(dialect)["grouping_sets"]:
+        label = " ".join(f"WHEN GROUPING({dims[0]}) = 0 THEN '{name}'" for name, dims in SNAPSHOT_SETS.items() if dims)
+        sets  = ", ".join(f"({', '.join(dims)})" for dims in SNAPSHOT_SETS.values())
+        return f"""
+    SELECT CASE {label} ELSE 'total' END as grouping_set,
+        {", ".join(SNAPSHOT_KEYS)},{SNAPSHOT_MEASURES}
+    FROM {{table}}
+    GROUP BY GROUPING SETS ({sets})
+"""
+    parts = []
+    for name, dims in SNAPSHOT_SETS.items():
+        keys  = ", ".join(c if c in dims else f"NULL as {c}" for c in SNAPSHOT_KEYS)
+        group = f"\n    GROUP BY {', '.join(dims)}" if dims else ""
+        parts.append(f"""
+    SELECT '{name}' as grouping_set,
+        {keys},{SNAPSHOT_MEASURES}
+    FROM {{table}}{group}""")
+    return "\n    UNION ALL".join(parts)
+
+# ── KPI sources: raw rows or the import-time aggregate ──────
+# etl/import_to_sql.py maintains sales_monthly_agg at the snapshot
+# grain, in the same transaction as each load, and stamps it with that
+# load's id. While the stamp is the latest load id, KPI queries read it
+# (O(groups)); otherwise they fall back to the raw table.
+KPI_SOURCES = {
+    "raw": {"table": SALES_TABLE,         "revenue": "SUM(SALES)",   "orders": "COUNT(ORDERNUMBER)"},
+    "agg": {"table": "sales_monthly_agg", "revenue": "SUM(revenue)", "orders": "SUM(orders)"},
+}
+
+FRESHNESS_QUERY = """
+    SELECT m.load_id, (SELECT MAX(load_id) FROM sales_load_state) as current_load
+    FROM sales_agg_meta m
+"""
+
+def _aggregates_fresh(conn):
+    if not get_setting("aggregates", "enabled", True):
+        return False
+    try:
+        df = pd.read_sql(FRESHNESS_QUERY, conn)
+    except Exception:
+        conn.rollback()
+        return False
+    return len(df) == 1 and pd.notna(df["load_id"][0]) and df["load_id"][0] == df["current_load"][0]
+
+def get_kpi_source(conn=None):
+    if conn is not None:
+        return KPI_SOURCES["agg" if _aggregates_fresh(conn) else "raw"]
+    conn = get_connection()
+    try:
+        return get_kpi_source(conn)
+    finally:
+        conn.close()
+
+@dataclass(frozen=True)
+class KpiSnapshot:
+    total_revenue:      float
+    total_profit:       float
+    profit_margin_pct:  float
+    cac:                float
+    customer_status:    pd.DataFrame
+    revenue_by_product: pd.DataFrame
+    revenue_by_region:  pd.DataFrame
+    top_salespeople:    pd.DataFrame
+    monthly_revenue:    pd.DataFrame
+
+    @property
+    def active_customers(self):
+        return int(self.customer_status["active_customers"][0])
+
+    @property
+    def churned_customers(self):
+        return int(self.customer_status["churned_customers"][0])
+
+    @property
+    def retention_pct(self):
+        total = self.active_customers + self.churned_customers
+        return round((self.active_customers / total) * 100, 1) if total > 0 else 0
+
+# ── KPI builders: shared by the snapshot and fetch_kpis() ───
+# Each takes any frame carrying the columns it needs (the snapshot
+# grain or a narrower per-KPI result) and returns the KPI value.
+def _profit_metrics(total_revenue):
+    total_profit  = round(total_revenue * PROFIT_RATE, 2)
+    profit_margin = round((total_profit / total_revenue) * 100, 2)
+    return {"total_profit": total_profit, "profit_margin_pct": profit_margin}
+
+def _revenue_by(df, column, label):
+    df = df.groupby(column, dropna=False)["revenue"].sum().reset_index()
+    df = df.rename(columns={column: label})
+    df["profit"] = df["revenue"] * PROFIT_RATE
+    return df.sort_values("revenue", ascending=False, ignore_index=True)
+
+def _top_customers(df):
+    return (df.groupby("CUSTOMERNAME", dropna=False)
+              .agg(revenue=("revenue", "sum"), total_sales=("orders", "sum"))
+              .reset_index()
+              .rename(columns={"CUSTOMERNAME": "salesperson"})
+              .sort_values("revenue", ascending=False, ignore_index=True)
+              .head(10))
+
+def _monthly(df):
+    df = (df.groupby(["YEAR_ID", "MONTH_ID"])["revenue"].sum()
+            .reset_index()
+            .sort_values(["YEAR_ID", "MONTH_ID"], ignore_index=True))
+    df.insert(0, "month",
+        df["YEAR_ID"].astype(int).astype(str) + "-" +
+        df["MONTH_ID"].astype(int).astype(str).str.zfill(2))
+    df["profit"] = df["revenue"] * PROFIT_RATE
+    return df[["month", "revenue", "profit"]]
+
+def _cac(total_customers):
+    return round(500 / total_customers * 100, 2)
+
+# Year over year: who bought in 2004 came back in 2005?
+def _customer_status_counts(active, total):
+    return pd.DataFrame([{
+        "active_customers":  int(active),
+        "total_customers":   int(total),
+        "churned_customers": int(total) - int(active)
+    }])
+
+def _customer_status(df):
+    customers_2004 = set(df.loc[df["YEAR_ID"] == 2004, "CUSTOMERNAME"])
+    customers_2005 = set(df.loc[df["YEAR_ID"] == 2005, "CUSTOMERNAME"])
+    return _customer_status_counts(len(customers_2004 & customers_2005), len(customers_2004))
+
+def build_snapshot(groups):
+    part          = {name: groups[groups["grouping_set"] == name] for name in SNAPSHOT_SETS}
+    customers     = part["customer"]
+    total_revenue = round(part["total"]["revenue"].sum(), 2)
+    profit        = _profit_metrics(total_revenue)
+    in_2004       = customers["in_2004"] == 1
+    return KpiSnapshot(
+        total_revenue      = total_revenue,
+        total_profit       = profit["total_profit"],
+        profit_margin_pct  = profit["profit_margin_pct"],
+        cac                = _cac(customers["CUSTOMERNAME"].notna().sum()),
+        customer_status    = _customer_status_counts((in_2004 & (customers["in_2005"] == 1)).sum(), in_2004.sum()),
+        revenue_by_product = _revenue_by(part["product"], "PRODUCTLINE", "product"),
+        revenue_by_region  = _revenue_by(part["region"], "COUNTRY", "region"),
+        top_salespeople    = _top_customers(customers),
+        monthly_revenue    = _monthly(part["month"]),
     )
-    return engine.connect()
+
+# Uncached: the snapshot query against `source` (default: aggregates
+# while fresh, else the raw table)
+def query_kpi_snapshot(source=None):
+    conn = get_connection()
+    try:
+        source = source or get_kpi_source(conn)
+        groups = pd.read_sql(snapshot_query(conn.dialect.name).format(**source), conn)
+    finally:
+        conn.close()
+    return build_snapshot(groups)
+
+# Cached by data version, backend and source table: repeat calls from
+# the dashboard, PDF, email and Sheets jobs are served without running
+# the snapshot query. While the running KPI state (etl/incremental.py)
+# is at the current data version it is built from that instead.
+def get_kpi_snapshot():
+    source = get_kpi_source()
+    return get_cache("kpi").get_or_compute("kpi_snapshot", lambda: _compute_kpi_snapshot(source),
+                                           params=(get_backend(), source["table"]))
+
+def _compute_kpi_snapshot(source):
+    if get_setting("incremental", "enabled", True):
+        from etl.incremental import current_db_state
+        state = current_db_state()
+        if state is not None:
+            return state.snapshot()
+    return query_kpi_snapshot(source)
 
 # ── KPI 1: Total Revenue ────────────────────────────────────
 def get_total_revenue():
-    conn = get_connection()
-    df = pd.read_sql("SELECT SUM(SALES) as total_revenue FROM sale", conn)
-    conn.close()
-    return round(df["total_revenue"][0], 2)
+    return get_kpi_snapshot().total_revenue
 
 # ── KPI 2: Total Profit & Profit Margin ────────────────────
 def get_profit_metrics():
-    conn = get_connection()
-    df = pd.read_sql("""
-        SELECT 
-            SUM(SALES) as total_revenue,
-            SUM(SALES * 0.45) as total_profit
-        FROM sale
-    """, conn)
-    conn.close()
-    total_profit  = round(df["total_profit"][0], 2)
-    profit_margin = round((total_profit / df["total_revenue"][0]) * 100, 2)
-    return {"total_profit": total_profit, "profit_margin_pct": profit_margin}
+    snapshot = get_kpi_snapshot()
+    return {"total_profit": snapshot.total_profit,
+            "profit_margin_pct": snapshot.profit_margin_pct}
 
 # ── KPI 3: Revenue by Product ───────────────────────────────
 def get_revenue_by_product():
-    conn = get_connection()
-    df = pd.read_sql("""
-        SELECT 
-            PRODUCTLINE as product,
-            SUM(SALES) as revenue,
-            SUM(SALES * 0.45) as profit
-        FROM sale
-        GROUP BY PRODUCTLINE
-        ORDER BY revenue DESC
-    """, conn)
-    conn.close()
-    return df
+    return get_kpi_snapshot().revenue_by_product
 
 # ── KPI 4: Revenue by Region ────────────────────────────────
 def get_revenue_by_region():
-    conn = get_connection()
-    df = pd.read_sql("""
-        SELECT 
-            COUNTRY as region,
-            SUM(SALES) as revenue,
-            SUM(SALES * 0.45) as profit
-        FROM sale
-        GROUP BY COUNTRY
-        ORDER BY revenue DESC
-    """, conn)
-    conn.close()
-    return df
+    return get_kpi_snapshot().revenue_by_region
 
 # ── KPI 5: Top Customers by Revenue ────────────────────────
 def get_top_salespeople():
-    conn = get_connection()
-    df = pd.read_sql("""
-        SELECT TOP 10
-            CUSTOMERNAME as salesperson,
-            SUM(SALES) as revenue,
-            COUNT(ORDERNUMBER) as total_sales
-        FROM sale
-        GROUP BY CUSTOMERNAME
-        ORDER BY revenue DESC
-    """, conn)
-    conn.close()
-    return df
+    return get_kpi_snapshot().top_salespeople
 
 # ── KPI 6: Monthly Revenue Trend ───────────────────────────
 def get_monthly_revenue():
-    conn = get_connection()
-    df = pd.read_sql("""
-        SELECT 
-            CAST(YEAR_ID AS VARCHAR) + '-' + 
-            RIGHT('0' + CAST(MONTH_ID AS VARCHAR), 2) as month,
-            SUM(SALES) as revenue,
-            SUM(SALES * 0.45) as profit
-        FROM sale
-        GROUP BY YEAR_ID, MONTH_ID
-        ORDER BY YEAR_ID, MONTH_ID
-    """, conn)
-    conn.close()
-    return df
+    return get_kpi_snapshot().monthly_revenue
 
 # ── KPI 7: Customer Acquisition Cost (CAC) ─────────────────
 def get_cac():
-    conn = get_connection()
-    df = pd.read_sql("""
-        SELECT COUNT(DISTINCT CUSTOMERNAME) as total_customers
-        FROM sale
-    """, conn)
-    conn.close()
-    total_customers = df["total_customers"][0]
-    return round(500 / total_customers * 100, 2)
+    return get_kpi_snapshot().cac
 
 # ── KPI 8: Active vs Churned Customers ─────────────────────
 def get_customer_status():
+    return get_kpi_snapshot().customer_status
+
+# ── Concurrent KPI fetching ─────────────────────────────────
+# A full report should use get_kpi_snapshot() (cached). Callers that
+# need only some KPIs use fetch_kpis(), which runs the same per-KPI
+# queries concurrently over the pooled connections, so wall-clock time is
+# close to the slowest query instead of the sum of all of them.
+KPI_QUERIES = {
+    "total_revenue": (
+        "SELECT {revenue} as revenue FROM {table}",
+        lambda df: round(df["revenue"][0], 2)),
+    "profit_metrics": (
+        "SELECT {revenue} as revenue FROM {table}",
+        lambda df: _profit_metrics(round(df["revenue"][0], 2))),
+    "revenue_by_product": ("""
+        SELECT PRODUCTLINE, {revenue} as revenue
+        FROM {table}
+        GROUP BY PRODUCTLINE
+    """, lambda df: _revenue_by(df, "PRODUCTLINE", "product")),
+    "revenue_by_region": ("""
+        SELECT COUNTRY, {revenue} as revenue
+        FROM {table}
+        GROUP BY COUNTRY
+    """, lambda df: _revenue_by(df, "COUNTRY", "region")),
+    "top_salespeople": ("""
+        SELECT {top}
+            CUSTOMERNAME,
+            {revenue} as revenue,
+            {orders} as orders
+        FROM {table}
+        GROUP BY CUSTOMERNAME
+        ORDER BY revenue DESC
+        {limit}
+    """, _top_customers),
+    "monthly_revenue": ("""
+        SELECT YEAR_ID, MONTH_ID, {revenue} as revenue
+        FROM {table}
+        GROUP BY YEAR_ID, MONTH_ID
+    """, _monthly),
+    "cac": (
+        "SELECT COUNT(DISTINCT CUSTOMERNAME) as total_customers FROM {table}",
+        lambda df: _cac(df["total_customers"][0])),
+    "customer_status": ("""
+        SELECT COUNT(*) as total_customers, COALESCE(SUM(in_2005), 0) as active_customers
+        FROM (
+            SELECT CUSTOMERNAME, MAX(CASE WHEN YEAR_ID = 2005 THEN 1 ELSE 0 END) as in_2005
+            FROM {table}
+            WHERE YEAR_ID IN (2004, 2005)
+            GROUP BY CUSTOMERNAME
+            HAVING MIN(YEAR_ID) = 2004
+        ) customers
+    """, lambda df: _customer_status_counts(df["active_customers"][0], df["total_customers"][0])),
+}
+
+# With sketches.mode: approx the customer KPIs come from the customer
+# sketches of the running KPI state (etl/incremental.py) while it is
+# current, instead of COUNT(DISTINCT) and DISTINCT customer lists.
+SKETCHED_KPIS = {
+    "cac":             lambda state: _cac(state.customer_count),
+    "customer_status": lambda state: state.customer_status(),
+}
+
+@dataclass
+class KpiFetchResult:
+    values:  dict
+    errors:  dict
+    timings: dict
+
+    @property
+    def ok(self):
+        return not self.errors
+
+def _run_kpi_query(name, timeout, source):
+    if APPROXIMATE and name in SKETCHED_KPIS:
+        from etl.incremental import current_db_state
+        state = current_db_state()
+        if state is not None:
+            return SKETCHED_KPIS[name](state)
+    return _query_kpi(name, timeout, source)
+
+# Always the SQL path, even for KPIs read from the sketched state
+def _query_kpi(name, timeout, source):
+    sql, finish = KPI_QUERIES[name]
     conn = get_connection()
+    # Server-side timeout where the driver supports it (pyodbc), put
+    # back before the connection returns to the pool
+    dbapi_conn = conn.connection.dbapi_connection
+    previous   = getattr(dbapi_conn, "timeout", None)
+    try:
+        if previous is not None:
+            dbapi_conn.timeout = int(timeout)
+        source = source or get_kpi_source(conn)
+        df     = pd.read_sql(sql.format(**source, **sql_fragments(conn.dialect.name)), conn)
+    finally:
+        if previous is not None:
+            dbapi_conn.timeout = previous
+        conn.close()
+    return finish(df)
 
-    df_2003 = pd.read_sql("SELECT DISTINCT CUSTOMERNAME FROM sale WHERE YEAR_ID = 2003", conn)
-    df_2004 = pd.read_sql("SELECT DISTINCT CUSTOMERNAME FROM sale WHERE YEAR_ID = 2004", conn)
-    df_2005 = pd.read_sql("SELECT DISTINCT CUSTOMERNAME FROM sale WHERE YEAR_ID = 2005", conn)
+# Keyed on the source table as well as the KPI (and, like every cache
+# key, the sketch mode), so a raw-table result is never served for the
+# aggregates or vice versa
+def fetch_kpi(name, timeout=60, source=None):
+    source = source or get_kpi_source()
+    return get_cache("kpi").get_or_compute(name, lambda: _run_kpi_query(name, timeout, source),
+                                           params=(get_backend(), source["table"]))
 
-    conn.close()
+def fetch_kpis(names=None, max_workers=None, timeout=None):
+    names   = list(names or KPI_QUERIES)
+    unknown = [n for n in names if n not in KPI_QUERIES]
+    if unknown:
+        raise ValueError(f"Unknown KPI(s): {', '.join(unknown)}. Choose from: {', '.join(KPI_QUERIES)}")
 
-    customers_2003 = set(df_2003["CUSTOMERNAME"])
-    customers_2004 = set(df_2004["CUSTOMERNAME"])
-    customers_2005 = set(df_2005["CUSTOMERNAME"])
+    timeout     = timeout or get_setting("kpi", "query_timeout", 60)
+    max_workers = max_workers or get_setting("kpi", "max_workers", 8)
+    source      = get_kpi_source()
+    values, errors, timings, started = {}, {}, {}, {}
 
-    # Year over year: who bought in 2004 came back in 2005?
-    retained = len(customers_2004 & customers_2005)
-    churned  = len(customers_2004 - customers_2005)
-    total    = len(customers_2004)
+    def task(name):
+        started[name] = time.monotonic()
+        return fetch_kpi(name, timeout, source)
 
-    result = pd.DataFrame([{
-        "active_customers":  retained,
-        "total_customers":   total,
-        "churned_customers": churned
-    }])
-    return result
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(names)), thread_name_prefix="kpi")
+    pending  = {executor.submit(task, name): name for name in names}
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            for future in done:
+                name = pending.pop(future)
+                timings[name] = round(now - started.get(name, now), 3)
+                try:
+                    values[name] = future.result()
+                except Exception as e:
+                    errors[name] = e
+            # Per-query timeout, counted from when each query started running
+            for future, name in list(pending.items()):
+                if name in started and now - started[name] > timeout:
+                    pending.pop(future)
+                    future.cancel()
+                    timings[name] = round(now - started[name], 3)
+                    errors[name]  = TimeoutError(f"{name} did not finish within {timeout}s")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return KpiFetchResult(values=values, errors=errors, timings=timings)
 
 # ── Run All KPIs ────────────────────────────────────────────
 if __name__ == "__main__":
+    snapshot = get_kpi_snapshot()
+
     print("=" * 45)
     print("         📊 KPI SUMMARY REPORT")
     print("=" * 45)
 
-    print(f"\n💰 Total Revenue:      ${get_total_revenue():,.2f}")
+    print(f"\n💰 Total Revenue:      ${snapshot.total_revenue:,.2f}")
 
-    profit = get_profit_metrics()
-    print(f"📈 Total Profit:       ${profit['total_profit']:,.2f}")
-    print(f"📉 Profit Margin:      {profit['profit_margin_pct']}%")
-    print(f"\n🧲 Cust. Acq. Cost:   ${get_cac():,.2f}")
+    print(f"📈 Total Profit:       ${snapshot.total_profit:,.2f}")
+    print(f"📉 Profit Margin:      {snapshot.profit_margin_pct}%")
+    print(f"\n🧲 Cust. Acq. Cost:   ${snapshot.cac:,.2f}")
 
-    status = get_customer_status()
-    print(f"✅ Active Customers:   {status['active_customers'][0]}")
-    print(f"❌ Churned Customers:  {status['churned_customers'][0]}")
+    print(f"✅ Active Customers:   {snapshot.active_customers}")
+    print(f"❌ Churned Customers:  {snapshot.churned_customers}")
 
     print("\n📦 Revenue by Product:")
-    print(get_revenue_by_product().to_string(index=False))
+    print(snapshot.revenue_by_product.to_string(index=False))
 
     print("\n🌍 Revenue by Region:")
-    print(get_revenue_by_region().to_string(index=False))
+    print(snapshot.revenue_by_region.to_string(index=False))
 
     print("\n🏆 Top Customers by Revenue:")
-    print(get_top_salespeople().to_string(index=False))
+    print(snapshot.top_salespeople.to_string(index=False))
 
     print("\n📅 Monthly Revenue Trend:")
-    print(get_monthly_revenue().to_string(index=False))
\ No newline at end of file
+    print(snapshot.monthly_revenue.to_string(index=False))
\ No newline at end of file
@@ -29,32 +29,26 @@ def run():
 
         if choice == "1":
             print("\n📊 Loading KPI Summary...\n")
-            from etl.transform import (
-                get_total_revenue, get_profit_metrics, get_cac,
-                get_customer_status, get_revenue_by_product,
-                get_revenue_by_region, get_top_salespeople,
-                get_monthly_revenue
-            )
+            from etl.transform import get_kpi_snapshot
+            snapshot = get_kpi_snapshot()
             print("=" * 45)
             print("         📊 KPI SUMMARY REPORT")
             print("=" * 45)
 
-            print(f"\n💰 Total Revenue:      ${get_total_revenue():,.2f}")
-            profit = get_profit_metrics()
-            print(f"📈 Total Profit:       ${profit['total_profit']:,.2f}")
-            print(f"📉 Profit Margin:      {profit['profit_margin_pct']}%")
-            print(f"\n🧲 Cust. Acq. Cost:   ${get_cac():,.2f}")
-            status = get_customer_status()
-            print(f"✅ Active Customers:   {status['active_customers'][0]}")
-            print(f"❌ Churned Customers:  {status['churned_customers'][0]}")
+            print(f"\n💰 Total Revenue:      ${snapshot.total_revenue:,.2f}")
+            print(f"📈 Total Profit:       ${snapshot.total_profit:,.2f}")
+            print(f"📉 Profit Margin:      {snapshot.profit_margin_pct}%")
+            print(f"\n🧲 Cust. Acq. Cost:   ${snapshot.cac:,.2f}")
+            print(f"✅ Active Customers:   {snapshot.active_customers}")
+            print(f"❌ Churned Customers:  {snapshot.churned_customers}")
             print("\n📦 Revenue by Product:")
-            print(get_revenue_by_product().to_string(index=False))
+            print(snapshot.revenue_by_product.to_string(index=False))
             print("\n🌍 Revenue by Region:")
-            print(get_revenue_by_region().to_string(index=False))
+            print(snapshot.revenue_by_region.to_string(index=False))
             print("\n🏆 Top Salespeople:")
-            print(get_top_salespeople().to_string(index=False))
+            print(snapshot.top_salespeople.to_string(index=False))
             print("\n📅 Monthly Revenue Trend:")
-            print(get_monthly_revenue().to_string(index=False))
+            print(snapshot.monthly_revenue.to_string(index=False))
 
         elif choice == "2":
             print("\n📄 Generating PDF Report...")
@@ -70,8 +64,13 @@ def run():
             print("\n🌐 Launching Dashboard...")
             print("Open your browser and go to: http://127.0.0.1:8050")
             print("Press Ctrl+C to stop the dashboard and return to menu\n")
-            from dashboard.app import app
-            app.run(debug=False)
+            try:
+                from dashboard.wsgi import serve
+                serve()
+            except RuntimeError as e:
+                print(f"⚠️  {e} — falling back to the Flask development server")
+                from dashboard.app import app
+                app.run(debug=False)
 
         elif choice == "5":
             print("\n⏰ Starting Automated Scheduler...")
@@ -15,6 +15,10 @@ from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable
+from etl.settings import get_setting
+from etl.snapshot import iter_snapshot_batches
+from etl.incremental import refresh_csv_state
+from reports.formatting import table_rows, fmt_currency
 
 load_dotenv()
 
@@ -28,29 +32,69 @@ EMAIL_RECEIVERS = [
 EMAIL_RECEIVERS = [e for e in EMAIL_RECEIVERS if e]
 
 DASHBOARD_URL = "https://kpi-reporting-system-ifxehqzoojyy5g6qcsvob8.streamlit.app/"
-CSV_PATH      = "data/sales_data_sample.csv"
 
-# ── Load & Calculate KPIs from CSV ──────────────────────────
+# ── Load & Calculate KPIs from the sales snapshot ───────────
+# Streams only the KPI columns from the typed Parquet snapshot
+# (etl/snapshot.py) in bounded batches and keeps only running totals,
+# per-group sums and customer sets, so memory does not grow with the
+# size of the export.
+KPI_COLUMNS = ["SALES", "YEAR_ID", "CUSTOMERNAME", "PRODUCTLINE", "COUNTRY"]
+
+# From the running KPI state (etl/incremental.py): only rows appended to
+# the CSV since the last report are read.
 def load_kpis():
-    df = pd.read_csv(CSV_PATH, encoding="latin1")
-    df.columns = df.columns.str.strip()
-    df["SALES"]  = pd.to_numeric(df["SALES"],  errors="coerce")
-    df["PROFIT"] = df["SALES"] * 0.45
+    if not get_setting("incremental", "enabled", True):
+        return scan_kpis()
+    state       = refresh_csv_state()
+    snapshot    = state.snapshot()
+    df_prod     = snapshot.revenue_by_product.rename(columns={"product": "PRODUCTLINE"})
+    df_country  = snapshot.revenue_by_region.rename(columns={"region": "COUNTRY"})[["COUNTRY", "revenue"]]
+    return {
+        "total_revenue":   snapshot.total_revenue,
+        "total_profit":    snapshot.total_profit,
+        "profit_margin":   snapshot.profit_margin_pct,
+        "cac":             snapshot.cac,
+        "retention":       snapshot.retention_pct,
+        "top_product":     df_prod["PRODUCTLINE"].iloc[0],
+        "top_country":     df_country["COUNTRY"].iloc[0],
+        "top_country_rev": df_country["revenue"].iloc[0],
+        "num_customers":   state.customer_count,
+        "by_product":      df_prod,
+        "by_country":      df_country,
+    }
+
+# Full pass over the Arrow snapshot
+def scan_kpis():
+    total_sales = 0.0
+    customers   = set()
+    c2004       = set()
+    c2005       = set()
+    by_product  = []
+    by_country  = []
+
+    for df in iter_snapshot_batches(KPI_COLUMNS):
+        total_sales += df["SALES"].sum()
+        customers.update(df["CUSTOMERNAME"].dropna())
+        c2004.update(df[df["YEAR_ID"] == 2004]["CUSTOMERNAME"])
+        c2005.update(df[df["YEAR_ID"] == 2005]["CUSTOMERNAME"])
+        by_product.append(df.groupby("PRODUCTLINE", observed=True)["SALES"].sum())
+        by_country.append(df.groupby("COUNTRY", observed=True)["SALES"].sum())
 
-    total_revenue = round(df["SALES"].sum(), 2)
-    total_profit  = round(df["PROFIT"].sum(), 2)
+    total_revenue = round(total_sales, 2)
+    total_profit  = round(total_sales * 0.45, 2)
     profit_margin = round((total_profit / total_revenue) * 100, 2)
-    num_customers = df["CUSTOMERNAME"].nunique()
+    num_customers = len(customers)
     cac           = round(500 / num_customers * 100, 2)
 
-    c2004     = set(df[df["YEAR_ID"] == 2004]["CUSTOMERNAME"])
-    c2005     = set(df[df["YEAR_ID"] == 2005]["CUSTOMERNAME"])
     retained  = len(c2004 & c2005)
     retention = round((retained / len(c2004)) * 100, 1) if len(c2004) > 0 else 0
 
-    top_product     = df.groupby("PRODUCTLINE")["SALES"].sum().idxmax()
-    top_country     = df.groupby("COUNTRY")["SALES"].sum().idxmax()
-    top_country_rev = df.groupby("COUNTRY")["SALES"].sum().max()
+    product_rev = pd.concat(by_product).groupby(level=0).sum().sort_values(ascending=False)
+    country_rev = pd.concat(by_country).groupby(level=0).sum().sort_values(ascending=False)
+
+    df_prod = product_rev.rename("revenue").rename_axis("PRODUCTLINE").reset_index()
+    df_prod["profit"] = df_prod["revenue"] * 0.45
+    df_country = country_rev.rename("revenue").rename_axis("COUNTRY").reset_index()
 
     return {
         "total_revenue":   total_revenue,
@@ -58,21 +102,18 @@ def load_kpis():
         "profit_margin":   profit_margin,
         "cac":             cac,
         "retention":       retention,
-        "top_product":     top_product,
-        "top_country":     top_country,
-        "top_country_rev": top_country_rev,
+        "top_product":     product_rev.idxmax(),
+        "top_country":     country_rev.idxmax(),
+        "top_country_rev": country_rev.max(),
         "num_customers":   num_customers,
+        "by_product":      df_prod,
+        "by_country":      df_country,
     }
 
 # ── Generate PDF from CSV ────────────────────────────────────
 def generate_pdf(kpis, output_path="data/processed/kpi_report.pdf"):
     os.makedirs("data/processed", exist_ok=True)
 
-    df = pd.read_csv(CSV_PATH, encoding="latin1")
-    df.columns = df.columns.str.strip()
-    df["SALES"]  = pd.to_numeric(df["SALES"],  errors="coerce")
-    df["PROFIT"] = df["SALES"] * 0.45
-
     doc    = SimpleDocTemplate(output_path, pagesize=A4,
                                rightMargin=2*cm, leftMargin=2*cm,
                                topMargin=2*cm, bottomMargin=2*cm)
@@ -130,14 +171,10 @@ def generate_pdf(kpis, output_path="data/processed/kpi_report.pdf"):
 
     # Revenue by Product
     story.append(Paragraph("Revenue by Product Line", section_style))
-    df_prod = df.groupby("PRODUCTLINE").agg(
-        revenue=("SALES", "sum"),
-        profit=("PROFIT", "sum")
-    ).reset_index().sort_values("revenue", ascending=False)
-    prod_data = [["Product Line", "Revenue", "Profit"]] + [
-        [row["PRODUCTLINE"], f"${row['revenue']:,.2f}", f"${row['profit']:,.2f}"]
-        for _, row in df_prod.iterrows()
-    ]
+    df_prod   = kpis["by_product"]
+    money     = lambda values: fmt_currency(values, 2)
+    prod_data = [["Product Line", "Revenue", "Profit"]] + table_rows(
+        df_prod, ["PRODUCTLINE", "revenue", "profit"], {"revenue": money, "profit": money})
     prod_table = Table(prod_data, colWidths=[7*cm, 5*cm, 5*cm])
     prod_table.setStyle(TableStyle([
         ("BACKGROUND",    (0,0), (-1,0), colors.HexColor("#00b4d8")),
@@ -153,13 +190,9 @@ def generate_pdf(kpis, output_path="data/processed/kpi_report.pdf"):
 
     # Revenue by Country
     story.append(Paragraph("Revenue by Country (Top 10)", section_style))
-    df_country = df.groupby("COUNTRY").agg(
-        revenue=("SALES", "sum")
-    ).reset_index().sort_values("revenue", ascending=False).head(10)
-    country_data = [["Country", "Revenue"]] + [
-        [row["COUNTRY"], f"${row['revenue']:,.2f}"]
-        for _, row in df_country.iterrows()
-    ]
+    df_country = kpis["by_country"].head(10)
+    country_data = [["Country", "Revenue"]] + table_rows(
+        df_country, ["COUNTRY", "revenue"], {"revenue": money})
     country_table = Table(country_data, colWidths=[9*cm, 7*cm])
     country_table.setStyle(TableStyle([
         ("BACKGROUND",    (0,0), (-1,0), colors.HexColor("#06d6a0")),
@@ -0,0 +1,53 @@
+import numpy as np
+
+# ── Display formatting for report tables and chart labels ───
+# Each formatter takes a scalar (→ one string) or a column / array
+# (→ a list of strings, nested for 2-D input). Scaling is done on the
+# whole array at once and the format string is applied to plain
+# Python floats, so there is no per-row Series or lambda overhead.
+# Output matches the f-strings used before, e.g. f"${x/1e3:.0f}K".
+def _format(spec, values, scale=1):
+    if np.ndim(values) == 0:
+        return spec.format(values / scale if scale != 1 else values)
+    array = np.asarray(values, dtype=float)
+    if scale != 1:
+        array = array / scale
+    if array.ndim > 1:
+        return [list(map(spec.format, row)) for row in array.tolist()]
+    return list(map(spec.format, array.tolist()))
+
+# $1,234 / $1,234.56
+def fmt_currency(values, decimals=0):
+    return _format(f"${{:,.{decimals}f}}", values)
+
+# $123K
+def fmt_thousands(values, decimals=0):
+    return _format(f"${{:.{decimals}f}}K", values, scale=1e3)
+
+# $1.23M
+def fmt_millions(values, decimals=2):
+    return _format(f"${{:.{decimals}f}}M", values, scale=1e6)
+
+# 38.5% — decimals=None keeps the value as is (already rounded)
+def fmt_percent(values, decimals=None):
+    return _format("{}%" if decimals is None else f"{{:.{decimals}f}}%", values)
+
+# Counts and labels as str() would print them
+def fmt_plain(values):
+    return list(map(str, np.asarray(values).tolist()))
+
+# ── Table rows ──────────────────────────────────────────────
+# One list per row of `frame[columns]`, built column-wise: columns in
+# `formats` go through their formatter, the rest are taken as plain
+# Python values. Ready for reportlab Table / gspread.
+def table_rows(frame, columns, formats=None):
+    formats = formats or {}
+    values  = [formats[c](frame[c].to_numpy()) if c in formats else frame[c].tolist() for c in columns]
+    return [list(row) for row in zip(*values)]
+
+# Plain rounded floats / ints, for spreadsheet cells
+def rounded(values, decimals=2):
+    return [round(v, decimals) for v in np.asarray(values, dtype=float).tolist()]
+
+def integers(values):
+    return np.asarray(values).astype(int).tolist()
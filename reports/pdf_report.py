@@ -9,12 +9,8 @@ from reportlab.lib.units import cm
 from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer,
                                  Table, TableStyle, HRFlowable)
 from datetime import datetime
-from etl.transform import (
-    get_total_revenue, get_profit_metrics, get_cac,
-    get_customer_status, get_revenue_by_product,
-    get_revenue_by_region, get_top_salespeople,
-    get_monthly_revenue
-)
+from etl.transform import get_kpi_snapshot
+from reports.formatting import table_rows, fmt_currency, fmt_plain
 
 def generate_pdf(output_path="data/processed/kpi_report.pdf"):
     os.makedirs("data/processed", exist_ok=True)
@@ -42,21 +38,20 @@ def generate_pdf(output_path="data/processed/kpi_report.pdf"):
     story.append(Spacer(1, 0.4*cm))
 
     # ── KPI Cards Table ─────────────────────────────────────
-    total_revenue = get_total_revenue()
-    profit        = get_profit_metrics()
-    cac           = get_cac()
-    status        = get_customer_status()
-    active        = int(status["active_customers"][0])
-    churned       = int(status["churned_customers"][0])
-    retention     = round((active / (active + churned)) * 100, 1)
+    snapshot      = get_kpi_snapshot()
+    total_revenue = snapshot.total_revenue
+    cac           = snapshot.cac
+    active        = snapshot.active_customers
+    churned       = snapshot.churned_customers
+    retention     = snapshot.retention_pct
 
     story.append(Paragraph("Key Performance Indicators", section_style))
 
     kpi_data = [
         ["Metric", "Value"],
         ["💰 Total Revenue",    f"${total_revenue:,.2f}"],
-        ["📈 Total Profit",     f"${profit['total_profit']:,.2f}"],
-        ["📉 Profit Margin",    f"{profit['profit_margin_pct']}%"],
+        ["📈 Total Profit",     f"${snapshot.total_profit:,.2f}"],
+        ["📉 Profit Margin",    f"{snapshot.profit_margin_pct}%"],
         ["🧲 Cust. Acq. Cost", f"${cac:,.2f}"],
         ["✅ Active Customers", f"{active}"],
         ["❌ Churned Customers",f"{churned}"],
@@ -80,11 +75,10 @@ def generate_pdf(output_path="data/processed/kpi_report.pdf"):
 
     # ── Revenue by Product ──────────────────────────────────
     story.append(Paragraph("Revenue by Product", section_style))
-    df_product = get_revenue_by_product()
-    prod_data  = [["Product", "Revenue", "Profit"]] + [
-        [row["product"], f"${row['revenue']:,.2f}", f"${row['profit']:,.2f}"]
-        for _, row in df_product.iterrows()
-    ]
+    df_product = snapshot.revenue_by_product
+    money      = lambda values: fmt_currency(values, 2)
+    prod_data  = [["Product", "Revenue", "Profit"]] + table_rows(
+        df_product, ["product", "revenue", "profit"], {"revenue": money, "profit": money})
     prod_table = Table(prod_data, colWidths=[7*cm, 5*cm, 5*cm])
     prod_table.setStyle(TableStyle([
         ("BACKGROUND",    (0,0), (-1,0), colors.HexColor("#00b4d8")),
@@ -100,11 +94,9 @@ def generate_pdf(output_path="data/processed/kpi_report.pdf"):
 
     # ── Top Salespeople ─────────────────────────────────────
     story.append(Paragraph("Top Salespeople", section_style))
-    df_sales  = get_top_salespeople()
-    sales_data = [["Salesperson", "Revenue", "Total Sales"]] + [
-        [row["salesperson"], f"${row['revenue']:,.2f}", str(row["total_sales"])]
-        for _, row in df_sales.iterrows()
-    ]
+    df_sales  = snapshot.top_salespeople
+    sales_data = [["Salesperson", "Revenue", "Total Sales"]] + table_rows(
+        df_sales, ["salesperson", "revenue", "total_sales"], {"revenue": money, "total_sales": fmt_plain})
     sales_table = Table(sales_data, colWidths=[7*cm, 5*cm, 5*cm])
     sales_table.setStyle(TableStyle([
         ("BACKGROUND",    (0,0), (-1,0), colors.HexColor("#06d6a0")),
@@ -120,11 +112,9 @@ def generate_pdf(output_path="data/processed/kpi_report.pdf"):
 
     # ── Monthly Revenue ─────────────────────────────────────
     story.append(Paragraph("Monthly Revenue Trend", section_style))
-    df_monthly  = get_monthly_revenue()
-    monthly_data = [["Month", "Revenue", "Profit"]] + [
-        [row["month"], f"${row['revenue']:,.2f}", f"${row['profit']:,.2f}"]
-        for _, row in df_monthly.iterrows()
-    ]
+    df_monthly  = snapshot.monthly_revenue
+    monthly_data = [["Month", "Revenue", "Profit"]] + table_rows(
+        df_monthly, ["month", "revenue", "profit"], {"revenue": money, "profit": money})
     monthly_table = Table(monthly_data, colWidths=[5*cm, 6*cm, 6*cm])
     monthly_table.setStyle(TableStyle([
         ("BACKGROUND",    (0,0), (-1,0), colors.HexColor("#f77f00")),
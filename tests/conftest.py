@@ -0,0 +1,15 @@
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# ── Keep test runs out of the repo's data/ directory ────────
+# Set before any etl module reads its settings at import time.
+_scratch = tempfile.mkdtemp(prefix="kpi-tests-")
+for name, value in {
+    "CACHE_DIR":       os.path.join(_scratch, "cache"),
+    "CACHE_PATH":      os.path.join(_scratch, "cache", "results.db"),
+    "INCREMENTAL_DIR": os.path.join(_scratch, "kpi_state"),
+    "SNAPSHOT_PATH":   os.path.join(_scratch, "snapshot", "sales.parquet"),
+}.items():
+    os.environ.setdefault(name, value)
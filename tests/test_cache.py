@@ -0,0 +1,80 @@
+import time
+import pytest
+import etl.cache as cache
+from etl.cache import ResultCache, MemoryBackend, SqliteBackend, invalidate_all
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend(64)
+    return SqliteBackend(str(tmp_path / "cache.db"), 64)
+
+def _counting(value):
+    calls = []
+    def compute():
+        calls.append(value)
+        return value
+    return compute, calls
+
+# ── Key isolation ───────────────────────────────────────────
+def test_key_changes_with_sketch_mode(monkeypatch, backend):
+    results = ResultCache("test", backend=backend)
+    exact, exact_calls = _counting("exact")
+    approx, approx_calls = _counting("approx")
+
+    monkeypatch.setattr(cache, "SKETCH_MODE", "exact")
+    exact_key = results.make_key("kpi_snapshot")
+    assert results.get_or_compute("kpi_snapshot", exact) == "exact"
+    monkeypatch.setattr(cache, "SKETCH_MODE", "approx")
+    assert results.make_key("kpi_snapshot") != exact_key
+    assert results.get_or_compute("kpi_snapshot", approx) == "approx"
+    monkeypatch.setattr(cache, "SKETCH_MODE", "exact")
+    assert results.get_or_compute("kpi_snapshot", exact) == "exact"
+    assert (len(exact_calls), len(approx_calls)) == (1, 1)
+
+def test_key_changes_with_data_version(backend):
+    results = ResultCache("test", backend=backend)
+    before, before_calls = _counting("before")
+    after, after_calls   = _counting("after")
+
+    key = results.make_key("cac")
+    assert results.get_or_compute("cac", before) == "before"
+    invalidate_all()
+    assert results.make_key("cac") != key
+    assert results.get_or_compute("cac", after) == "after"
+    assert results.get_or_compute("cac", before) == "after"
+    assert (len(before_calls), len(after_calls)) == (1, 1)
+
+# get_kpi_snapshot and fetch_kpi pass (backend, source table) as params
+def test_key_changes_with_backend_and_table(backend):
+    results = ResultCache("test", backend=backend)
+    computed = {}
+    for params in (("sqlite", "sales"), ("duckdb", "sales"), ("sqlite", "sales_monthly_agg")):
+        compute, calls = _counting(params)
+        assert results.get_or_compute("kpi_snapshot", compute, params=params) == params
+        assert results.get_or_compute("kpi_snapshot", compute, params=params) == params
+        computed[params] = len(calls)
+    assert set(computed.values()) == {1}
+
+# ── Leases ──────────────────────────────────────────────────
+def test_lease_is_exclusive_until_released(backend):
+    assert backend.acquire("key", 60)
+    assert not backend.acquire("key", 60)
+    backend.release("key")
+    assert backend.acquire("key", 60)
+
+def test_expired_lease_is_taken_over(backend):
+    assert backend.acquire("key", 0.2)
+    assert not backend.acquire("key", 0.2)
+    time.sleep(0.3)
+    assert backend.acquire("key", 0.2)
+
+# A holder that died mid-compute: waiters retry until its lease expires,
+# then one of them computes the value itself
+def test_get_or_compute_takes_over_expired_lease(backend):
+    results = ResultCache("test", backend=backend, lease=0.3)
+    backend.acquire(results.make_key("cac"), 0.3)
+    compute, calls = _counting(42)
+    assert results.get_or_compute("cac", compute) == 42
+    assert len(calls) == 1
+    assert results.stats()["waits"] > 0
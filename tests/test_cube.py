@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import pytest
+from dashboard.cube import PairSets, build_cube, retention_rate
+from dashboard.planner import AggregationPlan
+from etl.sketches import APPROXIMATE
+
+pytestmark = pytest.mark.skipif(APPROXIMATE, reason="exact distinct sets only (sketches.mode: exact)")
+
+# ── Synthetic sales rows ────────────────────────────────────
+# Few enough values per dimension that cells share customers and
+# orders, plus missing TERRITORY values like the sample CSV has
+@pytest.fixture(scope="module")
+def sales():
+    rng = np.random.default_rng(7)
+    n   = 5_000
+    df  = pd.DataFrame({
+        "YEAR_ID":      rng.choice([2003, 2004, 2005], n),
+        "MONTH_ID":     rng.integers(1, 13, n),
+        "PRODUCTLINE":  rng.choice(["Classic Cars", "Motorcycles", "Ships", "Trains"], n),
+        "DEALSIZE":     rng.choice(["Small", "Medium", "Large"], n),
+        "COUNTRY":      rng.choice(["USA", "France", "Spain", "Japan", "Norway"], n),
+        "TERRITORY":    rng.choice(["EMEA", "APAC", "Japan", None], n),
+        "STATUS":       rng.choice(["Shipped", "Cancelled", "On Hold"], n),
+        "CUSTOMERNAME": [f"Customer {i}" for i in rng.integers(0, 120, n)],
+        "ORDERNUMBER":  rng.integers(10_100, 10_900, n),
+        "SALES":        rng.uniform(500, 9_000, n).round(2),
+    })
+    df["PROFIT"] = (df["SALES"] * 0.45).round(2)
+    return df
+
+@pytest.fixture(scope="module")
+def cube(sales):
+    return build_cube(sales)
+
+def _expected(df, dims):
+    return (df.groupby(dims, observed=True, sort=True)
+              .agg(sales=("SALES", "sum"), orders=("ORDERNUMBER", "count"),
+                   customers=("CUSTOMERNAME", "nunique"), orders_distinct=("ORDERNUMBER", "nunique"))
+              .reset_index())
+
+def _assert_matches(frame, expected, dims, distinct):
+    assert frame[dims].reset_index(drop=True).equals(expected[dims])
+    np.testing.assert_allclose(frame["sales"], expected["sales"])
+    assert frame["orders"].tolist() == expected["orders"].tolist()
+    for name in distinct:
+        assert frame[name].tolist() == expected[name].tolist()
+
+# ── PairSets ────────────────────────────────────────────────
+def test_pair_sets_match_python_sets():
+    rng      = np.random.default_rng(3)
+    cell_ids = rng.integers(0, 20, 2_000)
+    codes    = rng.integers(-1, 50, 2_000)  # -1: missing id
+    sets     = PairSets.build(cell_ids, codes, 20, 50)
+    members  = [set(codes[(cell_ids == c) & (codes >= 0)]) for c in range(20)]
+    assert sets.counts().tolist() == [len(m) for m in members]
+    assert sets.total() == len(set().union(*members))
+
+    mask = np.arange(20) % 3 != 0
+    kept = [m for m, keep in zip(members, mask) if keep]
+    assert sets.take(mask).counts().tolist() == [len(m) for m in kept]
+
+    groups   = np.arange(20) % 4 - 1  # group -1 is dropped
+    expected = [len(set().union(*(m for m, g in zip(members, groups) if g == group))) for group in range(3)]
+    assert sets.regroup(groups, 3).counts().tolist() == expected
+
+# ── Cube roll-ups vs pandas over the rows ───────────────────
+@pytest.mark.parametrize("dims", [["YEAR_ID"], ["PRODUCTLINE", "DEALSIZE"], ["TERRITORY"], ["YEAR_ID", "MONTH_ID"]])
+def test_rollup_matches_pandas(sales, cube, dims):
+    out = cube.rollup(dims, distinct_customers=True)
+    _assert_matches(out, _expected(sales, dims), dims, ["customers"])
+
+def test_totals_match_pandas(sales, cube):
+    mask   = cube.select(years=[2004], products=["Ships", "Trains"])
+    rows   = sales[sales["YEAR_ID"].eq(2004) & sales["PRODUCTLINE"].isin(["Ships", "Trains"])]
+    totals = cube.totals(mask)
+    assert totals["lines"] == len(rows)
+    assert totals["customers"] == rows["CUSTOMERNAME"].nunique()
+    assert totals["orders_distinct"] == rows["ORDERNUMBER"].nunique()
+    assert totals["sales"] == pytest.approx(rows["SALES"].sum())
+
+def test_retention_matches_pandas(sales, cube):
+    before = set(sales.loc[sales["YEAR_ID"] == 2004, "CUSTOMERNAME"])
+    after  = set(sales.loc[sales["YEAR_ID"] == 2005, "CUSTOMERNAME"])
+    assert cube.retention(2004, 2005) == round(len(before & after) / len(before) * 100, 1)
+    assert retention_rate(np.array([1, 2, 3, 4]), np.array([2, 4, 5])) == 50.0
+
+# ── Planner vs pandas ───────────────────────────────────────
+def test_planner_matches_pandas(sales, cube):
+    mask = cube.select(deals=["Medium", "Large"])
+    rows = sales[sales["DEALSIZE"].isin(["Medium", "Large"])]
+    plan = (AggregationPlan(cube, mask)
+            .add("by_year", ["YEAR_ID"], ["customers", "orders_distinct"])
+            .add("by_year_product", ["YEAR_ID", "PRODUCTLINE"], ["customers"])
+            .add("by_territory", ["TERRITORY"], ["customers"])
+            .add("totals", (), ["customers", "orders_distinct"]))
+    results = plan.run()
+
+    assert plan.scans == 1
+    for name, dims, distinct in (("by_year", ["YEAR_ID"], ["customers", "orders_distinct"]),
+                                 ("by_year_product", ["YEAR_ID", "PRODUCTLINE"], ["customers"]),
+                                 ("by_territory", ["TERRITORY"], ["customers"])):
+        _assert_matches(results[name], _expected(rows, dims), dims, distinct)
+    assert results["totals"]["customers"] == rows["CUSTOMERNAME"].nunique()
+    assert results["totals"]["orders_distinct"] == rows["ORDERNUMBER"].nunique()
+
+def test_planner_matches_rollup(cube):
+    dims    = ["PRODUCTLINE", "COUNTRY"]
+    results = AggregationPlan(cube).add("grid", dims, ["customers"]).add("lines", ["COUNTRY"]).run()
+    assert results["grid"].equals(cube.rollup(dims, distinct_customers=True))
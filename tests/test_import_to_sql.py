@@ -0,0 +1,118 @@
+import os
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyodbc")
+from etl import import_to_sql as loader
+
+ROOT_DIR   = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SAMPLE_CSV = os.path.join(ROOT_DIR, "data", "sales_data_sample.csv")
+
+# ── #merge_out layout ───────────────────────────────────────
+# An INSERT action outputs NULL for every deleted.* column, so none of
+# #merge_out may be NOT NULL (the sales key columns are)
+def test_merge_out_columns_accept_null():
+    assert "NOT NULL" not in loader.MERGE_OUT_DDL
+    assert all(column.endswith(" NULL") for column in loader.MERGE_OUT_COLUMNS)
+    assert "INTO #merge_out" in loader.MERGE_SQL
+
+def test_merge_out_covers_merge_output():
+    names = [column.split()[0] for column in loader.MERGE_OUT_COLUMNS]
+    assert names == ["merge_action"] + [f"{prefix}{c}" for prefix in ("new_", "old_") for c in loader.DELTA_COLUMNS]
+
+# ── Loads against a real server ─────────────────────────────
+# Point LOADER_TEST_CONNECTION_STRING at a disposable database: every
+# loader table in it is dropped before and after each test.
+CONNECTION_STRING = os.getenv("LOADER_TEST_CONNECTION_STRING")
+needs_server      = pytest.mark.skipif(not CONNECTION_STRING,
+                                       reason="LOADER_TEST_CONNECTION_STRING not set")
+
+LOADER_TABLES = [name for table in loader.SWAP_TABLES
+                 for name in (table, loader.staging_name(table), loader.previous_name(table))] + \
+                ["sales_load_state", "sales_agg_meta"]
+
+AGG_MISMATCH_SQL = f"""
+    SELECT COUNT(*) FROM (
+        (SELECT YEAR_ID, MONTH_ID, PRODUCTLINE, COUNTRY, CUSTOMERNAME,
+                ROUND(SUM(SALES), 2) as revenue, COUNT(ORDERNUMBER) as orders, COUNT(*) as lines
+         FROM {loader.SALES_TABLE}
+         GROUP BY YEAR_ID, MONTH_ID, PRODUCTLINE, COUNTRY, CUSTOMERNAME
+         EXCEPT
+         SELECT YEAR_ID, MONTH_ID, PRODUCTLINE, COUNTRY, CUSTOMERNAME, ROUND(revenue, 2), orders, lines
+         FROM sales_monthly_agg)
+        UNION ALL
+        (SELECT YEAR_ID, MONTH_ID, PRODUCTLINE, COUNTRY, CUSTOMERNAME, ROUND(revenue, 2), orders, lines
+         FROM sales_monthly_agg
+         EXCEPT
+         SELECT YEAR_ID, MONTH_ID, PRODUCTLINE, COUNTRY, CUSTOMERNAME,
+                ROUND(SUM(SALES), 2), COUNT(ORDERNUMBER), COUNT(*)
+         FROM {loader.SALES_TABLE}
+         GROUP BY YEAR_ID, MONTH_ID, PRODUCTLINE, COUNTRY, CUSTOMERNAME)
+    ) mismatched
+"""
+
+def _drop_loader_tables(conn):
+    cursor = conn.cursor()
+    for table in LOADER_TABLES:
+        cursor.execute(loader.drop_sql(table))
+    conn.commit()
+
+def _scalar(conn, sql):
+    cursor = conn.cursor()
+    cursor.execute(sql)
+    return cursor.fetchone()[0]
+
+@pytest.fixture
+def conn():
+    import pyodbc
+    conn = pyodbc.connect(CONNECTION_STRING)
+    _drop_loader_tables(conn)
+    loader.prepare_tables(conn)
+    yield conn
+    _drop_loader_tables(conn)
+    conn.close()
+
+@pytest.fixture
+def sample():
+    return pd.read_csv(SAMPLE_CSV, encoding="latin1", dtype=str, keep_default_na=False)
+
+def _write(rows, path):
+    rows.to_csv(path, index=False, encoding="latin1")
+    return str(path)
+
+# The first 150 rows with row 0 edited: 50 new keys and one update
+# over a table holding the first 100
+def _second_file(sample, tmp_path):
+    rows = sample.iloc[:150].copy()
+    rows.loc[rows.index[0], "SALES"] = "1.00"
+    return _write(rows, tmp_path / "second.csv")
+
+def _assert_incremental_insert(conn, sample, tmp_path):
+    counts, errors, _, deltas = loader.incremental_load(conn, "second", path=_second_file(sample, tmp_path))
+    assert errors == 0
+    assert counts == {"inserted": 50, "updated": 1}
+    assert deltas["lines"].sum() == 50
+    assert _scalar(conn, f"SELECT COUNT(*) FROM {loader.SALES_TABLE}") == 150
+    assert _scalar(conn, AGG_MISMATCH_SQL) == 0
+    assert loader.aggregates_current(conn.cursor())
+
+@needs_server
+def test_full_load_then_incremental_insert(conn, sample, tmp_path):
+    counts, errors, _ = loader.full_load(conn, "first", path=_write(sample.iloc[:100], tmp_path / "first.csv"))
+    assert (counts["inserted"], errors) == (100, 0)
+    _assert_incremental_insert(conn, sample, tmp_path)
+
+# A table created by ensure_sales_table (NOT NULL keys, primary key)
+# and filled only by incremental loads
+@needs_server
+def test_fresh_table_then_incremental_inserts(conn, sample, tmp_path):
+    counts, errors, _, _ = loader.incremental_load(conn, "first", path=_write(sample.iloc[:100], tmp_path / "first.csv"))
+    assert errors == 0
+    assert counts == {"inserted": 100, "updated": 0}
+    _assert_incremental_insert(conn, sample, tmp_path)
+
+def test_sales_table_ddl_matches_merge_key():
+    ddl = loader.sales_table_ddl(loader.STAGING_TABLE)
+    assert f"PRIMARY KEY CLUSTERED ({', '.join(loader.KEY_COLUMNS)})" in ddl
+    for column in loader.KEY_COLUMNS:
+        assert f"{column} INT NOT NULL" in ddl
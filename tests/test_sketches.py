@@ -0,0 +1,68 @@
+import numpy as np
+from etl.sketches import HyperLogLog, ThetaSketch, CustomerSketch, merge_sketches, hll_error, theta_error
+
+# Hashes are deterministic, so every estimate below is too: the bounds
+# are a few standard errors wide and never flake.
+def _customers(start, stop):
+    return [f"customer-{i}" for i in range(start, stop)]
+
+def _relative_error(estimate, exact):
+    return abs(estimate - exact) / exact
+
+# ── HyperLogLog ─────────────────────────────────────────────
+def test_hll_count_within_error_bound():
+    for p, n in ((10, 5_000), (12, 20_000), (14, 50_000)):
+        estimate = HyperLogLog(p).update(_customers(0, n)).count()
+        assert _relative_error(estimate, n) < 3 * hll_error(p)
+
+def test_hll_small_counts_near_exact():
+    assert HyperLogLog(12).update(_customers(0, 100)).count() in range(98, 103)
+
+def test_hll_merge_equals_union():
+    left  = HyperLogLog(12).update(_customers(0, 6_000))
+    right = HyperLogLog(12).update(_customers(4_000, 10_000))
+    assert left.merge(right) == HyperLogLog(12).update(_customers(0, 10_000))
+
+def test_hll_ignores_duplicates_and_nulls():
+    once  = HyperLogLog(12).update(_customers(0, 1_000))
+    twice = HyperLogLog(12).update(_customers(0, 1_000) * 2 + [None])
+    assert once == twice
+
+# ── Theta ───────────────────────────────────────────────────
+def test_theta_exact_below_k():
+    sketch = ThetaSketch(1_024).update(_customers(0, 1_000))
+    assert sketch.theta is None
+    assert sketch.count() == 1_000
+
+def test_theta_count_within_error_bound():
+    for k, n in ((256, 10_000), (1_024, 20_000), (4_096, 50_000)):
+        sketch = ThetaSketch(k).update(_customers(0, n))
+        assert len(sketch.hashes) == k
+        assert _relative_error(sketch.count(), n) < 3 * theta_error(k)
+
+# |A ∩ B| error is about √(|A ∪ B| / |A ∩ B|) / √k relative
+def test_theta_intersection_within_error_bound():
+    k      = 4_096
+    before = ThetaSketch(k).update(_customers(0, 10_000))
+    after  = ThetaSketch(k).update(_customers(5_000, 15_000))
+    bound  = np.sqrt(15_000 / 5_000) * theta_error(k)
+    assert _relative_error(before.intersection_count(after), 5_000) < 3 * bound
+
+def test_theta_merge_equals_union():
+    left  = ThetaSketch(512).update(_customers(0, 6_000))
+    right = ThetaSketch(512).update(_customers(4_000, 10_000))
+    assert left.merge(right) == ThetaSketch(512).update(_customers(0, 10_000))
+
+# ── Customer sketch ─────────────────────────────────────────
+def test_customer_overlap_never_exceeds_base():
+    before = CustomerSketch().update(_customers(0, 20_000))
+    after  = CustomerSketch().update(_customers(19_900, 40_000))
+    base, kept = before.overlap(after)
+    assert kept <= base
+    assert _relative_error(base, 20_000) < 3 * theta_error()
+
+def test_merge_sketches_matches_one_pass():
+    parts  = [CustomerSketch().update(_customers(i, i + 3_000)) for i in range(0, 12_000, 2_000)]
+    merged = merge_sketches(parts)
+    assert merged == CustomerSketch().update(_customers(0, 13_000))
+    assert _relative_error(merged.count(), 13_000) < 3 * hll_error()